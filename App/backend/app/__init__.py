@@ -6,8 +6,12 @@ from flask_cors import CORS
 from flask_swagger_ui import get_swaggerui_blueprint
 
 
-def create_app():
-    """Create and configure the Flask application"""
+def create_app(init_database: bool = True, invalidation_listener: bool = True):
+    """
+    Create and configure the Flask application
+    init_database: create/migrate the schema (gunicorn.conf.py does it once, before the workers start)
+    invalidation_listener: start the cache invalidation listener (gunicorn.conf.py starts it per worker)
+    """
     app = Flask(__name__,
                 template_folder='../../frontend/templates',
                 static_folder='../../frontend/static')
@@ -15,15 +19,35 @@ def create_app():
     # Load configuration
     app.config.from_object('config')
     
+    # Fast JSON encoding (orjson when installed)
+    from app.utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # Enable CORS
     CORS(app)
     
     # Initialize database
-    from app.database import init_db, import_sample_data, create_default_admin, migrate_to_new_structure
-    init_db()
-    create_default_admin()
-    import_sample_data()
-    migrate_to_new_structure()  # Migrate existing data to new structure
+    if init_database:
+        from app.database import setup_database
+        setup_database()
+    
+    # Evict cached data changed by other workers
+    if invalidation_listener and app.config.get('INVALIDATION_LISTENER'):
+        from app.utils.invalidation import start_listener
+        start_listener()
+    
+    # Tell the other workers about this request's changes (one statement per request)
+    from app.utils.invalidation import flush_notifications
+    app.teardown_request(flush_notifications)
+    
+    # Optional server-side sessions (small session ID cookie instead of signed session data)
+    if app.config.get('SERVER_SIDE_SESSIONS'):
+        from app.utils.session_store import ServerSideSessionInterface
+        app.session_interface = ServerSideSessionInterface()
+    
+    # Negotiated gzip/brotli compression of text responses
+    from app.utils.compression import init_compression
+    init_compression(app)
     
     # Register blueprints
     from app.routes.auth_routes import auth_bp
@@ -25,6 +25,19 @@ def get_db_connection():
         conn.close()
 
 
+@contextmanager
+def use_connection(conn=None):
+    """
+    Reuse the caller's connection (the caller owns the transaction) or open a new one
+    Lets bulk repository methods take part in a larger transaction, e.g. an import chunk.
+    """
+    if conn is not None:
+        yield conn
+    else:
+        with get_db_connection() as new_conn:
+            yield new_conn
+
+
 def init_db():
     """Initialize database schema"""
     with get_db_connection() as conn:
@@ -44,6 +57,12 @@ def init_db():
             )
         ''')
         
+        # Sequence for generated customer IDs (C####), see sync_id_sequences()
+        cursor.execute('CREATE SEQUENCE IF NOT EXISTS customer_id_seq')
+        
+        # Case-insensitive email lookups (import de-duplication)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_customers_email_lower ON customers (LOWER(email))')
+        
         # Authors table (no dependencies)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS authors (
@@ -56,6 +75,9 @@ def init_db():
             )
         ''')
         
+        # Normalized author name for exact-match lookups, see normalize_author_names()
+        cursor.execute('ALTER TABLE authors ADD COLUMN IF NOT EXISTS normalized_name VARCHAR(255)')
+        
         # Books table (no dependencies)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS books (
@@ -94,6 +116,15 @@ def init_db():
             if not cursor.fetchone():
                 cursor.execute(f'ALTER TABLE books ADD COLUMN {col_name} {col_type}')
         
+        # Sequence for generated book IDs (B####), see sync_id_sequences()
+        cursor.execute('CREATE SEQUENCE IF NOT EXISTS book_id_seq')
+        
+        # ISBN is a natural key for imports of books without an ID
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_isbn ON books (isbn)')
+        
+        # Covering index: availability lookups by ID are index-only scans
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_id_available ON books (id) INCLUDE (available_copies)')
+        
         # Book covers table (depends on books)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS book_covers (
@@ -110,6 +141,11 @@ def init_db():
             SELECT column_name 
             FROM information_schema.columns 
             WHERE table_name='book_themes' AND column_name='theme_id'
+              -- The current structure also has theme_id (see sync_theme_catalog), but keeps theme_name
+              AND NOT EXISTS (
+                  SELECT FROM information_schema.columns
+                  WHERE table_name='book_themes' AND column_name='theme_name'
+              )
         ''')
         old_structure_exists = cursor.fetchone()
         
@@ -183,11 +219,14 @@ def init_db():
                 )
             ''')
         
-        # Drop themes table if it still exists
+        # Drop old themes table if it still exists (the theme catalog has book_count)
         cursor.execute('''
             SELECT EXISTS (
                 SELECT FROM information_schema.tables 
                 WHERE table_name = 'themes'
+            ) AND NOT EXISTS (
+                SELECT FROM information_schema.columns
+                WHERE table_name = 'themes' AND column_name = 'book_count'
             )
         ''')
         if cursor.fetchone()[0]:
@@ -205,6 +244,23 @@ def init_db():
             )
         ''')
         
+        # Author pages: books of an author in book ID order, authors listed by name
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_book_authors_author_book ON book_authors (author_id, book_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_authors_full_name ON authors (full_name, id)')
+        
+        # Substring author search uses a trigram index when pg_trgm can be installed
+        cursor.execute('SAVEPOINT author_search_index')
+        try:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_authors_normalized_name_trgm
+                ON authors USING GIN (normalized_name gin_trgm_ops)
+            ''')
+            cursor.execute('RELEASE SAVEPOINT author_search_index')
+        except psycopg2.Error as e:
+            cursor.execute('ROLLBACK TO SAVEPOINT author_search_index')
+            print(f"Trigram index for author search not created: {e}")
+        
         # Exhibitions table (no dependencies)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS exhibitions (
@@ -302,6 +358,12 @@ def init_db():
             FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
         ''')
         
+        # (book, customer, date of issue) is the natural key for imported issues
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_issues_book_customer_date
+            ON issues (book_id, customer_id, date_issued)
+        ''')
+        
         # Exhibition books (many-to-many relationship, depends on exhibitions and books)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS exhibition_books (
@@ -344,11 +406,14 @@ def init_db():
                 FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
             ''')
         
-        # Drop themes table if it exists (no longer needed)
+        # Drop old themes table if it exists (the theme catalog has book_count)
         cursor.execute('''
             SELECT EXISTS (
                 SELECT FROM information_schema.tables 
                 WHERE table_name = 'themes'
+            ) AND NOT EXISTS (
+                SELECT FROM information_schema.columns
+                WHERE table_name = 'themes' AND column_name = 'book_count'
             )
         ''')
         result = cursor.fetchone()
@@ -357,9 +422,282 @@ def init_db():
             cursor.execute('DROP TABLE IF EXISTS themes CASCADE')
             print("[OK] Old themes table dropped")
         
+        # Import jobs (content hash + per-chunk progress for resumable imports)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS import_jobs (
+                id SERIAL PRIMARY KEY,
+                kind VARCHAR(50) NOT NULL,
+                checksum VARCHAR(64) NOT NULL,
+                file_name VARCHAR(500),
+                total_rows INTEGER DEFAULT 0,
+                committed_rows INTEGER DEFAULT 0,
+                imported_count INTEGER DEFAULT 0,
+                failed_count INTEGER DEFAULT 0,
+                status VARCHAR(50) DEFAULT 'running',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(kind, checksum)
+            )
+        ''')
+        
+        # Revoked JWTs: 'jti:<jti>' revokes one token, 'user:<id>' every token of
+        # the user issued before revoked_at. Rows are kept until the tokens expire.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                revocation_key VARCHAR(100) PRIMARY KEY,
+                revoked_at TIMESTAMP NOT NULL,
+                expires_at TIMESTAMP NOT NULL
+            )
+        ''')
+        
+        # Server-side sessions (used when SERVER_SIDE_SESSIONS is enabled)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS web_sessions (
+                id VARCHAR(64) PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at TIMESTAMP NOT NULL
+            )
+        ''')
+        
         conn.commit()
 
 
+def sync_id_sequences():
+    """
+    Move ID sequences past the highest existing generated ID
+    (IDs may have been inserted directly, e.g. by sample data or imports with explicit IDs)
+    """
+    sequences = [
+        ('book_id_seq', 'books', 'B'),
+        ('customer_id_seq', 'customers', 'C'),
+    ]
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for sequence_name, table_name, prefix in sequences:
+            cursor.execute(f'''
+                SELECT COALESCE(MAX(CAST(SUBSTRING(id FROM 2) AS BIGINT)), 0)
+                FROM {table_name}
+                WHERE id ~ %s
+            ''', (f'^{prefix}[0-9]+$',))
+            max_num = cursor.fetchone()[0]
+            
+            cursor.execute(f'SELECT last_value, is_called FROM {sequence_name}')
+            last_value, is_called = cursor.fetchone()
+            current = last_value if is_called else last_value - 1
+            
+            if max_num > current:
+                cursor.execute('SELECT setval(%s, %s)', (sequence_name, max_num))
+
+
+def sync_theme_catalog():
+    """
+    Create the themes catalog (id, name, book_count, available_count) next to book_themes
+    book_themes keeps theme_name and gets theme_id; triggers keep the counts up to date
+    on theme assignment, book deletion and availability changes. The counts are
+    recomputed once here so the catalog heals after any out-of-band changes.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS themes (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL UNIQUE,
+                book_count INTEGER NOT NULL DEFAULT 0,
+                available_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            ALTER TABLE book_themes
+            ADD COLUMN IF NOT EXISTS theme_id INTEGER REFERENCES themes(id) ON DELETE CASCADE
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_book_themes_theme_id ON book_themes (theme_id)')
+        
+        # Resolve theme_id from theme_name on every assignment
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION book_themes_set_theme_id() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO themes (name) VALUES (NEW.theme_name)
+                ON CONFLICT (name) DO NOTHING;
+                SELECT id INTO NEW.theme_id FROM themes WHERE name = NEW.theme_name;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_book_themes_set_theme_id ON book_themes')
+        cursor.execute('''
+            CREATE TRIGGER trg_book_themes_set_theme_id
+            BEFORE INSERT OR UPDATE OF theme_name ON book_themes
+            FOR EACH ROW EXECUTE FUNCTION book_themes_set_theme_id()
+        ''')
+        
+        # book_count / available_count follow theme assignments. When a book is deleted
+        # its availability is taken off in trg_books_theme_counts_delete, before the
+        # cascaded book_themes delete runs (the book row is gone by then).
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION book_themes_update_counts() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                    UPDATE themes
+                    SET book_count = book_count - 1,
+                        available_count = available_count - (
+                            SELECT COUNT(*) FROM books WHERE id = OLD.book_id AND available_copies > 0
+                        )
+                    WHERE id = OLD.theme_id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    UPDATE themes
+                    SET book_count = book_count + 1,
+                        available_count = available_count + (
+                            SELECT COUNT(*) FROM books WHERE id = NEW.book_id AND available_copies > 0
+                        )
+                    WHERE id = NEW.theme_id;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_book_themes_update_counts ON book_themes')
+        cursor.execute('''
+            CREATE TRIGGER trg_book_themes_update_counts
+            AFTER INSERT OR DELETE OR UPDATE OF book_id, theme_name ON book_themes
+            FOR EACH ROW EXECUTE FUNCTION book_themes_update_counts()
+        ''')
+        
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION books_update_theme_counts() RETURNS trigger AS $$
+            DECLARE
+                delta INTEGER;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    delta := -(OLD.available_copies > 0)::int;
+                ELSE
+                    delta := (NEW.available_copies > 0)::int - (OLD.available_copies > 0)::int;
+                END IF;
+                IF delta <> 0 THEN
+                    UPDATE themes
+                    SET available_count = available_count + delta
+                    WHERE id IN (SELECT theme_id FROM book_themes WHERE book_id = OLD.id);
+                END IF;
+                RETURN OLD;  -- lets the BEFORE DELETE proceed (ignored for AFTER UPDATE)
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_books_theme_counts_update ON books')
+        cursor.execute('''
+            CREATE TRIGGER trg_books_theme_counts_update
+            AFTER UPDATE OF available_copies ON books
+            FOR EACH ROW EXECUTE FUNCTION books_update_theme_counts()
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_books_theme_counts_delete ON books')
+        cursor.execute('''
+            CREATE TRIGGER trg_books_theme_counts_delete
+            BEFORE DELETE ON books
+            FOR EACH ROW EXECUTE FUNCTION books_update_theme_counts()
+        ''')
+        
+        # Backfill catalog rows and theme_id for existing assignments
+        cursor.execute('''
+            INSERT INTO themes (name)
+            SELECT DISTINCT theme_name FROM book_themes
+            ON CONFLICT (name) DO NOTHING
+        ''')
+        cursor.execute('''
+            UPDATE book_themes bt
+            SET theme_id = t.id
+            FROM themes t
+            WHERE t.name = bt.theme_name AND bt.theme_id IS DISTINCT FROM t.id
+        ''')
+        
+        # Recompute counts
+        cursor.execute('''
+            UPDATE themes t
+            SET book_count = COALESCE(c.book_count, 0),
+                available_count = COALESCE(c.available_count, 0)
+            FROM themes t2
+            LEFT JOIN (
+                SELECT bt.theme_id,
+                       COUNT(*) AS book_count,
+                       COUNT(*) FILTER (WHERE b.available_copies > 0) AS available_count
+                FROM book_themes bt
+                JOIN books b ON b.id = bt.book_id
+                GROUP BY bt.theme_id
+            ) c ON c.theme_id = t2.id
+            WHERE t.id = t2.id
+              AND (t.book_count, t.available_count)
+                  IS DISTINCT FROM (COALESCE(c.book_count, 0), COALESCE(c.available_count, 0))
+        ''')
+
+
+def sync_updated_at():
+    """
+    Track when books, authors and exhibitions were last changed
+    Each gets an updated_at column maintained by a row-level trigger on update.
+    Also drops the data_versions counters of earlier versions: their statement-level
+    triggers updated shared rows on every write, serializing concurrent writers.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+            BEGIN
+                NEW.updated_at := CURRENT_TIMESTAMP;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        for table in ('books', 'authors', 'exhibitions'):
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
+            cursor.execute(f'DROP TRIGGER IF EXISTS trg_{table}_updated_at ON {table}')
+            cursor.execute(f'''
+                CREATE TRIGGER trg_{table}_updated_at
+                BEFORE UPDATE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+            ''')
+        
+        # Old data version counters
+        for table in ('books', 'book_authors', 'book_themes', 'book_covers', 'authors', 'exhibitions', 'exhibition_books'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS trg_{table}_data_versions ON {table}')
+        cursor.execute('DROP FUNCTION IF EXISTS bump_data_versions()')
+        cursor.execute('DROP TABLE IF EXISTS data_versions')
+
+
+def normalize_author_names():
+    """
+    Fill authors.normalized_name and create its unique index
+    When several existing authors normalize to the same name, only the oldest one
+    gets it (the others stay reachable by ID but are not matched by name).
+    """
+    from app.models.author import Author
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT normalized_name FROM authors WHERE normalized_name IS NOT NULL')
+        taken = {row[0] for row in cursor.fetchall()}
+        
+        cursor.execute('SELECT id, full_name FROM authors WHERE normalized_name IS NULL ORDER BY id')
+        updates = []
+        for author_id, full_name in cursor.fetchall():
+            normalized_name = Author.normalize_name(full_name)
+            if normalized_name and normalized_name not in taken:
+                taken.add(normalized_name)
+                updates.append((author_id, normalized_name))
+        
+        if updates:
+            psycopg2.extras.execute_values(cursor, '''
+                UPDATE authors
+                SET normalized_name = v.normalized_name
+                FROM (VALUES %s) AS v(id, normalized_name)
+                WHERE authors.id = v.id
+            ''', updates, page_size=1000)
+        
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_authors_normalized_name
+            ON authors (normalized_name)
+        ''')
+
+
 def create_default_admin():
     """Create default admin user if not exists"""
     with get_db_connection() as conn:
@@ -469,6 +807,8 @@ def import_sample_data():
 
 def migrate_to_new_structure():
     """Migrate existing data to new structure"""
+    from app.models.author import Author
+    
     with get_db_connection() as conn:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
@@ -479,6 +819,11 @@ def migrate_to_new_structure():
             SELECT column_name 
             FROM information_schema.columns 
             WHERE table_name='book_themes' AND column_name='theme_id'
+              -- The current structure also has theme_id (see sync_theme_catalog), but keeps theme_name
+              AND NOT EXISTS (
+                  SELECT FROM information_schema.columns
+                  WHERE table_name='book_themes' AND column_name='theme_name'
+              )
         ''')
         old_structure = cursor.fetchone()
         
@@ -545,11 +890,14 @@ def migrate_to_new_structure():
                     )
                 ''')
         
-        # Drop themes table if it still exists
+        # Drop old themes table if it still exists (the theme catalog has book_count)
         cursor.execute('''
             SELECT EXISTS (
                 SELECT FROM information_schema.tables 
                 WHERE table_name = 'themes'
+            ) AND NOT EXISTS (
+                SELECT FROM information_schema.columns
+                WHERE table_name = 'themes' AND column_name = 'book_count'
             ) as exists
         ''')
         result = cursor.fetchone()
@@ -596,13 +944,17 @@ def migrate_to_new_structure():
             author_name = auth_row['author']
             if author_name:
                 # Check if author already exists
-                cursor.execute('SELECT id FROM authors WHERE full_name = %s', (author_name,))
+                normalized_name = Author.normalize_name(author_name)
+                cursor.execute('SELECT id FROM authors WHERE normalized_name = %s', (normalized_name,))
                 existing = cursor.fetchone()
                 if existing:
                     author_map[author_name] = existing['id']
                 else:
                     # Create new author
-                    cursor.execute('INSERT INTO authors (full_name) VALUES (%s) RETURNING id', (author_name,))
+                    cursor.execute(
+                        'INSERT INTO authors (full_name, normalized_name) VALUES (%s, %s) RETURNING id',
+                        (author_name, normalized_name)
+                    )
                     new_author = cursor.fetchone()
                     author_map[author_name] = new_author['id']
         
@@ -649,3 +1001,31 @@ def migrate_to_new_structure():
         
         conn.commit()
         print("[OK] Data migration completed successfully!")
+
+
+# Advisory lock held while the schema is set up (one process at a time)
+SETUP_LOCK_ID = 7301
+
+
+def setup_database():
+    """
+    Create and migrate the schema, then sync derived data (run once per deployment start)
+    The steps run under a PostgreSQL advisory lock, so processes starting at the
+    same time (workers, several hosts) take turns instead of running concurrent DDL
+    on the same tables; a process that waited finds the work done.
+    """
+    lock_conn = psycopg2.connect(**DATABASE_CONFIG)
+    lock_conn.autocommit = True
+    try:
+        lock_conn.cursor().execute('SELECT pg_advisory_lock(%s)', (SETUP_LOCK_ID,))
+        init_db()
+        create_default_admin()
+        import_sample_data()
+        normalize_author_names()
+        migrate_to_new_structure()  # Migrate existing data to new structure
+        sync_id_sequences()
+        sync_theme_catalog()
+        sync_updated_at()
+    finally:
+        # Closing the session releases the lock
+        lock_conn.close()
@@ -9,6 +9,7 @@ from app.models.exhibition import Exhibition
 from app.models.theme import Theme
 from app.models.author import Author
 from app.models.book_cover import BookCover
+from app.models.import_job import ImportJob
 
-__all__ = ['Customer', 'Book', 'Issue', 'User', 'Exhibition', 'Theme', 'Author', 'BookCover']
+__all__ = ['Customer', 'Book', 'Issue', 'User', 'Exhibition', 'Theme', 'Author', 'BookCover', 'ImportJob']
 
@@ -15,6 +15,20 @@ class Author:
     death_date: Optional[date] = None  # Дата смерти
     biography: Optional[str] = None  # Биография
     wikipedia_url: Optional[str] = None  # Ссылка на Wikipedia
+    book_count: Optional[int] = None  # Количество книг (если загружено)
+    
+    # Fields of to_dict() and the named profiles for sparse fieldsets (fields=)
+    FIELDS = ('id', 'full_name', 'birth_date', 'death_date', 'biography', 'wikipedia_url', 'book_count')
+    PROFILES = {
+        'card': ('id', 'full_name', 'book_count'),
+        'summary': ('id', 'full_name', 'birth_date', 'death_date', 'wikipedia_url', 'book_count'),
+        'full': ('id', 'full_name', 'birth_date', 'death_date', 'biography', 'wikipedia_url')
+    }
+    
+    @staticmethod
+    def normalize_name(full_name: str) -> str:
+        """Name used for author matching: case-folded, whitespace collapsed, ё -> е"""
+        return ' '.join((full_name or '').split()).casefold().replace('ё', 'е')
     
     @classmethod
     def from_dict(cls, data: dict):
@@ -44,11 +58,12 @@ class Author:
             birth_date=birth_date,
             death_date=death_date,
             biography=data.get('biography'),
-            wikipedia_url=data.get('wikipedia_url')
+            wikipedia_url=data.get('wikipedia_url'),
+            book_count=data.get('book_count')
         )
     
-    def to_dict(self):
-        """Convert Author to dictionary"""
+    def to_dict(self, fields=None):
+        """Convert Author to dictionary (only the given fields, if any)"""
         # Handle dates - convert to string if date object, otherwise keep as is
         birth_date = self.birth_date
         if birth_date and isinstance(birth_date, date):
@@ -62,7 +77,7 @@ class Author:
         elif death_date and not isinstance(death_date, str):
             death_date = None
         
-        return {
+        result = {
             'id': self.id,
             'full_name': self.full_name,
             'birth_date': birth_date,
@@ -70,5 +85,11 @@ class Author:
             'biography': self.biography,
             'wikipedia_url': self.wikipedia_url
         }
+        if fields is not None:
+            result['book_count'] = self.book_count
+            return {field: result[field] for field in fields}
+        if self.book_count is not None:
+            result['book_count'] = self.book_count
+        return result
 
 
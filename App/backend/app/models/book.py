@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from typing import Optional, List
 
 
-@dataclass
+@dataclass(slots=True)
 class Book:
     """Book entity - Книга"""
     id: str
@@ -29,6 +29,17 @@ class Book:
     # New fields for multiple covers
     covers: Optional[List[dict]] = None  # Список обложек (id, book_id, file_name)
     
+    # Fields of to_dict() and the named profiles for sparse fieldsets (fields=)
+    FIELDS = (
+        'id', 'title', 'subtitle', 'description', 'publication_year', 'isbn',
+        'total_copies', 'available_copies', 'author', 'category', 'cover_image',
+        'author_names', 'authors_info', 'covers'
+    )
+    PROFILES = {
+        'card': ('id', 'title', 'author', 'author_names', 'publication_year', 'total_copies', 'available_copies', 'covers'),
+        'full': FIELDS
+    }
+    
     @classmethod
     def from_dict(cls, data: dict):
         """Create Book from dictionary"""
@@ -51,17 +62,14 @@ class Book:
             covers=data.get('covers')
         )
     
-    def to_dict(self):
-        """Convert Book to dictionary"""
+    def to_dict(self, fields=None):
+        """Convert Book to dictionary (only the given fields, if any)"""
         # Format authors as comma-separated string for display
-        # Only use author_names if available, don't use legacy author field if author_names exists
-        authors_display = None
-        if self.author_names and len(self.author_names) > 0:
-            authors_display = ', '.join(self.author_names)
-        elif self.author:  # Fallback to legacy field only if no author_names
-            authors_display = self.author
+        # Only use author_names if available, fall back to the legacy author field otherwise
+        author_names = self.author_names
+        authors_display = ', '.join(author_names) if author_names else (self.author or '')
         
-        return {
+        data = {
             'id': self.id,
             'title': self.title,
             'subtitle': self.subtitle,
@@ -71,15 +79,17 @@ class Book:
             'total_copies': self.total_copies,
             'available_copies': self.available_copies,
             # Legacy fields for backward compatibility
-            # Only set author if we have author_names, otherwise use legacy field
-            'author': authors_display if (self.author_names and len(self.author_names) > 0) else (self.author or ''),
+            'author': authors_display,
             'category': self.category,
             'cover_image': self.cover_image,
             # New fields
-            'author_names': self.author_names or [],
+            'author_names': author_names or [],
             'authors_info': self.authors_info or [],
             'covers': self.covers or []
         }
+        if fields is None:
+            return data
+        return {field: data[field] for field in fields}
     
     @property
     def is_available(self) -> bool:
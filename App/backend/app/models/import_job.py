@@ -0,0 +1,54 @@
+"""
+Import Job model
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class ImportJob:
+    """Import Job entity - загрузка файла (Excel импорт)"""
+    id: Optional[int] = None
+    kind: str = ""  # Тип импорта: books, customers, issues
+    checksum: str = ""  # SHA-256 содержимого файла
+    file_name: Optional[str] = None  # Имя загруженного файла
+    total_rows: int = 0  # Всего строк в файле
+    committed_rows: int = 0  # Строк в уже закоммиченных частях
+    imported_count: int = 0  # Импортировано строк
+    failed_count: int = 0  # Строк с ошибками
+    status: str = "running"  # running, completed, failed
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create ImportJob from dictionary"""
+        return cls(
+            id=data.get('id'),
+            kind=data.get('kind', ''),
+            checksum=data.get('checksum', ''),
+            file_name=data.get('file_name'),
+            total_rows=data.get('total_rows') or 0,
+            committed_rows=data.get('committed_rows') or 0,
+            imported_count=data.get('imported_count') or 0,
+            failed_count=data.get('failed_count') or 0,
+            status=data.get('status', 'running'),
+            created_at=str(data['created_at']) if data.get('created_at') else None,
+            updated_at=str(data['updated_at']) if data.get('updated_at') else None
+        )
+    
+    def to_dict(self):
+        """Convert ImportJob to dictionary"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'checksum': self.checksum,
+            'file_name': self.file_name,
+            'total_rows': self.total_rows,
+            'committed_rows': self.committed_rows,
+            'imported_count': self.imported_count,
+            'failed_count': self.failed_count,
+            'status': self.status,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
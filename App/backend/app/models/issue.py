@@ -6,7 +6,15 @@ from typing import Optional
 from datetime import datetime, date
 
 
-@dataclass
+def _date_text(value) -> Optional[str]:
+    """Date as ISO text (PostgreSQL returns date objects, not strings)"""
+    if value is None or isinstance(value, str):
+        return value
+    isoformat = getattr(value, 'isoformat', None)
+    return isoformat() if isoformat is not None else str(value)
+
+
+@dataclass(slots=True)
 class Issue:
     """Book loan entity"""
     id: Optional[int]
@@ -22,31 +30,14 @@ class Issue:
     @classmethod
     def from_dict(cls, data: dict):
         """Create Issue from dictionary"""
-        # Handle dates - PostgreSQL returns date objects, not strings
-        date_issued = data.get('date_issued')
-        if date_issued and not isinstance(date_issued, str):
-            # Convert date object to string
-            if hasattr(date_issued, 'isoformat'):
-                date_issued = date_issued.isoformat()
-            else:
-                date_issued = str(date_issued)
-        
-        date_return = data.get('date_return')
-        if date_return and not isinstance(date_return, str):
-            # Convert date object to string
-            if hasattr(date_return, 'isoformat'):
-                date_return = date_return.isoformat()
-            else:
-                date_return = str(date_return)
-        
         return cls(
             id=data.get('id'),
             book_id=data['book_id'],
             book_title=data['book_title'],
             customer_id=data['customer_id'],
             customer_name=data['customer_name'],
-            date_issued=date_issued or '',
-            date_return=date_return,
+            date_issued=_date_text(data.get('date_issued')) or '',
+            date_return=_date_text(data.get('date_return')),
             status=data.get('status', 'issued'),
             extended=data.get('extended', False)
         )
@@ -10,20 +10,26 @@ class Theme:
     """Theme entity - тематическая категория"""
     id: Optional[int] = None
     name: str = ""  # Наименование темы
+    book_count: int = 0  # Количество книг по теме
+    available_count: int = 0  # Количество книг по теме, доступных для выдачи
     
     @classmethod
     def from_dict(cls, data: dict):
         """Create Theme from dictionary"""
         return cls(
             id=data.get('id'),
-            name=data.get('name', '')
+            name=data.get('name', ''),
+            book_count=data.get('book_count') or 0,
+            available_count=data.get('available_count') or 0
         )
     
     def to_dict(self):
         """Convert Theme to dictionary"""
         return {
             'id': self.id,
-            'name': self.name
+            'name': self.name,
+            'book_count': self.book_count,
+            'available_count': self.available_count
         }
 
 
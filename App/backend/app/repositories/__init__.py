@@ -9,9 +9,13 @@ from app.repositories.exhibition_repository import ExhibitionRepository
 from app.repositories.theme_repository import ThemeRepository
 from app.repositories.author_repository import AuthorRepository
 from app.repositories.book_cover_repository import BookCoverRepository
+from app.repositories.import_job_repository import ImportJobRepository
+from app.repositories.revoked_token_repository import RevokedTokenRepository
+from app.repositories.web_session_repository import WebSessionRepository
 
 __all__ = [
     'CustomerRepository', 'BookRepository', 'IssueRepository', 'UserRepository', 
-    'ExhibitionRepository', 'ThemeRepository', 'AuthorRepository', 'BookCoverRepository'
+    'ExhibitionRepository', 'ThemeRepository', 'AuthorRepository', 'BookCoverRepository',
+    'ImportJobRepository', 'RevokedTokenRepository', 'WebSessionRepository'
 ]
 
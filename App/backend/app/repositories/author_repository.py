@@ -1,7 +1,7 @@
 """
 Author Repository - Data access layer for authors
 """
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from app.database import get_db_connection
 from app.models.author import Author
 from psycopg2.extras import RealDictCursor
@@ -10,12 +10,30 @@ from psycopg2.extras import RealDictCursor
 class AuthorRepository:
     """Repository for author operations"""
     
+    # Select expression for each Author field
+    _FIELD_COLUMNS = {
+        'id': 'a.id',
+        'full_name': 'a.full_name',
+        'birth_date': 'a.birth_date',
+        'death_date': 'a.death_date',
+        'biography': 'a.biography',
+        'wikipedia_url': 'a.wikipedia_url',
+        'book_count': '(SELECT COUNT(*) FROM book_authors ba WHERE ba.author_id = a.id) AS book_count'
+    }
+    
+    @staticmethod
+    def _columns(fields: Iterable[str]) -> str:
+        """Select list for the requested fields (the ID and name are always read)"""
+        fields = {'id', 'full_name'} | set(fields)
+        return ', '.join(column for field, column in AuthorRepository._FIELD_COLUMNS.items() if field in fields)
+    
     @staticmethod
-    def find_all() -> List[Author]:
-        """Get all authors"""
+    def find_all(fields: Iterable[str] = None) -> List[Author]:
+        """Get all authors (only the given fields, if any)"""
+        columns = AuthorRepository._columns(fields) if fields is not None else 'a.*'
         with get_db_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute('SELECT * FROM authors ORDER BY full_name')
+            cursor.execute(f'SELECT {columns} FROM authors a ORDER BY a.full_name')
             rows = cursor.fetchall()
             return [Author.from_dict(dict(row)) for row in rows]
     
@@ -42,6 +60,106 @@ class AuthorRepository:
             rows = cursor.fetchall()
             return [Author.from_dict(dict(row)) for row in rows]
     
+    @staticmethod
+    def find_page(page: int, per_page: int, search_term: str = None, fields: Iterable[str] = None) -> tuple[List[Author], int]:
+        """
+        Get one page of authors ordered by name
+        Fields default to the summary profile (no biography, with book counts).
+        Search matches a substring of the normalized name (trigram index when available).
+        Returns: (authors: List[Author], total: int)
+        """
+        where = ''
+        params = []
+        if search_term:
+            pattern = f'%{Author.normalize_name(search_term)}%'
+            where = 'WHERE a.normalized_name LIKE %s OR (a.normalized_name IS NULL AND a.full_name ILIKE %s)'
+            params = [pattern, f'%{search_term}%']
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(f'SELECT COUNT(*) AS total FROM authors a {where}', params)
+            total = cursor.fetchone()['total']
+            
+            cursor.execute(f'''
+                SELECT {AuthorRepository._columns(fields or Author.PROFILES['summary'])}
+                FROM authors a
+                {where}
+                ORDER BY a.full_name, a.id
+                LIMIT %s OFFSET %s
+            ''', params + [per_page, (page - 1) * per_page])
+            rows = cursor.fetchall()
+            return [Author.from_dict(dict(row)) for row in rows], total
+    
+    @staticmethod
+    def count_books(author_id: int) -> int:
+        """Number of books by the author (index-only count on book_authors)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM book_authors WHERE author_id = %s', (author_id,))
+            return cursor.fetchone()[0]
+    
+    @staticmethod
+    def find_books(author_id: int, after_book_id: str = None, limit: int = 20) -> List[dict]:
+        """
+        Get the author's books ordered by book ID, starting after after_book_id (keyset pagination)
+        Each book is a card: main fields, first cover and first category, in one query.
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                SELECT b.id, b.title, b.subtitle, b.publication_year, b.isbn,
+                       b.total_copies, b.available_copies,
+                       (SELECT bc.file_name FROM book_covers bc
+                        WHERE bc.book_id = b.id ORDER BY bc.id LIMIT 1) AS cover_image,
+                       (SELECT bt.theme_name FROM book_themes bt
+                        WHERE bt.book_id = b.id ORDER BY bt.theme_name LIMIT 1) AS category
+                FROM book_authors ba
+                INNER JOIN books b ON b.id = ba.book_id
+                WHERE ba.author_id = %s AND (%s::varchar IS NULL OR ba.book_id > %s)
+                ORDER BY ba.book_id
+                LIMIT %s
+            ''', (author_id, after_book_id, after_book_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def find_id_by_normalized_name(normalized_name: str) -> Optional[int]:
+        """Get author ID by normalized name (see Author.normalize_name), one index probe"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM authors WHERE normalized_name = %s', (normalized_name,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    @staticmethod
+    def get_or_create_id(full_name: str, wikipedia_url: str = None) -> Optional[int]:
+        """
+        Get the ID of the author with this name, creating the author if needed
+        A provided wikipedia_url is stored on the author (new or existing) when it differs.
+        """
+        normalized_name = Author.normalize_name(full_name)
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO authors (full_name, normalized_name, wikipedia_url)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (normalized_name) DO UPDATE
+                    SET wikipedia_url = COALESCE(EXCLUDED.wikipedia_url, authors.wikipedia_url)
+                    WHERE EXCLUDED.wikipedia_url IS NOT NULL
+                      AND authors.wikipedia_url IS DISTINCT FROM EXCLUDED.wikipedia_url
+                    RETURNING id
+                ''', (full_name, normalized_name, wikipedia_url))
+                row = cursor.fetchone()
+                if row:
+                    return row[0]
+                # Existing author, nothing to update
+                cursor.execute('SELECT id FROM authors WHERE normalized_name = %s', (normalized_name,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            print(f"Error resolving author: {e}")
+            return None
+    
     @staticmethod
     def create(author: Author) -> bool:
         """Create a new author"""
@@ -49,11 +167,12 @@ class AuthorRepository:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT INTO authors (full_name, birth_date, death_date, biography, wikipedia_url)
-                    VALUES (%s, %s, %s, %s, %s)
+                    INSERT INTO authors (full_name, normalized_name, birth_date, death_date, biography, wikipedia_url)
+                    VALUES (%s, %s, %s, %s, %s, %s)
                     RETURNING id
                 ''', (
                     author.full_name,
+                    Author.normalize_name(author.full_name),
                     author.birth_date,
                     author.death_date,
                     author.biography,
@@ -75,11 +194,12 @@ class AuthorRepository:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE authors
-                    SET full_name = %s, birth_date = %s, death_date = %s,
+                    SET full_name = %s, normalized_name = %s, birth_date = %s, death_date = %s,
                         biography = %s, wikipedia_url = %s
                     WHERE id = %s
                 ''', (
                     author.full_name,
+                    Author.normalize_name(author.full_name),
                     author.birth_date,
                     author.death_date,
                     author.biography,
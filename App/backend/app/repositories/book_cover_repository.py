@@ -4,7 +4,7 @@ Book Cover Repository - Data access layer for book covers
 from typing import List, Optional
 from app.database import get_db_connection
 from app.models.book_cover import BookCover
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 
 class BookCoverRepository:
@@ -70,6 +70,35 @@ class BookCoverRepository:
         except Exception as e:
             print(f"Error deleting book covers: {e}")
             return False
-
-
-
+    
+    @staticmethod
+    def set_for_book(book_id: str, file_names: List[str]) -> bool:
+        """
+        Set the covers of a book (replaces existing, keeps the given order)
+        Covers matching the stored ones from the start are kept; the rest is
+        replaced with at most one DELETE and one multi-row INSERT, so saving
+        unchanged covers writes nothing.
+        """
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT id, file_name FROM book_covers WHERE book_id = %s ORDER BY id', (book_id,))
+                current = cursor.fetchall()
+                
+                # Length of the common prefix (covers are ordered by id)
+                kept = 0
+                while kept < min(len(current), len(file_names)) and current[kept][1] == file_names[kept]:
+                    kept += 1
+                
+                stale_ids = [row[0] for row in current[kept:]]
+                if stale_ids:
+                    cursor.execute('DELETE FROM book_covers WHERE id = ANY(%s)', (stale_ids,))
+                if file_names[kept:]:
+                    execute_values(cursor, '''
+                        INSERT INTO book_covers (book_id, file_name)
+                        VALUES %s
+                    ''', [(book_id, file_name) for file_name in file_names[kept:]])
+                return True
+        except Exception as e:
+            print(f"Error setting book covers: {e}")
+            return False
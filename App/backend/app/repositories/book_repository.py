@@ -1,15 +1,22 @@
 """
 Book Repository - Data access layer for books
 """
-from typing import List, Optional
-from app.database import get_db_connection
+from typing import Dict, Iterable, List, Optional
+from app.database import get_db_connection, use_connection
 from app.models import Book
-from psycopg2.extras import RealDictCursor
+from app.repositories.theme_repository import ThemeRepository
+from psycopg2.extras import RealDictCursor, execute_values
 
 
 class BookRepository:
     """Repository for book data access"""
     
+    # Book fields stored in a books column of the same name (the others are relations)
+    _COLUMN_FIELDS = {
+        'id', 'title', 'subtitle', 'description', 'publication_year', 'isbn',
+        'total_copies', 'available_copies', 'author', 'category', 'cover_image'
+    }
+    
     @staticmethod
     def _get_authors_for_book(book_id: str) -> List[str]:
         """Get author names for a book (legacy method for backward compatibility)"""
@@ -55,9 +62,120 @@ class BookRepository:
             return [dict(row) for row in rows]
     
     @staticmethod
-    def find_all(page: int = None, per_page: int = None) -> tuple[List[Book], int]:
+    def _columns(fields: Optional[Iterable[str]] = None) -> str:
+        """
+        Select list for the requested fields (all columns when fields is None)
+        Relation fields pull in the legacy column they fall back to.
+        """
+        if fields is None:
+            return 'books.*'
+        fields = set(fields)
+        columns = {'id', 'title'} | (fields & BookRepository._COLUMN_FIELDS)
+        if fields & {'author', 'author_names', 'authors_info'}:
+            columns.add('author')
+        if 'covers' in fields:
+            columns.add('cover_image')
+        return ', '.join(f'books.{column}' for column in sorted(columns))
+    
+    @staticmethod
+    def _get_authors_for_books(book_ids: List[str], detailed: bool = True) -> Dict[str, List[dict]]:
+        """
+        Get authors for many books in one query (names only unless detailed)
+        Returns: {book_id: [author dict, ...]}
+        """
+        if not book_ids:
+            return {}
+        columns = 'a.id, a.full_name, a.wikipedia_url, a.biography, a.birth_date, a.death_date' if detailed else 'a.id, a.full_name'
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(f'''
+                SELECT ba.book_id, {columns}
+                FROM authors a
+                INNER JOIN book_authors ba ON a.id = ba.author_id
+                WHERE ba.book_id = ANY(%s)
+                ORDER BY ba.book_id, a.full_name
+            ''', (book_ids,))
+            authors = {}
+            for row in cursor.fetchall():
+                author = dict(row)
+                authors.setdefault(author.pop('book_id'), []).append(author)
+            return authors
+    
+    @staticmethod
+    def _get_covers_for_books(book_ids: List[str]) -> Dict[str, List[dict]]:
+        """
+        Get covers for many books in one query
+        Returns: {book_id: [cover dict, ...]}
+        """
+        if not book_ids:
+            return {}
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                SELECT id, book_id, file_name
+                FROM book_covers
+                WHERE book_id = ANY(%s)
+                ORDER BY book_id, id
+            ''', (book_ids,))
+            covers = {}
+            for row in cursor.fetchall():
+                covers.setdefault(row['book_id'], []).append(dict(row))
+            return covers
+    
+    @staticmethod
+    def _hydrate(rows: List[dict], fields: Optional[Iterable[str]] = None) -> List[Book]:
+        """
+        Build books from rows, loading only the relations the fields need (one query per relation)
+        Without fields, authors (with details), covers and categories are all loaded.
+        """
+        fields = set(fields) if fields is not None else set(Book.FIELDS)
+        book_ids = [row['id'] for row in rows]
+        authors = {}
+        if fields & {'author', 'author_names', 'authors_info'}:
+            authors = BookRepository._get_authors_for_books(book_ids, detailed='authors_info' in fields)
+        covers = BookRepository._get_covers_for_books(book_ids) if 'covers' in fields else {}
+        categories = ThemeRepository.get_first_theme_names(book_ids) if 'category' in fields else {}
+        
+        return [
+            BookRepository.book_from_row(row, authors.get(row['id']), covers.get(row['id']), categories.get(row['id']))
+            for row in rows
+        ]
+    
+    @staticmethod
+    def book_from_row(row: dict, authors_info: Optional[List[dict]], covers: Optional[List[dict]], category: Optional[str]) -> Book:
+        """Build a book from a books row and its loaded relations (legacy columns as fallback)"""
+        book_dict = dict(row)
+        if authors_info:
+            book_dict['authors_info'] = authors_info
+            book_dict['author_names'] = [a['full_name'] for a in authors_info]
+        else:
+            # If no authors in new table, use legacy author field
+            if book_dict.get('author'):
+                book_dict['author_names'] = [book_dict['author']]
+                book_dict['authors_info'] = [{'full_name': book_dict['author'], 'wikipedia_url': None}]
+            else:
+                book_dict['author_names'] = []
+                book_dict['authors_info'] = []
+        
+        if covers:
+            book_dict['covers'] = covers
+        else:
+            # If no covers in new table, use legacy cover_image field
+            if book_dict.get('cover_image'):
+                book_dict['covers'] = [{'id': None, 'book_id': book_dict['id'], 'file_name': book_dict['cover_image']}]
+            else:
+                book_dict['covers'] = []
+        
+        # Categories/themes from book_themes table; keep legacy category field otherwise
+        if category:
+            book_dict['category'] = category
+        
+        return Book.from_dict(book_dict)
+    
+    @staticmethod
+    def find_all(page: int = None, per_page: int = None, fields: Iterable[str] = None) -> tuple[List[Book], int]:
         """
-        Get all books with optional pagination
+        Get all books with optional pagination (only the given fields, if any)
         Returns: (books: List[Book], total_count: int)
         """
         with get_db_connection() as conn:
@@ -68,53 +186,20 @@ class BookRepository:
             total_count = cursor.fetchone()['count']
             
             # Build query with pagination
+            columns = BookRepository._columns(fields)
             if page is not None and per_page is not None:
                 offset = (page - 1) * per_page
-                cursor.execute('SELECT * FROM books ORDER BY title LIMIT %s OFFSET %s', (per_page, offset))
+                cursor.execute(f'SELECT {columns} FROM books ORDER BY title LIMIT %s OFFSET %s', (per_page, offset))
             else:
-                cursor.execute('SELECT * FROM books ORDER BY title')
+                cursor.execute(f'SELECT {columns} FROM books ORDER BY title')
             
             rows = cursor.fetchall()
-            books = []
-            for row in rows:
-                book_dict = dict(row)
-                # Get authors info from book_authors table
-                authors_info = BookRepository._get_authors_info_for_book(book_dict['id'])
-                if authors_info:
-                    book_dict['authors_info'] = authors_info
-                    book_dict['author_names'] = [a['full_name'] for a in authors_info]
-                else:
-                    # If no authors in new table, use legacy author field
-                    if book_dict.get('author'):
-                        book_dict['author_names'] = [book_dict['author']]
-                        book_dict['authors_info'] = [{'full_name': book_dict['author'], 'wikipedia_url': None}]
-                    else:
-                        book_dict['author_names'] = []
-                        book_dict['authors_info'] = []
-                
-                # Get covers from book_covers table
-                covers = BookRepository._get_covers_for_book(book_dict['id'])
-                if covers:
-                    book_dict['covers'] = covers
-                else:
-                    # If no covers in new table, use legacy cover_image field
-                    if book_dict.get('cover_image'):
-                        book_dict['covers'] = [{'id': None, 'book_id': book_dict['id'], 'file_name': book_dict['cover_image']}]
-                    else:
-                        book_dict['covers'] = []
-                
-                # Get categories/themes from book_themes table
-                category = BookRepository._get_category_for_book(book_dict['id'])
-                if category:
-                    book_dict['category'] = category
-                
-                books.append(Book.from_dict(book_dict))
-            return books, total_count
+            return BookRepository._hydrate(rows, fields), total_count
     
     @staticmethod
-    def find_available(page: int = None, per_page: int = None) -> tuple[List[Book], int]:
+    def find_available(page: int = None, per_page: int = None, fields: Iterable[str] = None) -> tuple[List[Book], int]:
         """
-        Get all available books with optional pagination
+        Get all available books with optional pagination (only the given fields, if any)
         Returns: (books: List[Book], total_count: int)
         """
         with get_db_connection() as conn:
@@ -125,48 +210,15 @@ class BookRepository:
             total_count = cursor.fetchone()['count']
             
             # Build query with pagination
+            columns = BookRepository._columns(fields)
             if page is not None and per_page is not None:
                 offset = (page - 1) * per_page
-                cursor.execute('SELECT * FROM books WHERE available_copies > 0 ORDER BY title LIMIT %s OFFSET %s', (per_page, offset))
+                cursor.execute(f'SELECT {columns} FROM books WHERE available_copies > 0 ORDER BY title LIMIT %s OFFSET %s', (per_page, offset))
             else:
-                cursor.execute('SELECT * FROM books WHERE available_copies > 0 ORDER BY title')
+                cursor.execute(f'SELECT {columns} FROM books WHERE available_copies > 0 ORDER BY title')
             
             rows = cursor.fetchall()
-            books = []
-            for row in rows:
-                book_dict = dict(row)
-                # Get authors info from book_authors table
-                authors_info = BookRepository._get_authors_info_for_book(book_dict['id'])
-                if authors_info:
-                    book_dict['authors_info'] = authors_info
-                    book_dict['author_names'] = [a['full_name'] for a in authors_info]
-                else:
-                    # If no authors in new table, use legacy author field
-                    if book_dict.get('author'):
-                        book_dict['author_names'] = [book_dict['author']]
-                        book_dict['authors_info'] = [{'full_name': book_dict['author'], 'wikipedia_url': None}]
-                    else:
-                        book_dict['author_names'] = []
-                        book_dict['authors_info'] = []
-                
-                # Get covers from book_covers table
-                covers = BookRepository._get_covers_for_book(book_dict['id'])
-                if covers:
-                    book_dict['covers'] = covers
-                else:
-                    # If no covers in new table, use legacy cover_image field
-                    if book_dict.get('cover_image'):
-                        book_dict['covers'] = [{'id': None, 'book_id': book_dict['id'], 'file_name': book_dict['cover_image']}]
-                    else:
-                        book_dict['covers'] = []
-                
-                # Get categories/themes from book_themes table
-                category = BookRepository._get_category_for_book(book_dict['id'])
-                if category:
-                    book_dict['category'] = category
-                
-                books.append(Book.from_dict(book_dict))
-            return books, total_count
+            return BookRepository._hydrate(rows, fields), total_count
     
     @staticmethod
     def find_by_id(book_id: str) -> Optional[Book]:
@@ -212,57 +264,76 @@ class BookRepository:
             return Book.from_dict(book_dict)
     
     @staticmethod
-    def search(search_term: str) -> List[Book]:
-        """Search books by ID, title, or author (case-insensitive)"""
+    def find_availability(book_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        Get available copies for a set of book IDs (index-only scan on idx_books_id_available)
+        Returns: {book_id: available_copies} for the books that exist
+        """
+        book_ids = list(book_ids)
+        if not book_ids:
+            return {}
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, available_copies FROM books WHERE id = ANY(%s)', (book_ids,))
+            return dict(cursor.fetchall())
+    
+    @staticmethod
+    def find_refs_by_ids(book_ids: Iterable[str], conn=None) -> Dict[str, dict]:
+        """
+        Get title and available copies for a set of book IDs in one query
+        (no authors/covers/themes hydration - used by bulk imports)
+        Returns: {book_id: {'title': str, 'available_copies': int}}
+        """
+        book_ids = list(book_ids)
+        if not book_ids:
+            return {}
+        with use_connection(conn) as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                SELECT id, title, available_copies
+                FROM books
+                WHERE id = ANY(%s)
+            ''', (book_ids,))
+            return {
+                row['id']: {'title': row['title'], 'available_copies': row['available_copies']}
+                for row in cursor.fetchall()
+            }
+    
+    @staticmethod
+    def find_ids_by_isbns(isbns: Iterable[str], conn=None) -> Dict[str, str]:
+        """
+        Map ISBNs to existing book IDs in one query (natural key for imports without IDs)
+        Returns: {isbn: book_id}
+        """
+        isbns = list(isbns)
+        if not isbns:
+            return {}
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT isbn, id FROM books WHERE isbn = ANY(%s) ORDER BY id', (isbns,))
+            ids = {}
+            for isbn, book_id in cursor.fetchall():
+                ids.setdefault(isbn, book_id)
+            return ids
+    
+    @staticmethod
+    def search(search_term: str, fields: Iterable[str] = None) -> List[Book]:
+        """Search books by ID, title, or author (case-insensitive; only the given fields, if any)"""
         with get_db_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            query = '''
-                SELECT * FROM books
+            query = f'''
+                SELECT {BookRepository._columns(fields)} FROM books
                 WHERE id ILIKE %s OR title ILIKE %s OR author ILIKE %s
                 ORDER BY title
             '''
             pattern = f'%{search_term}%'
             cursor.execute(query, (pattern, pattern, pattern))
             rows = cursor.fetchall()
-            books = []
-            for row in rows:
-                book_dict = dict(row)
-                # Get authors info from book_authors table
-                authors_info = BookRepository._get_authors_info_for_book(book_dict['id'])
-                if authors_info:
-                    book_dict['authors_info'] = authors_info
-                    book_dict['author_names'] = [a['full_name'] for a in authors_info]
-                else:
-                    # If no authors in new table, use legacy author field
-                    if book_dict.get('author'):
-                        book_dict['author_names'] = [book_dict['author']]
-                        book_dict['authors_info'] = [{'full_name': book_dict['author'], 'wikipedia_url': None}]
-                    else:
-                        book_dict['author_names'] = []
-                        book_dict['authors_info'] = []
-                
-                # Get covers from book_covers table
-                covers = BookRepository._get_covers_for_book(book_dict['id'])
-                if covers:
-                    book_dict['covers'] = covers
-                else:
-                    # If no covers in new table, use legacy cover_image field
-                    if book_dict.get('cover_image'):
-                        book_dict['covers'] = [{'id': None, 'book_id': book_dict['id'], 'file_name': book_dict['cover_image']}]
-                    else:
-                        book_dict['covers'] = []
-                
-                # Get categories/themes from book_themes table
-                category = BookRepository._get_category_for_book(book_dict['id'])
-                if category:
-                    book_dict['category'] = category
-                
-                books.append(Book.from_dict(book_dict))
-            return books
+            return BookRepository._hydrate(rows, fields)
     
     @staticmethod
-    def advanced_search(title: str = None, author: str = None, theme: str = None) -> List[Book]:
-        """Advanced search by title, author, and/or theme"""
+    def advanced_search(title: str = None, author: str = None, theme: str = None, fields: Iterable[str] = None) -> List[Book]:
+        """Advanced search by title, author, and/or theme (only the given fields, if any)"""
         with get_db_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
@@ -299,48 +370,14 @@ class BookRepository:
             
             if not conditions:
                 # No search criteria, return all books
-                query = 'SELECT * FROM books ORDER BY title'
+                query = f'SELECT {BookRepository._columns(fields)} FROM books ORDER BY title'
                 cursor.execute(query)
             else:
-                query = f'SELECT DISTINCT books.* FROM books WHERE {" AND ".join(conditions)} ORDER BY title'
+                query = f'SELECT DISTINCT {BookRepository._columns(fields)} FROM books WHERE {" AND ".join(conditions)} ORDER BY title'
                 cursor.execute(query, params)
             
             rows = cursor.fetchall()
-            books = []
-            for row in rows:
-                book_dict = dict(row)
-                # Get authors info from book_authors table
-                authors_info = BookRepository._get_authors_info_for_book(book_dict['id'])
-                if authors_info:
-                    book_dict['authors_info'] = authors_info
-                    book_dict['author_names'] = [a['full_name'] for a in authors_info]
-                else:
-                    # If no authors in new table, use legacy author field
-                    if book_dict.get('author'):
-                        book_dict['author_names'] = [book_dict['author']]
-                        book_dict['authors_info'] = [{'full_name': book_dict['author'], 'wikipedia_url': None}]
-                    else:
-                        book_dict['author_names'] = []
-                        book_dict['authors_info'] = []
-                
-                # Get covers from book_covers table
-                covers = BookRepository._get_covers_for_book(book_dict['id'])
-                if covers:
-                    book_dict['covers'] = covers
-                else:
-                    # If no covers in new table, use legacy cover_image field
-                    if book_dict.get('cover_image'):
-                        book_dict['covers'] = [{'id': None, 'book_id': book_dict['id'], 'file_name': book_dict['cover_image']}]
-                    else:
-                        book_dict['covers'] = []
-                
-                # Get categories/themes from book_themes table
-                category = BookRepository._get_category_for_book(book_dict['id'])
-                if category:
-                    book_dict['category'] = category
-                
-                books.append(Book.from_dict(book_dict))
-            return books
+            return BookRepository._hydrate(rows, fields)
     
     @staticmethod
     def create(book: Book) -> bool:
@@ -370,18 +407,68 @@ class BookRepository:
             print(f"Error creating book: {e}")
             return False
     
+    @staticmethod
+    def upsert_many(books: List[Book], conn=None) -> int:
+        """
+        Insert or update books in bulk keyed by ID (for Excel import)
+        For existing books, optional fields missing from the file keep their stored
+        values and available_copies moves with total_copies so active loans stay
+        accounted for. Unchanged books are not rewritten.
+        Returns: number of inserted or changed books
+        """
+        if not books:
+            return 0
+        try:
+            with use_connection(conn) as conn:
+                cursor = conn.cursor()
+                rows = execute_values(cursor, '''
+                    INSERT INTO books (id, title, description, isbn, total_copies, available_copies,
+                                       author, category, cover_image)
+                    VALUES %s
+                    ON CONFLICT (id) DO UPDATE
+                    SET title = EXCLUDED.title,
+                        description = COALESCE(EXCLUDED.description, books.description),
+                        isbn = COALESCE(EXCLUDED.isbn, books.isbn),
+                        total_copies = EXCLUDED.total_copies,
+                        available_copies = GREATEST(0, books.available_copies + EXCLUDED.total_copies - books.total_copies),
+                        author = COALESCE(EXCLUDED.author, books.author),
+                        category = COALESCE(EXCLUDED.category, books.category),
+                        cover_image = COALESCE(EXCLUDED.cover_image, books.cover_image)
+                    WHERE (books.title, books.description, books.isbn, books.total_copies,
+                           books.author, books.category, books.cover_image)
+                          IS DISTINCT FROM
+                          (EXCLUDED.title, COALESCE(EXCLUDED.description, books.description),
+                           COALESCE(EXCLUDED.isbn, books.isbn), EXCLUDED.total_copies,
+                           COALESCE(EXCLUDED.author, books.author),
+                           COALESCE(EXCLUDED.category, books.category),
+                           COALESCE(EXCLUDED.cover_image, books.cover_image))
+                    RETURNING id
+                ''', [
+                    (
+                        book.id,
+                        book.title,
+                        book.description,
+                        book.isbn,
+                        book.total_copies,
+                        book.available_copies,
+                        book.author,  # Legacy field
+                        book.category,  # Legacy field
+                        book.cover_image  # Legacy field
+                    )
+                    for book in books
+                ], page_size=1000, fetch=True)
+                return len(rows)
+        except Exception as e:
+            print(f"Error importing books: {e}")
+            raise
+    
     @staticmethod
     def update(book: Book) -> bool:
         """Update book"""
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE books
-                    SET title=%s, subtitle=%s, description=%s, publication_year=%s, isbn=%s, 
-                        total_copies=%s, available_copies=%s, author=%s, category=%s, cover_image=%s
-                    WHERE id=%s
-                ''', (
+                values = (
                     book.title,
                     book.subtitle,
                     book.description,
@@ -391,9 +478,20 @@ class BookRepository:
                     book.available_copies,
                     book.author,  # Legacy field
                     book.category,  # Legacy field
-                    book.cover_image,  # Legacy field
-                    book.id
-                ))
+                    book.cover_image  # Legacy field
+                )
+                # Saving an unchanged book writes nothing
+                cursor.execute('''
+                    UPDATE books
+                    SET title=%s, subtitle=%s, description=%s, publication_year=%s, isbn=%s, 
+                        total_copies=%s, available_copies=%s, author=%s, category=%s, cover_image=%s
+                    WHERE id=%s
+                      AND (title, subtitle, description, publication_year, isbn,
+                           total_copies, available_copies, author, category, cover_image)
+                          IS DISTINCT FROM
+                          (%s::varchar, %s::varchar, %s::text, %s::integer, %s::varchar,
+                           %s::integer, %s::integer, %s::varchar, %s::varchar, %s::text)
+                ''', values + (book.id,) + values)
                 return True
         except Exception as e:
             print(f"Error updating book: {e}")
@@ -420,6 +518,77 @@ class BookRepository:
             print(f"Error deleting book: {e}")
             raise  # Re-raise to handle in service layer
     
+    @staticmethod
+    def update_stock_many(updates: List[dict], conn=None) -> Dict[str, str]:
+        """
+        Apply partial updates of total_copies, available_copies and category to many books
+        in one statement (None leaves a field as stored). When only total_copies changes,
+        available_copies moves with it so active loans stay accounted for. Updates that
+        would leave more available than total copies are rejected; unchanged books are
+        not rewritten.
+        The books are locked first (in ID order), so the new stock is computed from
+        current values and checkouts or returns committed meanwhile are not overwritten.
+        Returns: {book_id: 'updated' | 'not_found' | 'invalid'}
+        """
+        if not updates:
+            return {}
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            # The next statement takes a new snapshot (READ COMMITTED) that sees the locked rows as they are
+            cursor.execute(
+                'SELECT id FROM books WHERE id = ANY(%s) ORDER BY id FOR UPDATE',
+                (sorted({update['id'] for update in updates}),)
+            )
+            rows = execute_values(cursor, '''
+                WITH v (id, total_copies, available_copies, category) AS (VALUES %s),
+                new_values AS (
+                    SELECT b.id,
+                           COALESCE(v.total_copies, b.total_copies) AS total_copies,
+                           COALESCE(v.available_copies, GREATEST(0,
+                               b.available_copies + COALESCE(v.total_copies, b.total_copies) - b.total_copies
+                           )) AS available_copies,
+                           COALESCE(v.category, b.category) AS category
+                    FROM v
+                    INNER JOIN books b ON b.id = v.id
+                ),
+                updated AS (
+                    UPDATE books b
+                    SET total_copies = n.total_copies,
+                        available_copies = n.available_copies,
+                        category = n.category
+                    FROM new_values n
+                    WHERE b.id = n.id
+                      AND n.available_copies <= n.total_copies
+                      AND (b.total_copies, b.available_copies, b.category)
+                          IS DISTINCT FROM (n.total_copies, n.available_copies, n.category)
+                    RETURNING b.id
+                )
+                SELECT v.id,
+                       CASE WHEN n.id IS NULL THEN 'not_found'
+                            WHEN n.available_copies > n.total_copies THEN 'invalid'
+                            ELSE 'updated' END
+                FROM v
+                LEFT JOIN new_values n ON n.id = v.id
+            ''', [
+                (update['id'], update.get('total_copies'), update.get('available_copies'), update.get('category'))
+                for update in updates
+            ], template='(%s::varchar, %s::integer, %s::integer, %s::varchar)', page_size=len(updates), fetch=True)
+            return {row[0]: row[1] for row in rows}
+    
+    @staticmethod
+    def delete_many(book_ids: Iterable[str], conn=None) -> set:
+        """
+        Delete many books in one statement (related records go via CASCADE, see delete)
+        Returns: set of deleted book IDs
+        """
+        book_ids = list(book_ids)
+        if not book_ids:
+            return set()
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM books WHERE id = ANY(%s) RETURNING id', (book_ids,))
+            return {row[0] for row in cursor.fetchall()}
+    
     @staticmethod
     def decrease_available_copies(book_id: str) -> bool:
         """Decrease available copies when book is borrowed"""
@@ -455,7 +624,6 @@ class BookRepository:
     @staticmethod
     def _get_category_for_book(book_id: str) -> Optional[str]:
         """Get first category/theme for a book (for backward compatibility)"""
-        from app.repositories import ThemeRepository
         themes = ThemeRepository.get_by_book_id(book_id)
         if themes and len(themes) > 0:
             return themes[0].name
@@ -463,52 +631,33 @@ class BookRepository:
     
     @staticmethod
     def get_all_categories() -> List[str]:
-        """Get all unique book categories from book_themes table"""
-        with get_db_connection() as conn:
+        """Get all book categories (themes that have books) from the themes catalog"""
+        return [theme.name for theme in ThemeRepository.find_all()]
+    
+    @staticmethod
+    def allocate_ids(count: int, conn=None) -> List[str]:
+        """
+        Allocate a block of book IDs (B####) from book_id_seq
+        Sequence values already used as explicit IDs (e.g. imported with an ID) are skipped.
+        """
+        ids = []
+        with use_connection(conn) as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT DISTINCT theme_name 
-                FROM book_themes 
-                WHERE theme_name IS NOT NULL AND theme_name != ''
-                ORDER BY theme_name
-            ''')
-            rows = cursor.fetchall()
-            return [row[0] for row in rows if row[0]]
+            while len(ids) < count:
+                cursor.execute("SELECT nextval('book_id_seq') FROM generate_series(1, %s)", (count - len(ids),))
+                block = [f"B{row[0]:04d}" for row in cursor.fetchall()]
+                cursor.execute('SELECT id FROM books WHERE id = ANY(%s)', (block,))
+                taken = {row[0] for row in cursor.fetchall()}
+                ids.extend(new_id for new_id in block if new_id not in taken)
+        return ids
     
     @staticmethod
     def generate_unique_id() -> str:
-        """Generate a unique book ID in format B####"""
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            # Get all book IDs that start with 'B'
-            cursor.execute("SELECT id FROM books WHERE id LIKE %s", ('B%',))
-            rows = cursor.fetchall()
-            
-            if rows:
-                # Extract numbers from existing IDs and find the maximum
-                max_num = 0
-                for row in rows:
-                    existing_id = row[0]
-                    try:
-                        # Extract number part (skip 'B' prefix)
-                        num = int(existing_id[1:])
-                        if num > max_num:
-                            max_num = num
-                    except ValueError:
-                        continue
-                new_num = max_num + 1
-            else:
-                new_num = 1
-            
-            # Format as B#### (4 digits)
-            new_id = f"B{new_num:04d}"
-            
-            # Ensure uniqueness (in case of gaps or conflicts)
-            while BookRepository.find_by_id(new_id):
-                new_num += 1
-                new_id = f"B{new_num:04d}"
-            
-            return new_id
+        """
+        Generate a unique book ID in format B#### from book_id_seq
+        Widens past 4 digits (B9999 -> B10000) once the 4-digit range is used up.
+        """
+        return BookRepository.allocate_ids(1)[0]
     
     @staticmethod
     def add_theme(book_id: str, theme_name: str) -> bool:
@@ -540,23 +689,68 @@ class BookRepository:
     
     @staticmethod
     def set_themes(book_id: str, theme_names: List[str]) -> bool:
-        """Set themes for a book (replaces existing)"""
+        """
+        Set themes for a book (replaces existing)
+        Only the difference to the stored themes is written: at most one DELETE
+        and one multi-row INSERT, nothing if the themes are unchanged.
+        """
+        wanted = list(dict.fromkeys(theme_names))
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                # Remove existing themes
-                cursor.execute('DELETE FROM book_themes WHERE book_id = %s', (book_id,))
-                # Add new themes
-                for theme_name in theme_names:
+                cursor.execute('SELECT theme_name FROM book_themes WHERE book_id = %s', (book_id,))
+                current = {row[0] for row in cursor.fetchall()}
+                
+                removed = list(current - set(wanted))
+                added = [theme_name for theme_name in wanted if theme_name not in current]
+                if removed:
                     cursor.execute('''
+                        DELETE FROM book_themes
+                        WHERE book_id = %s AND theme_name = ANY(%s)
+                    ''', (book_id, removed))
+                if added:
+                    execute_values(cursor, '''
                         INSERT INTO book_themes (book_id, theme_name)
-                        VALUES (%s, %s)
-                    ''', (book_id, theme_name))
+                        VALUES %s
+                        ON CONFLICT (book_id, theme_name) DO NOTHING
+                    ''', [(book_id, theme_name) for theme_name in added])
                 return True
         except Exception as e:
             print(f"Error setting themes for book: {e}")
             return False
     
+    @staticmethod
+    def set_single_theme_many(book_themes: Dict[str, str], conn=None) -> None:
+        """
+        Set one theme per book for many books (for Excel import, replaces existing)
+        Only books whose theme actually differs are touched.
+        """
+        if not book_themes:
+            return
+        values = list(book_themes.items())
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            execute_values(cursor, '''
+                DELETE FROM book_themes bt
+                USING (VALUES %s) AS v(book_id, theme_name)
+                WHERE bt.book_id = v.book_id AND bt.theme_name <> v.theme_name
+            ''', values, page_size=1000)
+            execute_values(cursor, '''
+                INSERT INTO book_themes (book_id, theme_name)
+                VALUES %s
+                ON CONFLICT (book_id, theme_name) DO NOTHING
+            ''', values, page_size=1000)
+    
+    @staticmethod
+    def clear_themes_many(book_ids: Iterable[str], conn=None) -> None:
+        """Remove all themes from many books"""
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM book_themes WHERE book_id = ANY(%s)', (book_ids,))
+    
     @staticmethod
     def add_author(book_id: str, author_id: int) -> bool:
         """Add author to book"""
@@ -587,18 +781,31 @@ class BookRepository:
     
     @staticmethod
     def set_authors(book_id: str, author_ids: List[int]) -> bool:
-        """Set authors for a book (replaces existing)"""
+        """
+        Set authors for a book (replaces existing)
+        Only the difference to the stored authors is written: at most one DELETE
+        and one multi-row INSERT, nothing if the authors are unchanged.
+        """
+        wanted = list(dict.fromkeys(author_ids))
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
-                # Remove existing authors
-                cursor.execute('DELETE FROM book_authors WHERE book_id = %s', (book_id,))
-                # Add new authors
-                for author_id in author_ids:
+                cursor.execute('SELECT author_id FROM book_authors WHERE book_id = %s', (book_id,))
+                current = {row[0] for row in cursor.fetchall()}
+                
+                removed = list(current - set(wanted))
+                added = [author_id for author_id in wanted if author_id not in current]
+                if removed:
                     cursor.execute('''
+                        DELETE FROM book_authors
+                        WHERE book_id = %s AND author_id = ANY(%s)
+                    ''', (book_id, removed))
+                if added:
+                    execute_values(cursor, '''
                         INSERT INTO book_authors (book_id, author_id)
-                        VALUES (%s, %s)
-                    ''', (book_id, author_id))
+                        VALUES %s
+                        ON CONFLICT (book_id, author_id) DO NOTHING
+                    ''', [(book_id, author_id) for author_id in added])
                 return True
         except Exception as e:
             print(f"Error setting authors for book: {e}")
@@ -1,10 +1,11 @@
 """
 Customer Repository - Data access layer for customers
 """
-from typing import List, Optional
-from app.database import get_db_connection
+from typing import Dict, Iterable, Iterator, List, Optional
+from app.database import get_db_connection, use_connection
 from app.models import Customer
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from config import STREAM_FETCH_SIZE
 
 
 class CustomerRepository:
@@ -28,6 +29,20 @@ class CustomerRepository:
             row = cursor.fetchone()
             return Customer.from_dict(dict(row)) if row else None
     
+    @staticmethod
+    def find_names_by_ids(customer_ids: Iterable[str], conn=None) -> Dict[str, str]:
+        """
+        Get names for a set of customer IDs in one query (used by bulk imports)
+        Returns: {customer_id: name}
+        """
+        customer_ids = list(customer_ids)
+        if not customer_ids:
+            return {}
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, name FROM customers WHERE id = ANY(%s)', (customer_ids,))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+    
     @staticmethod
     def search(search_term: str) -> List[Customer]:
         """Search customers by ID, name, or email"""
@@ -43,6 +58,29 @@ class CustomerRepository:
             rows = cursor.fetchall()
             return [Customer.from_dict(dict(row)) for row in rows]
     
+    @staticmethod
+    def stream(search_term: str = None) -> Iterator[Customer]:
+        """
+        Stream customers (same filter and order as find_all / search) from a server-side
+        cursor, STREAM_FETCH_SIZE rows at a time
+        """
+        query = 'SELECT * FROM customers ORDER BY name'
+        params = ()
+        if search_term:
+            query = '''
+                SELECT * FROM customers
+                WHERE id LIKE %s OR name LIKE %s OR email LIKE %s
+                ORDER BY name
+            '''
+            pattern = f'%{search_term}%'
+            params = (pattern, pattern, pattern)
+        with get_db_connection() as conn:
+            cursor = conn.cursor(name='customers_stream', cursor_factory=RealDictCursor)
+            cursor.itersize = STREAM_FETCH_SIZE
+            cursor.execute(query, params)
+            for row in cursor:
+                yield Customer.from_dict(dict(row))
+    
     @staticmethod
     def create(customer: Customer) -> bool:
         """Create a new customer"""
@@ -70,6 +108,91 @@ class CustomerRepository:
             # Re-raise to get better error handling upstream
             raise
     
+    @staticmethod
+    def upsert_many(customers: List[Customer], conn=None) -> int:
+        """
+        Insert or update customers in bulk keyed by ID (for Excel import)
+        Rows identical to the stored customer are left untouched, so re-importing
+        the same file writes nothing.
+        Returns: number of inserted or changed customers
+        """
+        if not customers:
+            return 0
+        try:
+            with use_connection(conn) as conn:
+                cursor = conn.cursor()
+                rows = execute_values(cursor, '''
+                    INSERT INTO customers (id, name, address, zip, city, phone, email)
+                    VALUES %s
+                    ON CONFLICT (id) DO UPDATE
+                    SET name = EXCLUDED.name,
+                        address = EXCLUDED.address,
+                        zip = EXCLUDED.zip,
+                        city = EXCLUDED.city,
+                        phone = EXCLUDED.phone,
+                        email = EXCLUDED.email
+                    WHERE (customers.name, customers.address, customers.zip, customers.city,
+                           customers.phone, customers.email)
+                          IS DISTINCT FROM
+                          (EXCLUDED.name, EXCLUDED.address, EXCLUDED.zip, EXCLUDED.city,
+                           EXCLUDED.phone, EXCLUDED.email)
+                    RETURNING id
+                ''', [
+                    (
+                        customer.id,
+                        customer.name,
+                        customer.address,
+                        customer.zip,
+                        customer.city,
+                        customer.phone,
+                        customer.email
+                    )
+                    for customer in customers
+                ], page_size=1000, fetch=True)
+                return len(rows)
+        except Exception as e:
+            print(f"Error importing customers: {e}")
+            raise
+    
+    @staticmethod
+    def find_existing_keys(customer_ids: Iterable[str], emails: Iterable[str], conn=None) -> tuple[set, Dict[str, str]]:
+        """
+        Find which of the given IDs and emails (case-insensitive) are already taken, in one query
+        Returns: (existing_ids: set, {lower-cased email: customer_id})
+        """
+        customer_ids = list(customer_ids)
+        emails = [email.lower() for email in emails]
+        if not customer_ids and not emails:
+            return set(), {}
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, LOWER(email)
+                FROM customers
+                WHERE id = ANY(%s) OR LOWER(email) = ANY(%s)
+            ''', (customer_ids, emails))
+            rows = cursor.fetchall()
+            existing_ids = {row[0] for row in rows}
+            email_owners = {row[1]: row[0] for row in rows if row[1]}
+            return existing_ids, email_owners
+    
+    @staticmethod
+    def allocate_ids(count: int, conn=None) -> List[str]:
+        """
+        Allocate a block of customer IDs (C####) from customer_id_seq
+        Sequence values already used as explicit IDs (e.g. imported with an ID) are skipped.
+        """
+        ids = []
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            while len(ids) < count:
+                cursor.execute("SELECT nextval('customer_id_seq') FROM generate_series(1, %s)", (count - len(ids),))
+                block = [f"C{row[0]:04d}" for row in cursor.fetchall()]
+                cursor.execute('SELECT id FROM customers WHERE id = ANY(%s)', (block,))
+                taken = {row[0] for row in cursor.fetchall()}
+                ids.extend(new_id for new_id in block if new_id not in taken)
+        return ids
+    
     @staticmethod
     def update(customer: Customer) -> bool:
         """Update customer"""
@@ -108,37 +231,10 @@ class CustomerRepository:
     
     @staticmethod
     def generate_unique_id() -> str:
-        """Generate a unique customer ID in format C####"""
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            # Get all customer IDs that start with 'C'
-            cursor.execute("SELECT id FROM customers WHERE id LIKE %s", ('C%',))
-            rows = cursor.fetchall()
-            
-            if rows:
-                # Extract numbers from existing IDs and find the maximum
-                max_num = 0
-                for row in rows:
-                    existing_id = row[0]
-                    try:
-                        # Extract number part (skip 'C' prefix)
-                        num = int(existing_id[1:])
-                        if num > max_num:
-                            max_num = num
-                    except ValueError:
-                        continue
-                new_num = max_num + 1
-            else:
-                new_num = 1
-            
-            # Format as C#### (4 digits)
-            new_id = f"C{new_num:04d}"
-            
-            # Ensure uniqueness (in case of gaps or conflicts)
-            while CustomerRepository.find_by_id(new_id):
-                new_num += 1
-                new_id = f"C{new_num:04d}"
-            
-            return new_id
+        """
+        Generate a unique customer ID in format C#### from customer_id_seq
+        Widens past 4 digits (C9999 -> C10000) once the 4-digit range is used up.
+        """
+        return CustomerRepository.allocate_ids(1)[0]
 
 
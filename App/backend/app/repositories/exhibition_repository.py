@@ -1,11 +1,12 @@
 """
 Exhibition Repository - Data access layer for exhibitions
 """
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from datetime import date
 from app.database import get_db_connection
 from app.models.exhibition import Exhibition
 from app.models.book import Book
+from app.repositories.book_repository import BookRepository
 from psycopg2.extras import RealDictCursor
 
 
@@ -40,6 +41,25 @@ class ExhibitionRepository:
             rows = cursor.fetchall()
             return [Exhibition.from_dict(dict(row)) for row in rows]
     
+    @staticmethod
+    def find_next_boundary(today: date) -> Optional[date]:
+        """
+        Next date after today on which the set of active exhibitions changes by itself
+        (an enabled exhibition starts, or the day after one ends)
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT MIN(boundary) FROM (
+                    SELECT start_date AS boundary FROM exhibitions
+                    WHERE is_active = TRUE AND start_date > %s
+                    UNION ALL
+                    SELECT end_date + 1 FROM exhibitions
+                    WHERE is_active = TRUE AND end_date >= %s
+                ) boundaries
+            ''', (today, today))
+            return cursor.fetchone()[0]
+    
     @staticmethod
     def find_by_id(exhibition_id: int) -> Optional[Exhibition]:
         """Find exhibition by ID"""
@@ -163,6 +183,48 @@ class ExhibitionRepository:
             rows = cursor.fetchall()
             return [Book.from_dict(dict(row)) for row in rows]
     
+    @staticmethod
+    def find_books_for_exhibitions(exhibition_ids: Iterable[int]) -> Dict[int, List[Book]]:
+        """
+        Get the books of many exhibitions in one query, ordered by display_order
+        Books are hydrated with authors, covers and first category (JSON subqueries).
+        Returns: {exhibition_id: [Book, ...]} (exhibitions without books are missing)
+        """
+        exhibition_ids = list(exhibition_ids)
+        if not exhibition_ids:
+            return {}
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                SELECT eb.exhibition_id, b.*,
+                       (SELECT json_agg(json_build_object(
+                                   'id', a.id, 'full_name', a.full_name, 'wikipedia_url', a.wikipedia_url
+                               ) ORDER BY a.full_name)
+                        FROM book_authors ba
+                        INNER JOIN authors a ON a.id = ba.author_id
+                        WHERE ba.book_id = b.id) AS linked_authors,
+                       (SELECT json_agg(json_build_object(
+                                   'id', bc.id, 'book_id', bc.book_id, 'file_name', bc.file_name
+                               ) ORDER BY bc.id)
+                        FROM book_covers bc
+                        WHERE bc.book_id = b.id) AS linked_covers,
+                       (SELECT bt.theme_name FROM book_themes bt
+                        WHERE bt.book_id = b.id ORDER BY bt.theme_name LIMIT 1) AS first_theme
+                FROM exhibition_books eb
+                INNER JOIN books b ON b.id = eb.book_id
+                WHERE eb.exhibition_id = ANY(%s)
+                ORDER BY eb.exhibition_id, eb.display_order ASC, b.id
+            ''', (exhibition_ids,))
+            books = {}
+            for row in cursor.fetchall():
+                row = dict(row)
+                exhibition_id = row.pop('exhibition_id')
+                book = BookRepository.book_from_row(
+                    row, row.pop('linked_authors'), row.pop('linked_covers'), row.pop('first_theme')
+                )
+                books.setdefault(exhibition_id, []).append(book)
+            return books
+    
     @staticmethod
     def update_book_order(exhibition_id: int, book_orders: List[dict]) -> bool:
         """Update display order of books in an exhibition
@@ -0,0 +1,80 @@
+"""
+Import Job Repository - Data access layer for import jobs
+"""
+from typing import Optional
+from app.database import get_db_connection, use_connection
+from app.models.import_job import ImportJob
+from psycopg2.extras import RealDictCursor
+
+
+class ImportJobRepository:
+    """Repository for import job progress (resumable imports)"""
+    
+    @staticmethod
+    def find_by_checksum(kind: str, checksum: str) -> Optional[ImportJob]:
+        """Find the import job for a file content hash"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('SELECT * FROM import_jobs WHERE kind = %s AND checksum = %s', (kind, checksum))
+            row = cursor.fetchone()
+            return ImportJob.from_dict(dict(row)) if row else None
+    
+    @staticmethod
+    def start(kind: str, checksum: str, file_name: str, total_rows: int, restart: bool = False) -> ImportJob:
+        """
+        Get or create the job for a file content hash
+        An existing unfinished job keeps its committed progress so the import resumes from it.
+        With restart, an existing job (finished or not) starts over from the first row.
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute('''
+                INSERT INTO import_jobs (kind, checksum, file_name, total_rows)
+                VALUES (%(kind)s, %(checksum)s, %(file_name)s, %(total_rows)s)
+                ON CONFLICT (kind, checksum) DO UPDATE
+                SET file_name = EXCLUDED.file_name,
+                    total_rows = EXCLUDED.total_rows,
+                    committed_rows = CASE WHEN %(restart)s THEN 0 ELSE import_jobs.committed_rows END,
+                    imported_count = CASE WHEN %(restart)s THEN 0 ELSE import_jobs.imported_count END,
+                    failed_count = CASE WHEN %(restart)s THEN 0 ELSE import_jobs.failed_count END,
+                    status = CASE
+                        WHEN import_jobs.status = 'completed' AND NOT %(restart)s THEN 'completed'
+                        ELSE 'running'
+                    END,
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING *
+            ''', {
+                'kind': kind, 'checksum': checksum, 'file_name': file_name,
+                'total_rows': total_rows, 'restart': restart
+            })
+            return ImportJob.from_dict(dict(cursor.fetchone()))
+    
+    @staticmethod
+    def record_chunk(job_id: int, committed_rows: int, imported_count: int, failed_count: int, conn=None) -> None:
+        """Record a committed chunk (pass the chunk's connection so progress commits with the data)"""
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE import_jobs
+                SET committed_rows = %s,
+                    imported_count = imported_count + %s,
+                    failed_count = failed_count + %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (committed_rows, imported_count, failed_count, job_id))
+    
+    @staticmethod
+    def set_status(job_id: int, status: str) -> bool:
+        """Set job status (running, completed, failed)"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE import_jobs
+                    SET status = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                ''', (status, job_id))
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error updating import job status: {e}")
+            return False
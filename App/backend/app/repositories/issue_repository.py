@@ -1,11 +1,12 @@
 """
 Issue Repository - Data access layer for book issues (loans)
 """
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Set
 from datetime import datetime
-from app.database import get_db_connection
+from app.database import get_db_connection, use_connection
 from app.models import Issue
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from config import STREAM_FETCH_SIZE
 
 
 class IssueRepository:
@@ -106,6 +107,103 @@ class IssueRepository:
             print(f"Error creating issue: {e}")
             return None
     
+    @staticmethod
+    def find_existing_keys(keys: Iterable[tuple], conn=None) -> set:
+        """
+        Find which (book_id, customer_id, date_issued) keys already have an issue, in one query
+        Returns: set of (book_id, customer_id, 'YYYY-MM-DD') tuples
+        """
+        keys = list(keys)
+        if not keys:
+            return set()
+        with use_connection(conn) as conn:
+            cursor = conn.cursor()
+            rows = execute_values(cursor, '''
+                SELECT i.book_id, i.customer_id, i.date_issued
+                FROM issues i
+                JOIN (VALUES %s) AS k(book_id, customer_id, date_issued)
+                  ON i.book_id = k.book_id
+                 AND i.customer_id = k.customer_id
+                 AND i.date_issued = k.date_issued::date
+            ''', [(book_id, customer_id, str(date_issued)) for book_id, customer_id, date_issued in keys],
+                page_size=1000, fetch=True)
+            return {(row[0], row[1], str(row[2])) for row in rows}
+    
+    @staticmethod
+    def create_many(issues: List[Issue], conn=None) -> tuple[int, Set[str]]:
+        """
+        Create issues in bulk (for Excel import)
+        Issues whose (book, customer, date of issue) already exists are skipped by an
+        anti-join, and available_copies is decremented only for the rows actually
+        inserted, so a retried chunk does not double-count loans.
+        The decrement is checked against the live row (available_copies >= issued
+        count): when other loans took the copies since the caller read them, the
+        'issued' rows of that book are not inserted and the book is reported.
+        Returns: (number of created issues, IDs of books without enough copies)
+        """
+        if not issues:
+            return 0, set()
+        try:
+            with use_connection(conn) as conn:
+                cursor = conn.cursor()
+                rows = execute_values(cursor, '''
+                    WITH data (book_id, book_title, customer_id, customer_name, date_issued, date_return, status) AS (
+                        VALUES %s
+                    ),
+                    new AS (
+                        SELECT d.* FROM data d
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM issues i
+                            WHERE i.book_id = d.book_id
+                              AND i.customer_id = d.customer_id
+                              AND i.date_issued = d.date_issued::date
+                        )
+                    ),
+                    needed AS (
+                        SELECT book_id, COUNT(*) AS issued_count
+                        FROM new
+                        WHERE status = 'issued'
+                        GROUP BY book_id
+                    ),
+                    decrements AS (
+                        UPDATE books
+                        SET available_copies = books.available_copies - n.issued_count
+                        FROM needed n
+                        WHERE books.id = n.book_id
+                          AND books.available_copies >= n.issued_count
+                        RETURNING books.id
+                    ),
+                    inserted AS (
+                        INSERT INTO issues (book_id, book_title, customer_id, customer_name, date_issued, date_return, status)
+                        SELECT n.book_id, n.book_title, n.customer_id, n.customer_name,
+                               n.date_issued::date, n.date_return::date, n.status
+                        FROM new n
+                        WHERE n.status <> 'issued' OR n.book_id IN (SELECT id FROM decrements)
+                        RETURNING book_id
+                    )
+                    SELECT (SELECT COUNT(*) FROM inserted),
+                           ARRAY(SELECT book_id FROM needed WHERE book_id NOT IN (SELECT id FROM decrements))
+                ''', [
+                    (
+                        issue.book_id,
+                        issue.book_title,
+                        issue.customer_id,
+                        issue.customer_name,
+                        str(issue.date_issued),
+                        str(issue.date_return) if issue.date_return else None,
+                        issue.status
+                    )
+                    for issue in issues
+                ], page_size=1000, fetch=True)
+                # One result row per page of VALUES
+                return (
+                    sum(created_count for created_count, _ in rows),
+                    {book_id for _, book_ids in rows for book_id in book_ids}
+                )
+        except Exception as e:
+            print(f"Error creating issues: {e}")
+            raise
+    
     @staticmethod
     def return_book(issue_id: int, return_date: str = None) -> bool:
         """Mark an issue as returned"""
@@ -145,42 +243,87 @@ class IssueRepository:
             return [Issue.from_dict(dict(row)) for row in rows]
     
     @staticmethod
-    def get_overdue() -> List[Issue]:
-        """Get all overdue issues (more than LOAN_PERIOD_DAYS days old, + 7 days if extended)"""
+    def _overdue_query() -> str:
+        """SQL selecting overdue issues (more than LOAN_PERIOD_DAYS days old, + 7 days if extended)"""
         from config import LOAN_PERIOD_DAYS, SYSTEM_DATE, USE_SYSTEM_DATE
         
+        # Use system date if configured, otherwise use CURRENT_DATE
+        # For extended issues, add 7 more days
+        if USE_SYSTEM_DATE:
+            # Use system date for comparison
+            # Calculate: date_issued + LOAN_PERIOD_DAYS + (7 if extended else 0) < SYSTEM_DATE
+            return f'''
+                SELECT * FROM issues
+                WHERE status = 'issued'
+                AND (
+                    (extended = FALSE AND date_issued < DATE '{SYSTEM_DATE}' - INTERVAL '{LOAN_PERIOD_DAYS} days')
+                    OR
+                    (extended = TRUE AND date_issued < DATE '{SYSTEM_DATE}' - INTERVAL '{LOAN_PERIOD_DAYS + 7} days')
+                )
+                ORDER BY date_issued ASC
+            '''
+        # Use actual current date
+        return f'''
+            SELECT * FROM issues
+            WHERE status = 'issued'
+            AND (
+                (extended = FALSE AND date_issued < CURRENT_DATE - INTERVAL '{LOAN_PERIOD_DAYS} days')
+                OR
+                (extended = TRUE AND date_issued < CURRENT_DATE - INTERVAL '{LOAN_PERIOD_DAYS + 7} days')
+            )
+            ORDER BY date_issued ASC
+        '''
+    
+    @staticmethod
+    def get_overdue() -> List[Issue]:
+        """Get all overdue issues (more than LOAN_PERIOD_DAYS days old, + 7 days if extended)"""
         with get_db_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            # Use system date if configured, otherwise use CURRENT_DATE
-            # For extended issues, add 7 more days
-            if USE_SYSTEM_DATE:
-                # Use system date for comparison
-                # Calculate: date_issued + LOAN_PERIOD_DAYS + (7 if extended else 0) < SYSTEM_DATE
-                cursor.execute(f'''
-                    SELECT * FROM issues
-                    WHERE status = 'issued'
-                    AND (
-                        (extended = FALSE AND date_issued < DATE '{SYSTEM_DATE}' - INTERVAL '{LOAN_PERIOD_DAYS} days')
-                        OR
-                        (extended = TRUE AND date_issued < DATE '{SYSTEM_DATE}' - INTERVAL '{LOAN_PERIOD_DAYS + 7} days')
-                    )
-                    ORDER BY date_issued ASC
-                ''')
-            else:
-                # Use actual current date
-                cursor.execute(f'''
-                    SELECT * FROM issues
-                    WHERE status = 'issued'
-                    AND (
-                        (extended = FALSE AND date_issued < CURRENT_DATE - INTERVAL '{LOAN_PERIOD_DAYS} days')
-                        OR
-                        (extended = TRUE AND date_issued < CURRENT_DATE - INTERVAL '{LOAN_PERIOD_DAYS + 7} days')
-                    )
-                    ORDER BY date_issued ASC
-                ''')
+            cursor.execute(IssueRepository._overdue_query())
             rows = cursor.fetchall()
             return [Issue.from_dict(dict(row)) for row in rows]
     
+    @staticmethod
+    def _stream(query: str, params: tuple = ()) -> Iterator[Issue]:
+        """
+        Yield issues from a server-side cursor, STREAM_FETCH_SIZE rows at a time
+        The connection stays open until the iterator is exhausted or closed.
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor(name='issues_stream', cursor_factory=RealDictCursor)
+            cursor.itersize = STREAM_FETCH_SIZE
+            cursor.execute(query, params)
+            for row in cursor:
+                yield Issue.from_dict(dict(row))
+    
+    @staticmethod
+    def stream(status: str = None, customer_id: str = None, search_term: str = None) -> Iterator[Issue]:
+        """
+        Stream issues (same filters and order as find_all / find_active / find_returned /
+        find_by_customer / search) without loading them all into memory
+        """
+        conditions = []
+        params = []
+        if customer_id:
+            conditions.append('customer_id = %s')
+            params.append(customer_id)
+        if status in ('issued', 'returned'):
+            conditions.append('status = %s')
+            params.append(status)
+        if search_term:
+            pattern = f'%{search_term}%'
+            conditions.append('(book_title LIKE %s OR customer_name LIKE %s OR customer_id LIKE %s)')
+            params.extend([pattern, pattern, pattern])
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order = 'date_return DESC' if status == 'returned' and not customer_id else 'date_issued DESC'
+        return IssueRepository._stream(f'SELECT * FROM issues {where} ORDER BY {order}', tuple(params))
+    
+    @staticmethod
+    def stream_overdue() -> Iterator[Issue]:
+        """Stream overdue issues (see get_overdue)"""
+        return IssueRepository._stream(IssueRepository._overdue_query())
+    
     @staticmethod
     def get_statistics() -> dict:
         """Get statistics about issues"""
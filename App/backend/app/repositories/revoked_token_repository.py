@@ -0,0 +1,52 @@
+"""
+Revoked Token Repository - Data access layer for revoked JWTs
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+from app.database import get_db_connection
+
+
+class RevokedTokenRepository:
+    """Repository for the JWT revocation store"""
+    
+    @staticmethod
+    def find_active() -> List[Tuple[str, datetime]]:
+        """Get all revocations whose tokens have not expired yet: [(revocation_key, revoked_at)]"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT revocation_key, revoked_at FROM revoked_tokens WHERE expires_at > %s',
+                (datetime.utcnow(),)
+            )
+            return cursor.fetchall()
+    
+    @staticmethod
+    def find_revoked_at(revocation_key: str) -> Optional[datetime]:
+        """Get the revocation time for a key (None if the key is not revoked)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT revoked_at FROM revoked_tokens WHERE revocation_key = %s AND expires_at > %s',
+                (revocation_key, datetime.utcnow())
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    @staticmethod
+    def add(revocation_key: str, revoked_at: datetime, expires_at: datetime) -> bool:
+        """Store a revocation (a later revocation of the same key replaces it) and prune expired ones"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO revoked_tokens (revocation_key, revoked_at, expires_at)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (revocation_key) DO UPDATE
+                    SET revoked_at = EXCLUDED.revoked_at,
+                        expires_at = GREATEST(revoked_tokens.expires_at, EXCLUDED.expires_at)
+                ''', (revocation_key, revoked_at, expires_at))
+                cursor.execute('DELETE FROM revoked_tokens WHERE expires_at <= %s', (datetime.utcnow(),))
+                return True
+        except Exception as e:
+            print(f"Error revoking token: {e}")
+            return False
@@ -1,8 +1,9 @@
 """
 Theme Repository - Data access layer for themes
-Themes are stored directly in book_themes table as theme_name
+Themes are assigned in book_themes (theme_name + theme_id); the themes table is the
+catalog with per-theme book counts kept up to date by triggers (see sync_theme_catalog)
 """
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from app.database import get_db_connection
 from app.models.theme import Theme
 from psycopg2.extras import RealDictCursor
@@ -13,28 +14,30 @@ class ThemeRepository:
     
     @staticmethod
     def find_all() -> List[Theme]:
-        """Get all unique themes"""
+        """Get all themes that have books (with book and available counts)"""
         with get_db_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute('SELECT DISTINCT theme_name as name FROM book_themes ORDER BY theme_name')
+            cursor.execute('''
+                SELECT id, name, book_count, available_count
+                FROM themes
+                WHERE book_count > 0 AND name != ''
+                ORDER BY name
+            ''')
             rows = cursor.fetchall()
-            themes = []
-            for idx, row in enumerate(rows, start=1):
-                theme_data = {'id': idx, 'name': row['name']}
-                themes.append(Theme.from_dict(theme_data))
-            return themes
+            return [Theme.from_dict(dict(row)) for row in rows]
     
     @staticmethod
     def find_by_name(name: str) -> Optional[Theme]:
         """Get theme by name"""
         with get_db_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute('SELECT DISTINCT theme_name as name FROM book_themes WHERE theme_name = %s', (name,))
+            cursor.execute('''
+                SELECT id, name, book_count, available_count
+                FROM themes
+                WHERE name = %s AND book_count > 0
+            ''', (name,))
             row = cursor.fetchone()
-            if row:
-                theme_data = {'id': None, 'name': row['name']}
-                return Theme.from_dict(theme_data)
-            return None
+            return Theme.from_dict(dict(row)) if row else None
     
     @staticmethod
     def get_by_book_id(book_id: str) -> List[Theme]:
@@ -42,15 +45,30 @@ class ThemeRepository:
         with get_db_connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute('''
-                SELECT DISTINCT theme_name as name 
-                FROM book_themes 
-                WHERE book_id = %s 
-                ORDER BY theme_name
+                SELECT t.id, t.name, t.book_count, t.available_count
+                FROM book_themes bt
+                INNER JOIN themes t ON t.id = bt.theme_id
+                WHERE bt.book_id = %s
+                ORDER BY t.name
             ''', (book_id,))
             rows = cursor.fetchall()
-            themes = []
-            for idx, row in enumerate(rows, start=1):
-                theme_data = {'id': idx, 'name': row['name']}
-                themes.append(Theme.from_dict(theme_data))
-            return themes
-
+            return [Theme.from_dict(dict(row)) for row in rows]
+    
+    @staticmethod
+    def get_first_theme_names(book_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Get the first theme name (alphabetically) for many books in one query
+        Returns: {book_id: theme_name}
+        """
+        book_ids = list(book_ids)
+        if not book_ids:
+            return {}
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT DISTINCT ON (book_id) book_id, theme_name
+                FROM book_themes
+                WHERE book_id = ANY(%s)
+                ORDER BY book_id, theme_name
+            ''', (book_ids,))
+            return {row[0]: row[1] for row in cursor.fetchall()}
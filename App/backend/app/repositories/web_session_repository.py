@@ -0,0 +1,59 @@
+"""
+Web Session Repository - Data access layer for server-side sessions
+"""
+from datetime import datetime
+from typing import Optional
+from app.database import get_db_connection
+
+
+class WebSessionRepository:
+    """Repository for server-side Flask sessions (serialized session data keyed by session ID)"""
+    
+    @staticmethod
+    def find(session_id: str) -> Optional[str]:
+        """Get the serialized data of a session that has not expired"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT data FROM web_sessions WHERE id = %s AND expires_at > %s',
+                (session_id, datetime.utcnow())
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    @staticmethod
+    def save(session_id: str, data: str, expires_at: datetime) -> bool:
+        """Insert or replace a session"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO web_sessions (id, data, expires_at)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (id) DO UPDATE
+                    SET data = EXCLUDED.data, expires_at = EXCLUDED.expires_at
+                ''', (session_id, data, expires_at))
+                return True
+        except Exception as e:
+            print(f"Error saving session: {e}")
+            return False
+    
+    @staticmethod
+    def delete(session_id: str) -> bool:
+        """Delete a session"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM web_sessions WHERE id = %s', (session_id,))
+                return True
+        except Exception as e:
+            print(f"Error deleting session: {e}")
+            return False
+    
+    @staticmethod
+    def delete_expired() -> int:
+        """Delete expired sessions"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM web_sessions WHERE expires_at <= %s', (datetime.utcnow(),))
+            return cursor.rowcount
@@ -1,11 +1,19 @@
 """
 API routes - REST API endpoints
 """
-from flask import Blueprint, jsonify, request, session, current_app
-from app.services import CustomerService, BookService, IssueService, AuthService, ExhibitionService
+from flask import Blueprint, Response, jsonify, request, session, current_app, stream_with_context
+from app.services import CustomerService, BookService, IssueService, AuthService, ExhibitionService, AuthorService
+from app.services import TokenService
+from app.models import Author, Book
 from app.repositories import AuthorRepository
 from app.repositories import IssueRepository
 from app.utils.decorators import jwt_required, admin_required, get_current_user
+from app.utils.events import close_subscription, event_stream, open_subscription
+from app.utils.fieldsets import parse_fields
+from app.utils.http_cache import cached_response, get_response_cache_stats, json_with_etag
+from app.utils.jwt_utils import get_token_cache_stats
+from app.utils.rate_limiter import get_rate_limit_stats
+from app.utils.streaming import json_array_chunks, stream_json_array, streamed_json
 
 api_bp = Blueprint('api', __name__)
 
@@ -21,6 +29,144 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 
+# Excel import helpers
+def _remove_temp_file(temp_path):
+    """Remove a temporary upload (with retry logic for Windows file locks)"""
+    import os
+    import time
+    
+    if not os.path.exists(temp_path):
+        return
+    try:
+        time.sleep(0.1)  # Small delay to ensure file is released
+        os.remove(temp_path)
+    except PermissionError:
+        # File might still be locked, try again after a short delay
+        try:
+            time.sleep(0.5)
+            os.remove(temp_path)
+        except Exception:
+            # If still can't remove, log but don't fail the request
+            print(f"Warning: Could not remove temp file {temp_path}")
+    except Exception as cleanup_error:
+        # Log but don't fail the request if cleanup fails
+        print(f"Warning: Error removing temp file {temp_path}: {cleanup_error}")
+
+
+def _stream_validation(kind, file_path, cleanup=True):
+    """Stream dry-run validation results as NDJSON (one JSON object per line)"""
+    import json
+    from app.services import ImportService
+    
+    def generate():
+        try:
+            for record in ImportService.validate_file(kind, file_path):
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        except Exception as e:
+            import traceback
+            print(f"Error validating {kind}: {traceback.format_exc()}")
+            yield json.dumps({'type': 'fatal', 'message': f'Ошибка при обработке файла: {str(e)}'}, ensure_ascii=False) + '\n'
+        finally:
+            if cleanup:
+                _remove_temp_file(file_path)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def _is_dry_run():
+    """Whether the request asks for validation only (?dry_run=true)"""
+    return request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+
+def _is_forced():
+    """Whether the request asks to import an already imported file again (?force=true)"""
+    return request.args.get('force', '').lower() in ('1', 'true', 'yes')
+
+
+def _run_import(kind, file_path, file_name, max_errors=None):
+    """Import a saved Excel file and build the JSON response"""
+    from app.services import ImportService
+    
+    try:
+        result = ImportService.import_file(kind, file_path, file_name, force=_is_forced())
+    except Exception as e:
+        import traceback
+        print(f"Error importing {kind}: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'error': f'Ошибка при обработке файла: {str(e)}'
+        }), 500
+    
+    if result['parse_errors'] and not result['total']:
+        return jsonify({
+            'success': False,
+            'error': 'Ошибки при чтении файла',
+            'errors': result['parse_errors']
+        }), 400
+    
+    # Always return success if we got here, even if some rows failed
+    response = {
+        'success': True,
+        'imported': result['imported'],
+        'failed': result['failed'],
+        'total': result['total']
+    }
+    if result['already_imported']:
+        response['already_imported'] = True
+    if result['resumed_from']:
+        response['resumed_from'] = result['resumed_from']
+    if result['parse_errors']:
+        response['parse_errors'] = result['parse_errors']
+    if result['errors']:
+        response['errors'] = result['errors'][:max_errors] if max_errors else result['errors']
+    
+    return jsonify(response)
+
+
+def _import_excel(kind, max_errors=None):
+    """
+    Save the uploaded Excel file and import it (books, customers or issues)
+    Re-uploading a file that was already imported is a no-op (?force=true imports
+    it again), and a file whose import failed part-way resumes from the last committed chunk.
+    With ?dry_run=true the file is only validated and the problems are streamed as NDJSON.
+    """
+    import os
+    import tempfile
+    
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'error': 'Файл не найден'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'success': False, 'error': 'Файл не выбран'}), 400
+    
+    # Check file extension
+    if not file.filename.lower().endswith(('.xlsx', '.xls')):
+        return jsonify({'success': False, 'error': 'Поддерживаются только файлы Excel (.xlsx, .xls)'}), 400
+    
+    # Save file temporarily (unique name, so concurrent uploads don't collide)
+    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1].lower())
+    os.close(fd)
+    
+    try:
+        file.save(temp_path)
+    except Exception as e:
+        _remove_temp_file(temp_path)
+        return jsonify({
+            'success': False,
+            'error': f'Ошибка при обработке файла: {str(e)}'
+        }), 500
+    
+    if _is_dry_run():
+        return _stream_validation(kind, temp_path)
+    
+    try:
+        return _run_import(kind, temp_path, file.filename, max_errors)
+    finally:
+        _remove_temp_file(temp_path)
+
+
 # Note: Authentication is now handled by @jwt_required decorator on each route
 # This allows for more granular control and better error handling
 
@@ -29,10 +175,9 @@ def internal_error(error):
 @api_bp.route('/customers', methods=['GET'])
 @jwt_required
 def get_customers():
-    """Get all customers or search"""
+    """Get all customers or search (streamed from a server-side cursor)"""
     search_term = request.args.get('search', '')
-    customers = CustomerService.search_customers(search_term)
-    return jsonify([c.to_dict() for c in customers])
+    return stream_json_array(CustomerService.stream_customers(search_term))
 
 
 @api_bp.route('/customers/<customer_id>', methods=['GET'])
@@ -82,356 +227,118 @@ def delete_customer(customer_id):
 @admin_required
 def import_customers_from_excel():
     """Import customers from Excel file"""
-    import os
-    import tempfile
-    from werkzeug.utils import secure_filename
-    from app.utils.excel_parser import parse_customers_excel
-    
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'error': 'Файл не найден'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'success': False, 'error': 'Файл не выбран'}), 400
-    
-    # Check file extension
-    if not file.filename.lower().endswith(('.xlsx', '.xls')):
-        return jsonify({'success': False, 'error': 'Поддерживаются только файлы Excel (.xlsx, .xls)'}), 400
-    
-    # Save file temporarily
-    temp_dir = tempfile.gettempdir()
-    temp_filename = secure_filename(file.filename)
-    temp_path = os.path.join(temp_dir, temp_filename)
-    
-    try:
-        file.save(temp_path)
-        
-        # Parse Excel file
-        customers_data = []
-        errors = []
-        try:
-            customers_data, errors = parse_customers_excel(temp_path)
-        except Exception as parse_error:
-            import traceback
-            import time
-            error_details = traceback.format_exc()
-            print(f"Error parsing Excel file: {error_details}")
-            # Clean up temp file with retry logic
-            if os.path.exists(temp_path):
-                try:
-                    time.sleep(0.1)
-                    os.remove(temp_path)
-                except PermissionError:
-                    time.sleep(0.5)
-                    try:
-                        os.remove(temp_path)
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-            return jsonify({
-                'success': False,
-                'error': f'Ошибка при чтении файла: {str(parse_error)}'
-            }), 400
-        
-        if errors and not customers_data:
-            # Clean up temp file with retry logic
-            if os.path.exists(temp_path):
-                try:
-                    import time
-                    time.sleep(0.1)
-                    os.remove(temp_path)
-                except PermissionError:
-                    import time
-                    time.sleep(0.5)
-                    try:
-                        os.remove(temp_path)
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-            return jsonify({
-                'success': False,
-                'error': 'Ошибки при чтении файла',
-                'errors': errors
-            }), 400
-        
-        # Import customers
-        imported_count = 0
-        failed_count = 0
-        import_errors = []
-        
-        for idx, customer_data in enumerate(customers_data):
-            try:
-                # Generate ID if not provided
-                if 'id' not in customer_data or not customer_data['id']:
-                    customer_data['id'] = CustomerService.generate_customer_id()
-                
-                success, message = CustomerService.create_customer(customer_data)
-                if success:
-                    imported_count += 1
-                else:
-                    failed_count += 1
-                    import_errors.append(f"{customer_data.get('name', 'Неизвестный читатель')}: {message}")
-            except Exception as customer_error:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"Error importing customer {idx + 1}: {error_details}")
-                failed_count += 1
-                import_errors.append(f"{customer_data.get('name', 'Неизвестный читатель')}: {str(customer_error)}")
-        
-        # Clean up temp file (with error handling to not fail the request)
-        if os.path.exists(temp_path):
-            try:
-                import time
-                time.sleep(0.1)  # Small delay to ensure file is released
-                os.remove(temp_path)
-            except PermissionError:
-                # File might still be locked, try again after a short delay
-                try:
-                    time.sleep(0.5)
-                    os.remove(temp_path)
-                except Exception:
-                    # If still can't remove, log but don't fail the request
-                    print(f"Warning: Could not remove temp file {temp_path}, but import was successful")
-            except Exception as cleanup_error:
-                # Log but don't fail the request if cleanup fails
-                print(f"Warning: Error removing temp file {temp_path}: {cleanup_error}")
-        
-        # Build result (always return success if we got here, even if some imports failed)
-        try:
-            result = {
-                'success': True,
-                'imported': imported_count,
-                'failed': failed_count,
-                'total': len(customers_data) if customers_data else 0
-            }
-            
-            # Add parse errors if any
-            if errors:
-                result['parse_errors'] = errors
-            
-            # Add import errors if any
-            if import_errors:
-                result['errors'] = import_errors
-            
-            return jsonify(result)
-        except Exception as result_error:
-            # If building result fails, return a simple success response
-            import traceback
-            print(f"Error building result: {traceback.format_exc()}")
-            return jsonify({
-                'success': True,
-                'imported': imported_count,
-                'failed': failed_count,
-                'total': imported_count + failed_count,
-                'message': 'Импорт завершен, но возникла ошибка при формировании детального ответа'
-            })
-        
-    except Exception as e:
-        # Clean up temp file on error (with retry logic for Windows)
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                import time
-                time.sleep(0.1)
-                os.remove(temp_path)
-            except PermissionError:
-                # File might still be locked, try again after a short delay
-                import time
-                time.sleep(0.5)
-                try:
-                    os.remove(temp_path)
-                except Exception:
-                    pass  # Ignore if still can't remove
-            except Exception:
-                pass  # Ignore cleanup errors
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error importing customers: {error_details}")
-        return jsonify({
-            'success': False, 
-            'error': f'Ошибка при обработке файла: {str(e)}'
-        }), 500
+    return _import_excel('customers')
 
 
 @api_bp.route('/issues/import', methods=['POST'])
 @admin_required
 def import_issues_from_excel():
     """Import issues from Excel file"""
-    import os
-    import tempfile
-    from werkzeug.utils import secure_filename
-    from app.utils.excel_parser import parse_issues_excel
+    return _import_excel('issues')
+
+
+# Chunked upload API (files larger than MAX_CONTENT_LENGTH)
+@api_bp.route('/uploads', methods=['POST'])
+@admin_required
+def create_upload():
+    """Start a chunked upload of an import file: {kind, file_name, size}"""
+    from app.services import UploadService
+    from app.services.import_service import IMPORT_KINDS
     
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'error': 'Файл не найден'}), 400
+    data = request.get_json() or {}
+    kind = data.get('kind')
+    if kind not in IMPORT_KINDS:
+        return jsonify({'success': False, 'error': 'Unknown import kind'}), 400
     
-    file = request.files['file']
+    success, message, upload = UploadService.create_upload(kind, data.get('file_name'), data.get('size'))
+    if success:
+        return jsonify({'success': True, **upload}), 201
+    return jsonify({'success': False, 'error': message}), 400
+
+
+@api_bp.route('/uploads/<upload_id>', methods=['GET'])
+@admin_required
+def get_upload(upload_id):
+    """Get upload progress (received bytes is the offset to resume from)"""
+    from app.services import UploadService
     
-    if file.filename == '':
-        return jsonify({'success': False, 'error': 'Файл не выбран'}), 400
+    upload = UploadService.get_upload(upload_id)
+    if upload:
+        return jsonify({'success': True, **upload})
+    return jsonify({'success': False, 'error': 'Upload not found'}), 404
+
+
+@api_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@admin_required
+def put_upload_chunk(upload_id):
+    """
+    Write a chunk of the file (raw request body)
+    The offset comes from ?offset=N or a 'Content-Range: bytes N-M/TOTAL' header.
+    """
+    from app.services import UploadService
+    
+    offset = request.args.get('offset', type=int)
+    content_range = request.headers.get('Content-Range', '')
+    if offset is None and content_range.startswith('bytes '):
+        try:
+            offset = int(content_range[len('bytes '):].split('-', 1)[0])
+        except ValueError:
+            offset = None
+    if offset is None:
+        return jsonify({'success': False, 'error': 'Offset is required'}), 400
+    
+    success, message = UploadService.write_chunk(upload_id, offset, request.stream)
+    upload = UploadService.get_upload(upload_id)
+    if not upload:
+        return jsonify({'success': False, 'error': message}), 404
+    if success:
+        return jsonify({'success': True, **upload})
+    return jsonify({'success': False, 'error': message, **upload}), 409
+
+
+@api_bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@admin_required
+def finalize_upload(upload_id):
+    """Run the import pipeline on a completely received upload (supports ?dry_run=true and ?force=true)"""
+    from app.services import UploadService
     
-    # Check file extension
-    if not file.filename.lower().endswith(('.xlsx', '.xls')):
-        return jsonify({'success': False, 'error': 'Поддерживаются только файлы Excel (.xlsx, .xls)'}), 400
+    success, message, upload = UploadService.finalize(upload_id)
+    if not success:
+        status = 404 if upload is None else 409
+        return jsonify({'success': False, 'error': message, **(upload or {})}), status
     
-    # Save file temporarily
-    temp_dir = tempfile.gettempdir()
-    temp_filename = secure_filename(file.filename)
-    temp_path = os.path.join(temp_dir, temp_filename)
+    # A dry run keeps the spool file so the same upload can be finalized for real afterwards
+    if _is_dry_run():
+        return _stream_validation(upload['kind'], upload['path'], cleanup=False)
     
-    issues_data = []
-    errors = []
     try:
-        file.save(temp_path)
-        
-        # Parse Excel file
-        try:
-            issues_data, errors = parse_issues_excel(temp_path)
-        except Exception as parse_error:
-            import traceback
-            import time
-            error_details = traceback.format_exc()
-            print(f"Error parsing Excel file: {error_details}")
-            # Clean up temp file with retry logic
-            if os.path.exists(temp_path):
-                try:
-                    time.sleep(0.1)
-                    os.remove(temp_path)
-                except PermissionError:
-                    time.sleep(0.5)
-                    try:
-                        os.remove(temp_path)
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-            return jsonify({
-                'success': False,
-                'error': f'Ошибка при чтении файла: {str(parse_error)}'
-            }), 400
-        
-        if errors and not issues_data:
-            # Clean up temp file with retry logic
-            if os.path.exists(temp_path):
-                try:
-                    import time
-                    time.sleep(0.1)
-                    os.remove(temp_path)
-                except PermissionError:
-                    import time
-                    time.sleep(0.5)
-                    try:
-                        os.remove(temp_path)
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-            return jsonify({
-                'success': False,
-                'error': 'Ошибки при чтении файла',
-                'errors': errors
-            }), 400
-        
-        # Import issues
-        imported_count = 0
-        failed_count = 0
-        import_errors = []
-        
-        for idx, issue_data in enumerate(issues_data):
-            try:
-                success, message = IssueService.create_issue_from_import(issue_data)
-                if success:
-                    imported_count += 1
-                else:
-                    failed_count += 1
-                    import_errors.append(f"Строка {idx + 1}: {message}")
-            except Exception as issue_error:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"Error importing issue {idx + 1}: {error_details}")
-                failed_count += 1
-                import_errors.append(f"Строка {idx + 1}: {str(issue_error)}")
-        
-        # Clean up temp file (with error handling to not fail the request)
-        if os.path.exists(temp_path):
-            try:
-                import time
-                time.sleep(0.1)  # Small delay to ensure file is released
-                os.remove(temp_path)
-            except PermissionError:
-                # File might still be locked, try again after a short delay
-                try:
-                    time.sleep(0.5)
-                    os.remove(temp_path)
-                except Exception:
-                    # If still can't remove, log but don't fail the request
-                    print(f"Warning: Could not remove temp file {temp_path}, but import was successful")
-            except Exception as cleanup_error:
-                # Log but don't fail the request if cleanup fails
-                print(f"Warning: Error removing temp file {temp_path}: {cleanup_error}")
-        
-        # Build result (always return success if we got here, even if some imports failed)
-        try:
-            result = {
-                'success': True,
-                'imported': imported_count,
-                'failed': failed_count,
-                'total': len(issues_data) if issues_data else 0
-            }
-            
-            # Add parse errors if any
-            if errors:
-                result['parse_errors'] = errors
-            
-            # Add import errors if any
-            if import_errors:
-                result['errors'] = import_errors
-            
-            return jsonify(result)
-        except Exception as result_error:
-            # If building result fails, return a simple success response
-            import traceback
-            print(f"Error building result: {traceback.format_exc()}")
-            return jsonify({
-                'success': True,
-                'imported': imported_count,
-                'failed': failed_count,
-                'total': imported_count + failed_count,
-                'message': 'Импорт завершен, но возникла ошибка при формировании детального ответа'
-            })
-        
-    except Exception as e:
-        # Clean up temp file on error (with retry logic for Windows)
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                import time
-                time.sleep(0.1)
-                os.remove(temp_path)
-            except PermissionError:
-                # File might still be locked, try again after a short delay
-                import time
-                time.sleep(0.5)
-                try:
-                    os.remove(temp_path)
-                except Exception:
-                    pass  # Ignore if still can't remove
-            except Exception:
-                pass  # Ignore cleanup errors
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error importing issues: {error_details}")
-        return jsonify({
-            'success': False, 
-            'error': f'Ошибка при обработке файла: {str(e)}'
-        }), 500
+        return _run_import(upload['kind'], upload['path'], upload['file_name'],
+                           max_errors=10 if upload['kind'] == 'books' else None)
+    finally:
+        UploadService.discard(upload_id)
+
+
+@api_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@admin_required
+def delete_upload(upload_id):
+    """Abort a chunked upload"""
+    from app.services import UploadService
+    
+    if UploadService.discard(upload_id):
+        return jsonify({'success': True, 'message': 'Upload deleted'})
+    return jsonify({'success': False, 'error': 'Upload not found'}), 404
 
 
 # Book API
 @api_bp.route('/books', methods=['GET'])
+@cached_response(BookService.catalog_version)
 def get_books():
-    """Get all books or search with pagination"""
+    """Get all books or search with pagination (fields= selects fields or profiles, e.g. card)"""
+    try:
+        fields = parse_fields(request.args.get('fields'), Book.FIELDS, Book.PROFILES)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     search_term = request.args.get('search', '')
     available_only = request.args.get('available', 'false').lower() == 'true'
     
@@ -446,23 +353,23 @@ def get_books():
     
     # Use advanced search if any advanced parameter is provided
     if title or author or theme:
-        books = BookService.advanced_search_books(title, author, theme)
+        books = BookService.advanced_search_books(title, author, theme, fields)
         total_count = len(books)
         # Apply pagination to results
         if page is not None:
             offset = (page - 1) * per_page
             books = books[offset:offset + per_page]
         return jsonify({
-            'books': [b.to_dict() for b in books],
+            'books': [b.to_dict(fields) for b in books],
             'total': total_count,
             'page': page or 1,
             'per_page': per_page,
             'total_pages': (total_count + per_page - 1) // per_page if per_page > 0 else 1
         })
     elif available_only:
-        books, total_count = BookService.get_available_books(page, per_page)
+        books, total_count = BookService.get_available_books(page, per_page, fields)
         return jsonify({
-            'books': [b.to_dict() for b in books],
+            'books': [b.to_dict(fields) for b in books],
             'total': total_count,
             'page': page or 1,
             'per_page': per_page,
@@ -470,23 +377,23 @@ def get_books():
         })
     else:
         if search_term:
-            books = BookService.search_books(search_term)
+            books = BookService.search_books(search_term, fields)
             total_count = len(books)
             # Apply pagination to results
             if page is not None:
                 offset = (page - 1) * per_page
                 books = books[offset:offset + per_page]
             return jsonify({
-                'books': [b.to_dict() for b in books],
+                'books': [b.to_dict(fields) for b in books],
                 'total': total_count,
                 'page': page or 1,
                 'per_page': per_page,
                 'total_pages': (total_count + per_page - 1) // per_page if per_page > 0 else 1
             })
         else:
-            books, total_count = BookService.get_all_books(page, per_page)
+            books, total_count = BookService.get_all_books(page, per_page, fields)
             return jsonify({
-                'books': [b.to_dict() for b in books],
+                'books': [b.to_dict(fields) for b in books],
                 'total': total_count,
                 'page': page or 1,
                 'per_page': per_page,
@@ -495,6 +402,7 @@ def get_books():
 
 
 @api_bp.route('/books/<book_id>', methods=['GET'])
+@cached_response(BookService.catalog_version)
 def get_book(book_id):
     """Get book by ID"""
     book = BookService.get_book_by_id(book_id)
@@ -504,10 +412,35 @@ def get_book(book_id):
 
 
 @api_bp.route('/authors', methods=['GET'])
+@cached_response(AuthorService.list_version)
 def get_authors():
-    """Get all authors"""
-    authors = AuthorRepository.find_all()
-    return jsonify([a.to_dict() for a in authors])
+    """
+    Get all authors, or one page of authors without biography when page or search is given
+    fields= selects fields or profiles (card, summary, full)
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'), Author.FIELDS, Author.PROFILES)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    page = request.args.get('page', type=int)
+    per_page = request.args.get('per_page', type=int, default=50)
+    search_term = request.args.get('search', '').strip()
+    
+    if page is None and not search_term:
+        authors = AuthorRepository.find_all(fields)
+        return jsonify([a.to_dict(fields) for a in authors])
+    
+    page = max(page or 1, 1)
+    per_page = min(max(per_page, 1), 200)
+    authors, total_count = AuthorService.get_authors_page(page, per_page, search_term, fields)
+    return jsonify({
+        'authors': [a.to_dict(fields or Author.PROFILES['summary']) for a in authors],
+        'total': total_count,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': (total_count + per_page - 1) // per_page
+    })
 
 
 @api_bp.route('/authors/<int:author_id>', methods=['GET'])
@@ -515,17 +448,37 @@ def get_author(author_id):
     """Get author by ID"""
     author = AuthorRepository.find_by_id(author_id)
     if author:
+        author.book_count = AuthorRepository.count_books(author_id)
         return jsonify(author.to_dict())
     return jsonify({'error': 'Author not found'}), 404
 
 
+@api_bp.route('/authors/<int:author_id>/books', methods=['GET'])
+def get_author_books(author_id):
+    """Get the author's books with cursor pagination"""
+    if not AuthorRepository.find_by_id(author_id):
+        return jsonify({'error': 'Author not found'}), 404
+    
+    limit = request.args.get('limit', type=int, default=20)
+    try:
+        books, next_cursor = AuthorService.get_author_books(author_id, request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'author_id': author_id,
+        'book_count': AuthorRepository.count_books(author_id),
+        'books': books,
+        'next_cursor': next_cursor
+    })
+
+
 @api_bp.route('/authors', methods=['POST'])
 @admin_required
 def create_author():
     """Create new author"""
     data = request.get_json()
     from app.models.author import Author
-    from app.repositories import AuthorRepository
     
     author = Author(
         full_name=data.get('full_name', ''),
@@ -535,9 +488,10 @@ def create_author():
         wikipedia_url=data.get('wikipedia_url')
     )
     
-    if AuthorRepository.create(author):
+    success, message = AuthorService.create_author(author)
+    if success:
         return jsonify({'success': True, 'author': author.to_dict()})
-    return jsonify({'success': False, 'error': 'Failed to create author'}), 400
+    return jsonify({'success': False, 'error': message}), 400
 
 
 @api_bp.route('/authors/<int:author_id>', methods=['PUT'])
@@ -559,20 +513,20 @@ def update_author(author_id):
     existing.biography = data.get('biography')
     existing.wikipedia_url = data.get('wikipedia_url')
     
-    if AuthorRepository.update(existing):
+    success, message = AuthorService.update_author(existing)
+    if success:
         return jsonify({'success': True, 'author': existing.to_dict()})
-    return jsonify({'success': False, 'error': 'Failed to update author'}), 400
+    return jsonify({'success': False, 'error': message}), 400
 
 
 @api_bp.route('/authors/<int:author_id>', methods=['DELETE'])
 @admin_required
 def delete_author(author_id):
     """Delete author"""
-    from app.repositories import AuthorRepository
-    
-    if AuthorRepository.delete(author_id):
-        return jsonify({'success': True, 'message': 'Author deleted successfully'})
-    return jsonify({'success': False, 'error': 'Failed to delete author'}), 400
+    success, message = AuthorService.delete_author(author_id)
+    if success:
+        return jsonify({'success': True, 'message': message})
+    return jsonify({'success': False, 'error': message}), 400
 
 
 @api_bp.route('/books', methods=['POST'])
@@ -608,11 +562,57 @@ def delete_book(book_id):
     return jsonify({'success': False, 'error': message}), 400
 
 
+@api_bp.route('/books', methods=['PATCH'])
+@admin_required
+def bulk_update_books():
+    """Apply partial updates to many books: [{'id', 'total_copies'?, 'available_copies'?, 'category'?}]"""
+    data = request.get_json(silent=True)
+    updates = data.get('updates') if isinstance(data, dict) else data
+    success, message, results = BookService.bulk_update_books(updates)
+    if success:
+        return jsonify({'success': True, 'message': message, 'results': results})
+    return jsonify({'success': False, 'error': message}), 400
+
+
+@api_bp.route('/books', methods=['DELETE'])
+@admin_required
+def bulk_delete_books():
+    """Delete many books: {'ids': [...]}"""
+    data = request.get_json(silent=True)
+    book_ids = data.get('ids') if isinstance(data, dict) else data
+    success, message, results = BookService.bulk_delete_books(book_ids)
+    if success:
+        return jsonify({'success': True, 'message': message, 'results': results})
+    return jsonify({'success': False, 'error': message}), 400
+
+
+@api_bp.route('/books/availability', methods=['GET'])
+@cached_response(BookService.catalog_version)
+def get_books_availability():
+    """Get available copies for books: ?ids=B0001,B0002 -> {id: available_copies}"""
+    book_ids = [book_id.strip() for book_id in request.args.get('ids', '').split(',') if book_id.strip()]
+    try:
+        return jsonify(BookService.get_availability(book_ids))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@api_bp.route('/books/availability', methods=['POST'])
+def post_books_availability():
+    """Get available copies for a long list of books: {'ids': [...]} -> {id: available_copies}"""
+    data = request.get_json(silent=True)
+    book_ids = data.get('ids') if isinstance(data, dict) else data
+    try:
+        return jsonify(BookService.get_availability(book_ids))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
 @api_bp.route('/books/categories', methods=['GET'])
+@cached_response(BookService.catalog_version)
 def get_categories():
-    """Get all unique book categories (themes) from book_themes table"""
-    from app.repositories import BookRepository
-    categories = BookRepository.get_all_categories()
+    """Get all book categories (themes) - served from the in-memory catalog cache"""
+    categories = BookService.get_all_categories()
     return jsonify(categories)
 
 
@@ -620,114 +620,20 @@ def get_categories():
 @admin_required
 def import_books_from_excel():
     """Import books from Excel file"""
-    import os
-    import tempfile
-    from werkzeug.utils import secure_filename
-    from app.utils.excel_parser import parse_books_excel
-    
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'error': 'Файл не найден'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'success': False, 'error': 'Файл не выбран'}), 400
-    
-    # Check file extension
-    if not file.filename.lower().endswith(('.xlsx', '.xls')):
-        return jsonify({'success': False, 'error': 'Поддерживаются только файлы Excel (.xlsx, .xls)'}), 400
-    
-    # Save file temporarily
-    temp_dir = tempfile.gettempdir()
-    temp_filename = secure_filename(file.filename)
-    temp_path = os.path.join(temp_dir, temp_filename)
-    
-    try:
-        file.save(temp_path)
-        
-        # Parse Excel file
-        books_data, errors = parse_books_excel(temp_path)
-        
-        if errors and not books_data:
-            return jsonify({
-                'success': False,
-                'error': 'Ошибки при чтении файла',
-                'errors': errors
-            }), 400
-        
-        # Import books
-        imported_count = 0
-        failed_count = 0
-        import_errors = []
-        
-        for book_data in books_data:
-            success, message = BookService.create_book(book_data)
-            if success:
-                imported_count += 1
-            else:
-                failed_count += 1
-                import_errors.append(f"{book_data.get('title', 'Неизвестная книга')}: {message}")
-        
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        
-        result = {
-            'success': True,
-            'imported': imported_count,
-            'failed': failed_count,
-            'total': len(books_data)
-        }
-        
-        if import_errors:
-            result['errors'] = import_errors[:10]  # Limit errors to first 10
-        
-        if errors:
-            result['parse_errors'] = errors
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        # Clean up temp file on error
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        
-        return jsonify({
-            'success': False,
-            'error': f'Ошибка при обработке файла: {str(e)}'
-        }), 500
+    return _import_excel('books', max_errors=10)
 
 
 # Issue API
 @api_bp.route('/issues', methods=['GET'])
 @jwt_required
 def get_issues():
-    """Get all issues or search"""
+    """Get all issues or search (streamed from a server-side cursor)"""
     search_term = request.args.get('search', '')
     status = request.args.get('status', 'all')  # all, active, returned
     customer_id = request.args.get('customer_id')
     
-    if customer_id:
-        if status == 'active':
-            issues = IssueService.get_customer_active_issues(customer_id)
-        elif status == 'returned':
-            # Filter customer issues by returned status
-            all_customer_issues = IssueService.get_customer_issues(customer_id)
-            issues = [i for i in all_customer_issues if i.status == 'returned']
-        else:
-            issues = IssueService.get_customer_issues(customer_id)
-    elif status == 'active':
-        issues = IssueService.get_active_issues()
-    elif status == 'returned':
-        issues = IssueService.get_returned_issues()
-    else:
-        # status == 'all' or no status filter
-        if search_term:
-            issues = IssueService.search_issues(search_term)
-        else:
-            issues = IssueService.get_all_issues()
-    
-    return jsonify([i.to_dict() for i in issues])
+    issues = IssueService.stream_issues(status, customer_id, search_term)
+    return stream_json_array(issues)
 
 
 @api_bp.route('/issues', methods=['POST'])
@@ -804,9 +710,18 @@ def get_statistics():
 @api_bp.route('/reports/full', methods=['GET'])
 @admin_required
 def get_full_report():
-    """Get full report"""
-    report = IssueService.generate_full_report()
-    return jsonify(report)
+    """Get full report (issue lists streamed from server-side cursors)"""
+    dumps = current_app.json.dumps
+    statistics = IssueService.get_statistics()
+    
+    def generate():
+        yield '{"active_issues":'
+        yield from json_array_chunks(IssueService.stream_issues('active'), dumps)
+        yield ',"overdue_issues":'
+        yield from json_array_chunks(IssueService.stream_overdue_issues(), dumps)
+        yield f',"statistics":{dumps(statistics)}}}'
+    
+    return streamed_json(generate())
 
 
 @api_bp.route('/reports/overdue', methods=['GET'])
@@ -879,34 +794,18 @@ def get_exhibitions():
     
     if current_user and current_user.get('role') == 'admin':
         exhibitions = ExhibitionService.get_all_exhibitions()
-    else:
-        exhibitions = ExhibitionService.get_active_exhibitions()
-    
-    result = []
-    for exhibition in exhibitions:
-        ex_dict = exhibition.to_dict()
         # Include books for active exhibitions
-        if exhibition.is_currently_active():
-            books = ExhibitionService.get_exhibition_with_books(exhibition.id)
-            if books:
-                ex_dict['books'] = books['books']
-        result.append(ex_dict)
+        active_ids = [exhibition.id for exhibition in exhibitions if exhibition.is_currently_active()]
+        return jsonify(ExhibitionService.exhibitions_with_books(exhibitions, active_ids))
     
-    return jsonify(result)
+    return jsonify(ExhibitionService.get_active_exhibitions_with_books())
 
 
 @api_bp.route('/exhibitions/active', methods=['GET'])
 def get_active_exhibitions():
-    """Get active exhibitions (public endpoint for users)"""
-    exhibitions = ExhibitionService.get_active_exhibitions()
-    result = []
-    for exhibition in exhibitions:
-        ex_dict = exhibition.to_dict()
-        books = ExhibitionService.get_exhibition_with_books(exhibition.id)
-        if books:
-            ex_dict['books'] = books['books']
-        result.append(ex_dict)
-    return jsonify(result)
+    """Get active exhibitions with their books (public endpoint for users, served from memory)"""
+    exhibitions, built_at = ExhibitionService.get_active_exhibitions_snapshot()
+    return json_with_etag(exhibitions, last_modified=built_at)
 
 
 @api_bp.route('/exhibitions/<int:exhibition_id>', methods=['GET'])
@@ -1007,3 +906,42 @@ def update_exhibition_book_order(exhibition_id):
         return jsonify({'success': True, 'message': message})
     return jsonify({'success': False, 'error': message}), 400
 
+
+# Metrics API
+@api_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """In-process cache statistics of this worker"""
+    return jsonify({
+        'token_cache': get_token_cache_stats(),
+        'token_revocation': TokenService.get_revocation_stats(),
+        'rate_limits': get_rate_limit_stats(),
+        'author_cache': AuthorService.get_cache_stats(),
+        'catalog_cache': BookService.get_cache_stats(),
+        'exhibition_cache': ExhibitionService.get_cache_stats(),
+        'response_cache': get_response_cache_stats()
+    })
+
+
+# Event stream (Server-Sent Events)
+USER_EVENT_TYPES = ('availability',)  # Admins receive every event type
+
+
+@api_bp.route('/stream/events', methods=['GET'])
+@jwt_required
+def stream_events():
+    """
+    Server-Sent Events: availability changes for everyone; new issues, returns
+    and overdue transitions (issue_created, issue_returned, issue_overdue) for admins.
+    A resync event means events were missed and the client should refetch.
+    """
+    event_types = None if request.current_user.get('role') == 'admin' else USER_EVENT_TYPES
+    subscription = open_subscription(event_types)
+    if subscription is None:
+        return jsonify({'error': 'Too many open event streams, try again later'}), 503, {'Retry-After': '30'}
+    
+    response = Response(event_stream(subscription, current_app.json.dumps), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # No proxy buffering (nginx)
+    response.call_on_close(lambda: close_subscription(subscription))
+    return response
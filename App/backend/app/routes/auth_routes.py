@@ -2,7 +2,9 @@
 Authentication routes
 """
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from app.services import AuthService
+from app.services import AuthService, TokenService
+from app.utils.rate_limiter import check_login_rate
+from app.utils.session_store import regenerate_session
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -20,6 +22,16 @@ def login():
             email = request.form.get('email')
             password = request.form.get('password')
         
+        # Throttle before any database or password hashing work
+        retry_after = check_login_rate(request.remote_addr, email)
+        if retry_after:
+            error_msg = 'Слишком много попыток входа. Попробуйте позже.'
+            if request.is_json:
+                response = jsonify({'success': False, 'error': error_msg})
+            else:
+                response = render_template('auth/login.html', error=error_msg)
+            return response, 429, {'Retry-After': str(retry_after)}
+        
         success, user, message = AuthService.login(email, password)
         
         if success:
@@ -34,7 +46,9 @@ def login():
             # Generate JWT token
             token = AuthService.generate_user_token(user)
             
-            # Store user info in session (for backward compatibility)
+            # Store user info in session (for backward compatibility), under a new
+            # session ID so an ID planted before login does not become authenticated
+            regenerate_session(session)
             session['user_id'] = user.id
             session['user_email'] = user.email
             session['user_role'] = user.role
@@ -78,8 +92,16 @@ def login():
 @auth_bp.route('/logout', methods=['GET', 'POST'])
 def logout():
     """Logout"""
-    # Clear session
+    from app.utils.jwt_utils import get_token_from_header
+    
+    # Revoke the tokens of this login (API token and the one kept in the session)
+    for token in {get_token_from_header(request.headers.get('Authorization')), session.get('jwt_token')}:
+        if token:
+            TokenService.revoke_token(token)
+    
+    # Clear session (and drop its ID: anything stored afterwards, e.g. the flash message, gets a new one)
     session.clear()
+    regenerate_session(session)
     
     # If API request, return JSON
     if request.is_json or request.method == 'POST':
@@ -92,7 +114,7 @@ def logout():
 @auth_bp.route('/api/verify', methods=['GET', 'POST'])
 def verify_token():
     """Verify JWT token endpoint"""
-    from app.utils.jwt_utils import verify_token, get_token_from_header
+    from app.utils.jwt_utils import get_token_from_header
     
     auth_header = request.headers.get('Authorization')
     token = get_token_from_header(auth_header)
@@ -100,7 +122,7 @@ def verify_token():
     if not token:
         return jsonify({'valid': False, 'error': 'Token not provided'}), 401
     
-    payload = verify_token(token)
+    payload = TokenService.authenticate(token)
     if payload:
         return jsonify({
             'valid': True,
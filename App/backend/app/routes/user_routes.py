@@ -2,7 +2,9 @@
 User routes - Pages for regular users
 """
 from flask import Blueprint, render_template, session, redirect, url_for, flash, request
-from app.utils.jwt_utils import verify_token, get_token_from_header
+from app.services import TokenService
+from app.utils.decorators import sync_session_user
+from app.utils.jwt_utils import get_token_from_header
 
 user_bp = Blueprint('user', __name__)
 
@@ -14,14 +16,10 @@ def require_user():
     token = get_token_from_header(auth_header)
     
     if token:
-        payload = verify_token(token)
+        payload = TokenService.authenticate(token)
         if payload:
-            # Set session from JWT for template compatibility
-            session['user_id'] = payload.get('user_id')
-            session['user_email'] = payload.get('email')
-            session['user_role'] = payload.get('role')
-            session['user_name'] = payload.get('name')
-            session['customer_id'] = payload.get('customer_id')
+            # Set session from JWT for template compatibility (written only when it differs)
+            sync_session_user(payload)
             if not session.get('customer_id'):
                 flash('Ошибка профиля пользователя', 'danger')
                 return redirect(url_for('auth.login'))
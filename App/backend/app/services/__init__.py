@@ -6,6 +6,13 @@ from app.services.book_service import BookService
 from app.services.issue_service import IssueService
 from app.services.auth_service import AuthService
 from app.services.exhibition_service import ExhibitionService
+from app.services.author_service import AuthorService
+from app.services.import_service import ImportService
+from app.services.upload_service import UploadService
+from app.services.token_service import TokenService
 
-__all__ = ['CustomerService', 'BookService', 'IssueService', 'AuthService', 'ExhibitionService']
+__all__ = [
+    'CustomerService', 'BookService', 'IssueService', 'AuthService', 'ExhibitionService',
+    'AuthorService', 'ImportService', 'UploadService', 'TokenService'
+]
 
@@ -4,6 +4,7 @@ Authentication Service - Business logic for authentication
 from typing import Optional, Tuple
 from app.models import User, Customer
 from app.repositories import UserRepository, CustomerRepository
+from app.services.token_service import TokenService
 from app.utils.jwt_utils import generate_token
 
 
@@ -48,14 +49,8 @@ class AuthService:
             return False, None, "Email уже зарегистрирован"
         
         # Create customer first
-        # Generate customer ID
-        import random
-        import string
-        customer_id = 'C' + ''.join(random.choices(string.digits, k=4))
-        
-        # Check if customer ID is unique
-        while CustomerRepository.find_by_id(customer_id):
-            customer_id = 'C' + ''.join(random.choices(string.digits, k=4))
+        # Generate customer ID (from the customer ID sequence, no retry loop)
+        customer_id = CustomerRepository.generate_unique_id()
         
         # Create customer
         customer = Customer(
@@ -147,6 +142,7 @@ class AuthService:
             user.email = new_email
         
         # Update password if provided
+        password_changed = False
         if 'password' in profile_data and profile_data['password']:
             if 'current_password' not in profile_data:
                 return False, "Требуется текущий пароль для изменения пароля"
@@ -159,11 +155,16 @@ class AuthService:
                 return False, "Пароль должен быть минимум 6 символов"
             
             user.password_hash = User.hash_password(profile_data['password'])
+            password_changed = True
         
         # Update user in database
         if not UserRepository.update(user):
             return False, "Ошибка обновления профиля"
         
+        # Tokens issued with the old password stop working
+        if password_changed:
+            TokenService.revoke_user_tokens(user_id)
+        
         # Update customer data if exists
         if user.customer_id and 'customer' in profile_data:
             customer = CustomerRepository.find_by_id(user.customer_id)
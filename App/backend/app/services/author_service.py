@@ -0,0 +1,157 @@
+"""
+Author Service - Business logic for author operations
+"""
+import base64
+import binascii
+import threading
+from typing import Iterable, List, Optional
+from app.models.author import Author
+from app.repositories import AuthorRepository
+from app.services.book_service import BookService
+from app.utils.cache import LRUCache
+from app.utils.invalidation import publish, subscribe
+from config import AUTHOR_CACHE_SIZE
+
+
+class AuthorService:
+    """Service for author business logic"""
+    
+    # Normalized author name -> author ID (per worker, invalidated on author update/delete)
+    _id_cache = LRUCache(maxsize=AUTHOR_CACHE_SIZE)
+    
+    # Bumped by author changes (author lists also show book counts, see list_version)
+    _version = 0
+    _version_lock = threading.Lock()
+    
+    @staticmethod
+    def resolve_author_id(full_name: str, wikipedia_url: str = None) -> Optional[int]:
+        """
+        Get the ID of the author with this name (case, whitespace and ё/е insensitive),
+        creating the author if needed
+        Without a wikipedia_url to store this is usually a cache hit; otherwise it is
+        one statement on the normalized name index.
+        """
+        normalized_name = Author.normalize_name(full_name)
+        if not normalized_name:
+            return None
+        
+        if not wikipedia_url:
+            author_id = AuthorService._id_cache.get(normalized_name)
+            if author_id is not None:
+                return author_id
+        
+        author_id = AuthorRepository.get_or_create_id(' '.join(full_name.split()), wikipedia_url)
+        if author_id is not None:
+            AuthorService._id_cache.set(normalized_name, author_id)
+        return author_id
+    
+    @staticmethod
+    def _invalidate(author_id: Optional[int]) -> None:
+        """Drop cached data about this author in all workers (names and books that show the author)"""
+        AuthorService._evict(author_id)
+        BookService.catalog_changed()
+        publish('author', author_id)
+    
+    @staticmethod
+    def list_version() -> tuple:
+        """Version of this worker's author lists (changes with every author or catalog change)"""
+        return AuthorService._version, BookService.catalog_version()
+    
+    @staticmethod
+    def _evict(author_id) -> None:
+        """
+        Drop this worker's cached names that resolve to the author (all names if author_id is None)
+        and cached author lists
+        """
+        with AuthorService._version_lock:
+            AuthorService._version += 1
+        if author_id is None:
+            AuthorService._id_cache.clear()
+            return
+        author_id = int(author_id)
+        AuthorService._id_cache.delete_where(lambda name, cached_id: cached_id == author_id)
+    
+    @staticmethod
+    def create_author(author: Author) -> tuple[bool, str]:
+        """
+        Create a new author
+        Returns: (success: bool, message: str)
+        """
+        if not (author.full_name or '').strip():
+            return False, "Author name is required"
+        if AuthorRepository.find_id_by_normalized_name(Author.normalize_name(author.full_name)):
+            return False, "Author with this name already exists"
+        if AuthorRepository.create(author):
+            AuthorService._invalidate(None)
+            return True, "Author created successfully"
+        return False, "Failed to create author"
+    
+    @staticmethod
+    def update_author(author: Author) -> tuple[bool, str]:
+        """
+        Update author
+        Returns: (success: bool, message: str)
+        """
+        if not (author.full_name or '').strip():
+            return False, "Author name is required"
+        existing_id = AuthorRepository.find_id_by_normalized_name(Author.normalize_name(author.full_name))
+        if existing_id and existing_id != author.id:
+            return False, "Author with this name already exists"
+        
+        success = AuthorRepository.update(author)
+        AuthorService._invalidate(author.id)
+        if success:
+            return True, "Author updated successfully"
+        return False, "Failed to update author"
+    
+    @staticmethod
+    def delete_author(author_id: int) -> tuple[bool, str]:
+        """
+        Delete author
+        Returns: (success: bool, message: str)
+        """
+        success = AuthorRepository.delete(author_id)
+        AuthorService._invalidate(author_id)
+        if success:
+            return True, "Author deleted successfully"
+        return False, "Failed to delete author"
+    
+    @staticmethod
+    def get_authors_page(page: int, per_page: int, search_term: str = None, fields: Iterable[str] = None) -> tuple[List[Author], int]:
+        """
+        Get one page of authors (by default the summary projection with book counts)
+        Returns: (authors: List[Author], total: int)
+        """
+        return AuthorRepository.find_page(page, per_page, (search_term or '').strip() or None, fields)
+    
+    @staticmethod
+    def get_author_books(author_id: int, cursor: str = None, limit: int = 20) -> tuple[List[dict], Optional[str]]:
+        """
+        Get one page of the author's books
+        The cursor is an opaque token for the last book of the previous page.
+        Returns: (books: List[dict], next_cursor: Optional[str])
+        Raises: ValueError if the cursor is malformed
+        """
+        limit = min(max(limit or 20, 1), 100)
+        after_book_id = None
+        if cursor:
+            try:
+                after_book_id = base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+            except (UnicodeError, binascii.Error):
+                raise ValueError("Invalid cursor")
+        
+        # One extra row tells whether there is a next page
+        books = AuthorRepository.find_books(author_id, after_book_id, limit + 1)
+        next_cursor = None
+        if len(books) > limit:
+            books = books[:limit]
+            next_cursor = base64.urlsafe_b64encode(books[-1]['id'].encode('utf-8')).decode('ascii')
+        return books, next_cursor
+    
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """Author name cache statistics"""
+        return AuthorService._id_cache.stats()
+
+
+subscribe('author', AuthorService._evict)
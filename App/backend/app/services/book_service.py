@@ -1,46 +1,169 @@
 """
 Book Service - Business logic for book operations
 """
-from typing import List, Optional
+from itertools import repeat
+from typing import Iterable, List, Optional
+from app.database import get_db_connection
 from app.models import Book
 from app.repositories import BookRepository
+from app.utils.cache import LRUCache, VersionedCache
+from app.utils.invalidation import publish, subscribe
+from config import (
+    AVAILABILITY_CACHE_SIZE, AVAILABILITY_MAX_IDS, BULK_BOOK_MAX_ITEMS,
+    CATALOG_CACHE_SECONDS, CATALOG_CACHE_SIZE, CATEGORIES_CACHE_SECONDS
+)
+
+# Fields that can be changed with a bulk update
+BULK_UPDATE_FIELDS = ('total_copies', 'available_copies', 'category')
+
+BULK_UPDATE_ERRORS = {
+    'not_found': "Book not found",
+    'invalid': "Available copies cannot exceed total copies",
+}
+
+_MISSING = object()
+
+
+def _normalize_query(value: Optional[str]) -> str:
+    """Search text as used in cache keys (searches are case-insensitive ILIKE)"""
+    return (value or '').strip().lower()
 
 
 class BookService:
     """Service for book business logic"""
     
+    # Derived catalog data (category list), invalidated by catalog_changed()
+    _catalog_cache = VersionedCache(max_age=CATEGORIES_CACHE_SECONDS)
+    
+    # Catalog reads (pages, single books, search results) keyed by catalog version + normalized query
+    _query_cache = LRUCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_SECONDS)
+    
+    # Available copies per book ID (None for unknown IDs), evicted per book by catalog changes
+    _availability_cache = LRUCache(maxsize=AVAILABILITY_CACHE_SIZE, ttl=CATALOG_CACHE_SECONDS)
+    
+    @staticmethod
+    def catalog_changed(book_id: str = None) -> None:
+        """
+        Invalidate cached catalog data (call after committed book/theme/availability changes)
+        Other workers are notified over the invalidation channel.
+        """
+        BookService._invalidate_catalog(book_id)
+        publish('book', book_id)
+    
     @staticmethod
-    def get_all_books(page: int = None, per_page: int = None) -> tuple[List[Book], int]:
+    def _invalidate_catalog(book_id: str = None) -> None:
+        """
+        Invalidate this worker's cached catalog data
+        Bumping the version makes every cached read unreachable; old entries age out of the LRU.
+        Cached availability is evicted for the changed book only (all books if unknown).
         """
-        Get all books with optional pagination
+        BookService._catalog_cache.invalidate()
+        if book_id is None:
+            BookService._availability_cache.clear()
+        else:
+            BookService._availability_cache.delete(str(book_id))
+    
+    @staticmethod
+    def _cached(key: tuple, loader):
+        """Read-through lookup in the catalog cache for the current catalog version"""
+        version = BookService._catalog_cache.version
+        value = BookService._query_cache.get((version,) + key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            BookService._query_cache.set((version,) + key, value)
+        return value
+    
+    @staticmethod
+    def catalog_version() -> int:
+        """Version of this worker's catalog data (changes with every book, theme or availability change)"""
+        return BookService._catalog_cache.version
+    
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """Catalog cache statistics"""
+        return {
+            'version': BookService._catalog_cache.version,
+            **BookService._query_cache.stats(),
+            'availability': BookService._availability_cache.stats()
+        }
+    
+    @staticmethod
+    def get_availability(book_ids: list) -> dict:
+        """
+        Get available copies for many books (cached per book, misses read in one query)
+        Returns: {book_id: available_copies} for the books that exist
+        Raises: ValueError if book_ids is not a list of at most AVAILABILITY_MAX_IDS IDs
+        """
+        if not isinstance(book_ids, list) or not book_ids:
+            raise ValueError("A list of book IDs is required")
+        if len(book_ids) > AVAILABILITY_MAX_IDS:
+            raise ValueError(f"At most {AVAILABILITY_MAX_IDS} book IDs can be requested at once")
+        
+        cache = BookService._availability_cache
+        availability = {}
+        missing = []
+        for book_id in dict.fromkeys(str(book_id) for book_id in book_ids if book_id):
+            value = cache.get(book_id, _MISSING)
+            if value is _MISSING:
+                missing.append(book_id)
+            else:
+                availability[book_id] = value
+        
+        if missing:
+            # A change committed while loading bumps the version; don't cache what may be stale
+            version = BookService._catalog_cache.version
+            loaded = BookRepository.find_availability(missing)
+            for book_id in missing:
+                availability[book_id] = loaded.get(book_id)
+                if BookService._catalog_cache.version == version:
+                    cache.set(book_id, loaded.get(book_id))
+        
+        return {book_id: copies for book_id, copies in availability.items() if copies is not None}
+    
+    @staticmethod
+    def get_all_categories() -> List[str]:
+        """Get all book categories (served from the in-memory catalog cache)"""
+        return BookService._catalog_cache.get('categories', BookRepository.get_all_categories)
+    
+    @staticmethod
+    def get_all_books(page: int = None, per_page: int = None, fields: Iterable[str] = None) -> tuple[List[Book], int]:
+        """
+        Get all books with optional pagination (only the given fields, if any)
         Returns: (books: List[Book], total_count: int)
         """
-        return BookRepository.find_all(page, per_page)
+        fields = tuple(fields) if fields is not None else None
+        return BookService._cached(('all', page, per_page, fields), lambda: BookRepository.find_all(page, per_page, fields))
     
     @staticmethod
-    def get_available_books(page: int = None, per_page: int = None) -> tuple[List[Book], int]:
+    def get_available_books(page: int = None, per_page: int = None, fields: Iterable[str] = None) -> tuple[List[Book], int]:
         """
-        Get all available books with optional pagination
+        Get all available books with optional pagination (only the given fields, if any)
         Returns: (books: List[Book], total_count: int)
         """
-        return BookRepository.find_available(page, per_page)
+        fields = tuple(fields) if fields is not None else None
+        return BookService._cached(('available', page, per_page, fields), lambda: BookRepository.find_available(page, per_page, fields))
     
     @staticmethod
     def get_book_by_id(book_id: str) -> Optional[Book]:
         """Get book by ID"""
-        return BookRepository.find_by_id(book_id)
+        return BookService._cached(('book', book_id), lambda: BookRepository.find_by_id(book_id))
     
     @staticmethod
-    def search_books(search_term: str) -> List[Book]:
-        """Search books"""
+    def search_books(search_term: str, fields: Iterable[str] = None) -> List[Book]:
+        """Search books (only the given fields, if any)"""
+        fields = tuple(fields) if fields is not None else None
         if not search_term:
-            return BookRepository.find_all()
-        return BookRepository.search(search_term)
+            return BookRepository.find_all(fields=fields)
+        search_term = search_term.strip()
+        key = ('search', _normalize_query(search_term), fields)
+        return BookService._cached(key, lambda: BookRepository.search(search_term, fields))
     
     @staticmethod
-    def advanced_search_books(title: str = None, author: str = None, theme: str = None) -> List[Book]:
-        """Advanced search books by title, author, and/or theme"""
-        return BookRepository.advanced_search(title, author, theme)
+    def advanced_search_books(title: str = None, author: str = None, theme: str = None, fields: Iterable[str] = None) -> List[Book]:
+        """Advanced search books by title, author, and/or theme (only the given fields, if any)"""
+        fields = tuple(fields) if fields is not None else None
+        key = ('advanced', _normalize_query(title), _normalize_query(author), _normalize_query(theme), fields)
+        return BookService._cached(key, lambda: BookRepository.advanced_search(title, author, theme, fields))
     
     @staticmethod
     def create_book(book_data: dict) -> tuple[bool, str]:
@@ -80,7 +203,7 @@ class BookService:
         
         if authors_info:
             # Use authors_info if provided (includes wikipedia_url)
-            from app.repositories import AuthorRepository
+            from app.services.author_service import AuthorService
             author_ids = []
             
             for author_info in authors_info:
@@ -94,37 +217,18 @@ class BookService:
                 if not author_name:
                     continue
                 
-                # Try to find existing author
-                existing_authors = AuthorRepository.search(author_name)
-                author = None
-                
-                # Find exact match
-                for existing in existing_authors:
-                    if existing.full_name.lower() == author_name.lower():
-                        author = existing
-                        break
-                
-                # If not found, create new author
-                if not author:
-                    from app.models.author import Author
-                    new_author = Author(full_name=author_name, wikipedia_url=wikipedia_url)
-                    if AuthorRepository.create(new_author):
-                        author = AuthorRepository.find_by_id(new_author.id)
-                else:
-                    # Update existing author's wikipedia_url if provided
-                    if wikipedia_url and author.wikipedia_url != wikipedia_url:
-                        author.wikipedia_url = wikipedia_url
-                        AuthorRepository.update(author)
-                
-                if author and author.id:
-                    author_ids.append(author.id)
+                # Find existing author by normalized name (or create it),
+                # storing wikipedia_url if provided
+                author_id = AuthorService.resolve_author_id(author_name, wikipedia_url)
+                if author_id:
+                    author_ids.append(author_id)
             
             # Set authors for the book
             if author_ids:
                 BookRepository.set_authors(book_data['id'], author_ids)
         elif author_names:
             # Fallback to author_names if authors_info not provided
-            from app.repositories import AuthorRepository
+            from app.services.author_service import AuthorService
             author_ids = []
             
             for author_name in author_names:
@@ -132,25 +236,10 @@ class BookService:
                     continue
                 
                 author_name = author_name.strip()
-                # Try to find existing author
-                existing_authors = AuthorRepository.search(author_name)
-                author = None
-                
-                # Find exact match
-                for existing in existing_authors:
-                    if existing.full_name.lower() == author_name.lower():
-                        author = existing
-                        break
-                
-                # If not found, create new author
-                if not author:
-                    from app.models.author import Author
-                    new_author = Author(full_name=author_name)
-                    if AuthorRepository.create(new_author):
-                        author = AuthorRepository.find_by_id(new_author.id)
-                
-                if author and author.id:
-                    author_ids.append(author.id)
+                # Find existing author by normalized name (or create it)
+                author_id = AuthorService.resolve_author_id(author_name)
+                if author_id:
+                    author_ids.append(author_id)
             
             # Set authors for the book
             if author_ids:
@@ -166,20 +255,100 @@ class BookService:
         covers = book_data.get('covers', [])
         if covers:
             from app.repositories import BookCoverRepository
-            from app.models.book_cover import BookCover
-            
-            # Delete existing covers
-            BookCoverRepository.delete_by_book_id(book_data['id'])
             
-            # Create new covers
+            file_names = []
             for cover_data in covers:
                 file_name = cover_data.get('file_name', '') if isinstance(cover_data, dict) else str(cover_data)
                 if file_name:
-                    cover = BookCover(book_id=book_data['id'], file_name=file_name)
-                    BookCoverRepository.create(cover)
+                    file_names.append(file_name)
+            
+            # Replace covers (only the changed ones are written)
+            BookCoverRepository.set_for_book(book_data['id'], file_names)
         
+        BookService.catalog_changed(book_data['id'])
         return True, f"Book created successfully with ID: {book_data['id']}"
     
+    @staticmethod
+    def import_books(books_data: List[dict], conn=None, dry_run: bool = False,
+                     state: dict = None) -> tuple[int, List[tuple[int, str]]]:
+        """
+        Import books in bulk (for Excel import)
+        Rows are matched to existing books by ID, or by ISBN when the row has no ID,
+        and upserted with one multi-row statement, so importing the same file twice
+        creates no duplicates. IDs for new books are allocated from the book ID
+        sequence in one block; categories are written as book themes in bulk.
+        With dry_run the rows are only validated (read-only).
+        state: dict passed with every chunk of one file, so duplicates are found across chunks.
+        Returns: (imported_count: int, failures: List[(row_number, message)])
+        """
+        failures = []
+        state = state if state is not None else {}
+        
+        isbn_owners = BookRepository.find_ids_by_isbns(
+            {row['isbn'] for row in books_data if row.get('isbn') and not row.get('id')}, conn=conn
+        )
+        
+        # Resolve natural keys and drop duplicates within the file
+        seen_ids = state.setdefault('seen_ids', set())
+        seen_isbns = state.setdefault('seen_isbns', set())
+        accepted = []
+        for row_number, book_data in enumerate(books_data, start=1):
+            if not book_data.get('title'):
+                failures.append((row_number, "Book title is required"))
+                continue
+            
+            isbn = book_data.get('isbn')
+            book_id = book_data.get('id') or (isbn_owners.get(isbn) if isbn else None)
+            
+            if (book_id and book_id in seen_ids) or (not book_id and isbn and isbn in seen_isbns):
+                failures.append((row_number, "Duplicate book in file"))
+                continue
+            
+            if book_id:
+                seen_ids.add(book_id)
+            if isbn:
+                seen_isbns.add(isbn)
+            accepted.append((row_number, book_id, book_data))
+        
+        # Allocate IDs for all new rows without one in a single block
+        if dry_run:
+            new_ids = repeat('')
+        else:
+            new_ids = iter(BookRepository.allocate_ids(
+                sum(1 for _, book_id, _ in accepted if not book_id), conn=conn
+            ))
+        
+        books = []
+        book_themes = {}
+        for row_number, book_id, book_data in accepted:
+            total_copies = book_data.get('total_copies', 1)
+            try:
+                book = Book.from_dict({
+                    **book_data,
+                    'id': book_id or next(new_ids),
+                    'total_copies': total_copies,
+                    'available_copies': book_data.get('available_copies', total_copies)
+                })
+            except (ValueError, TypeError) as e:
+                failures.append((row_number, str(e)))
+                continue
+            books.append(book)
+            if book.id:
+                # Later chunks find new books by ISBN in the database
+                seen_ids.add(book.id)
+            
+            category = (book_data.get('category') or '').strip()
+            if category:
+                book_themes[book.id] = category
+        
+        # Unchanged books are matched but not rewritten
+        if not dry_run:
+            BookRepository.upsert_many(books, conn=conn)
+            BookRepository.set_single_theme_many(book_themes, conn=conn)
+        
+        failures.sort()
+        return len(books), failures
+    
     @staticmethod
     def update_book(book_data: dict) -> tuple[bool, str]:
         """
@@ -208,7 +377,7 @@ class BookService:
         
         if authors_info is not None:  # Explicitly provided (even if empty list)
             # Use authors_info if provided (includes wikipedia_url)
-            from app.repositories import AuthorRepository
+            from app.services.author_service import AuthorService
             author_ids = []
             
             for author_info in authors_info:
@@ -222,30 +391,11 @@ class BookService:
                 if not author_name:
                     continue
                 
-                # Try to find existing author
-                existing_authors = AuthorRepository.search(author_name)
-                author = None
-                
-                # Find exact match
-                for existing in existing_authors:
-                    if existing.full_name.lower() == author_name.lower():
-                        author = existing
-                        break
-                
-                # If not found, create new author
-                if not author:
-                    from app.models.author import Author
-                    new_author = Author(full_name=author_name, wikipedia_url=wikipedia_url)
-                    if AuthorRepository.create(new_author):
-                        author = AuthorRepository.find_by_id(new_author.id)
-                else:
-                    # Update existing author's wikipedia_url if provided
-                    if wikipedia_url and author.wikipedia_url != wikipedia_url:
-                        author.wikipedia_url = wikipedia_url
-                        AuthorRepository.update(author)
-                
-                if author and author.id:
-                    author_ids.append(author.id)
+                # Find existing author by normalized name (or create it),
+                # storing wikipedia_url if provided
+                author_id = AuthorService.resolve_author_id(author_name, wikipedia_url)
+                if author_id:
+                    author_ids.append(author_id)
             
             # Set authors for the book (this will replace existing)
             if author_ids:
@@ -254,7 +404,7 @@ class BookService:
                 # Remove all authors if empty list provided
                 BookRepository.set_authors(book_id, [])
         elif author_names is not None:  # Fallback to author_names
-            from app.repositories import AuthorRepository
+            from app.services.author_service import AuthorService
             author_ids = []
             
             for author_name in author_names:
@@ -262,25 +412,10 @@ class BookService:
                     continue
                 
                 author_name = author_name.strip()
-                # Try to find existing author
-                existing_authors = AuthorRepository.search(author_name)
-                author = None
-                
-                # Find exact match
-                for existing in existing_authors:
-                    if existing.full_name.lower() == author_name.lower():
-                        author = existing
-                        break
-                
-                # If not found, create new author
-                if not author:
-                    from app.models.author import Author
-                    new_author = Author(full_name=author_name)
-                    if AuthorRepository.create(new_author):
-                        author = AuthorRepository.find_by_id(new_author.id)
-                
-                if author and author.id:
-                    author_ids.append(author.id)
+                # Find existing author by normalized name (or create it)
+                author_id = AuthorService.resolve_author_id(author_name)
+                if author_id:
+                    author_ids.append(author_id)
             
             # Set authors for the book (this will replace existing)
             if author_ids:
@@ -302,18 +437,17 @@ class BookService:
         covers = book_data.get('covers', [])
         if covers is not None:  # Explicitly provided (even if empty list)
             from app.repositories import BookCoverRepository
-            from app.models.book_cover import BookCover
-            
-            # Delete existing covers
-            BookCoverRepository.delete_by_book_id(book_id)
             
-            # Create new covers
+            file_names = []
             for cover_data in covers:
                 file_name = cover_data.get('file_name', '') if isinstance(cover_data, dict) else str(cover_data)
                 if file_name:
-                    cover = BookCover(book_id=book_id, file_name=file_name)
-                    BookCoverRepository.create(cover)
+                    file_names.append(file_name)
+            
+            # Replace covers (only the changed ones are written)
+            BookCoverRepository.set_for_book(book_id, file_names)
         
+        BookService.catalog_changed(book_id)
         return True, "Book updated successfully"
     
     @staticmethod
@@ -337,6 +471,7 @@ class BookService:
         try:
             success = BookRepository.delete(book_id)
             if success:
+                BookService.catalog_changed(book_id)
                 return True, "Книга успешно удалена"
             return False, "Не удалось удалить книгу"
         except Exception as e:
@@ -345,5 +480,117 @@ class BookService:
             if 'foreign key' in error_msg.lower() or 'constraint' in error_msg.lower():
                 return False, f"Не удалось удалить книгу: есть связанные записи. {error_msg}"
             return False, f"Ошибка при удалении книги: {error_msg}"
+    
+    @staticmethod
+    def _validate_bulk_update(update) -> Optional[str]:
+        """Check one bulk update item, returns an error message or None"""
+        if not isinstance(update, dict) or not update.get('id'):
+            return "Book ID is required"
+        unknown = set(update) - {'id', *BULK_UPDATE_FIELDS}
+        if unknown:
+            return f"Fields cannot be changed in bulk: {', '.join(sorted(unknown))}"
+        if not any(update.get(field) is not None for field in BULK_UPDATE_FIELDS):
+            return "Nothing to update"
+        for field in ('total_copies', 'available_copies'):
+            value = update.get(field)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+                return f"{field} must be a non-negative integer"
+        category = update.get('category')
+        if category is not None and not isinstance(category, str):
+            return "category must be a string"
+        return None
+    
+    @staticmethod
+    def bulk_update_books(updates: list) -> tuple[bool, str, List[dict]]:
+        """
+        Apply partial updates (total_copies, available_copies, category) to many books
+        All valid updates are applied with set-based statements in one transaction;
+        category replaces the book's themes (an empty string removes them).
+        Returns: (success: bool, message: str, results: [{'id', 'success', 'error'?}])
+        """
+        if not isinstance(updates, list) or not updates:
+            return False, "A list of book updates is required", []
+        if len(updates) > BULK_BOOK_MAX_ITEMS:
+            return False, f"At most {BULK_BOOK_MAX_ITEMS} books can be updated at once", []
+        
+        errors = {}
+        valid = []
+        seen_ids = set()
+        for index, update in enumerate(updates):
+            error = BookService._validate_bulk_update(update)
+            if not error and str(update['id']) in seen_ids:
+                error = "Duplicate book ID"
+            if error:
+                errors[index] = error
+                continue
+            update = {**update, 'id': str(update['id'])}
+            if isinstance(update.get('category'), str):
+                update['category'] = update['category'].strip()
+            seen_ids.add(update['id'])
+            valid.append(update)
+        
+        outcomes = {}
+        if valid:
+            try:
+                with get_db_connection() as conn:
+                    outcomes = BookRepository.update_stock_many(valid, conn=conn)
+                    categories = {
+                        update['id']: update['category'] for update in valid
+                        if update.get('category') is not None and outcomes.get(update['id']) == 'updated'
+                    }
+                    BookRepository.set_single_theme_many(
+                        {book_id: name for book_id, name in categories.items() if name}, conn=conn
+                    )
+                    BookRepository.clear_themes_many(
+                        [book_id for book_id, name in categories.items() if not name], conn=conn
+                    )
+            except Exception as e:
+                print(f"Error in bulk_update_books: {e}")
+                return False, f"Error updating books: {str(e)}", []
+            BookService.catalog_changed()
+        
+        results = []
+        for index, update in enumerate(updates):
+            book_id = update.get('id') if isinstance(update, dict) else None
+            if index in errors:
+                results.append({'id': book_id, 'success': False, 'error': errors[index]})
+                continue
+            outcome = outcomes.get(str(book_id))
+            if outcome == 'updated':
+                results.append({'id': book_id, 'success': True})
+            else:
+                results.append({'id': book_id, 'success': False, 'error': BULK_UPDATE_ERRORS.get(outcome, "Book not found")})
+        
+        updated_count = sum(1 for result in results if result['success'])
+        return True, f"Updated {updated_count} of {len(updates)} books", results
+    
+    @staticmethod
+    def bulk_delete_books(book_ids: list) -> tuple[bool, str, List[dict]]:
+        """
+        Delete many books in one statement (related data goes via CASCADE, see delete_book)
+        Returns: (success: bool, message: str, results: [{'id', 'success', 'error'?}])
+        """
+        if not isinstance(book_ids, list) or not book_ids:
+            return False, "A list of book IDs is required", []
+        if len(book_ids) > BULK_BOOK_MAX_ITEMS:
+            return False, f"At most {BULK_BOOK_MAX_ITEMS} books can be deleted at once", []
+        
+        try:
+            with get_db_connection() as conn:
+                deleted = BookRepository.delete_many({str(book_id) for book_id in book_ids if book_id}, conn=conn)
+        except Exception as e:
+            print(f"Error in bulk_delete_books: {e}")
+            return False, f"Ошибка при удалении книг: {str(e)}", []
+        if deleted:
+            BookService.catalog_changed()
+        
+        results = []
+        for book_id in book_ids:
+            if book_id and str(book_id) in deleted:
+                results.append({'id': book_id, 'success': True})
+            else:
+                results.append({'id': book_id, 'success': False, 'error': "Книга не найдена"})
+        return True, f"Удалено книг: {len(deleted)}", results
 
 
+subscribe('book', BookService._invalidate_catalog)
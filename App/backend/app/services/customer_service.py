@@ -1,7 +1,8 @@
 """
 Customer Service - Business logic for customer operations
 """
-from typing import List, Optional
+from itertools import repeat
+from typing import Iterator, List, Optional
 from app.models import Customer
 from app.repositories import CustomerRepository
 
@@ -26,6 +27,11 @@ class CustomerService:
             return CustomerRepository.find_all()
         return CustomerRepository.search(search_term)
     
+    @staticmethod
+    def stream_customers(search_term: str = None) -> Iterator[Customer]:
+        """Stream all customers, or those matching the search term"""
+        return CustomerRepository.stream(search_term or None)
+    
     @staticmethod
     def create_customer(customer_data: dict) -> tuple[bool, str]:
         """
@@ -101,6 +107,82 @@ class CustomerService:
             return True, "Customer deleted successfully"
         return False, "Failed to delete customer"
     
+    @staticmethod
+    def import_customers(customers_data: List[dict], conn=None, dry_run: bool = False,
+                         state: dict = None) -> tuple[int, List[tuple[int, str]]]:
+        """
+        Import customers in bulk (for Excel import)
+        Rows are matched to existing customers by ID, or by email when the row has no ID,
+        and upserted with one multi-row statement, so importing the same file twice
+        creates no duplicates. IDs for new customers are allocated from the customer ID
+        sequence in one block. With dry_run the rows are only validated (read-only).
+        state: dict passed with every chunk of one file, so duplicates are found across chunks.
+        Returns: (imported_count: int, failures: List[(row_number, message)])
+        """
+        failures = []
+        state = state if state is not None else {}
+        
+        provided_ids = {row['id'] for row in customers_data if row.get('id')}
+        provided_emails = {row['email'].lower() for row in customers_data if row.get('email')}
+        _, email_owners = CustomerRepository.find_existing_keys(provided_ids, provided_emails, conn=conn)
+        
+        # Resolve natural keys and drop duplicates within the file
+        seen_ids = state.setdefault('seen_ids', set())
+        seen_emails = state.setdefault('seen_emails', set())
+        accepted = []
+        for row_number, customer_data in enumerate(customers_data, start=1):
+            if not customer_data.get('name'):
+                failures.append((row_number, "Customer name is required"))
+                continue
+            
+            customer_id = customer_data.get('id')
+            email = (customer_data.get('email') or '').lower()
+            email_owner = email_owners.get(email) if email else None
+            
+            if email_owner:
+                if customer_id and customer_id != email_owner:
+                    failures.append((row_number, "Customer with this email already exists"))
+                    continue
+                customer_id = email_owner
+            
+            # Email first: later chunks find customers created by earlier ones by email
+            if email and email in seen_emails:
+                failures.append((row_number, "Customer with this email already exists"))
+                continue
+            if customer_id and customer_id in seen_ids:
+                failures.append((row_number, "Customer with this ID already exists"))
+                continue
+            
+            if customer_id:
+                seen_ids.add(customer_id)
+            if email:
+                seen_emails.add(email)
+            accepted.append((row_number, customer_id, customer_data))
+        
+        # Allocate IDs for all new rows without one in a single block
+        if dry_run:
+            new_ids = repeat('')
+        else:
+            new_ids = iter(CustomerRepository.allocate_ids(
+                sum(1 for _, customer_id, _ in accepted if not customer_id), conn=conn
+            ))
+        
+        customers = []
+        for row_number, customer_id, customer_data in accepted:
+            try:
+                customer = Customer.from_dict({**customer_data, 'id': customer_id or next(new_ids)})
+            except (ValueError, TypeError) as e:
+                failures.append((row_number, str(e)))
+                continue
+            customers.append(customer)
+        
+        # Unchanged customers are matched but not rewritten
+        if not dry_run:
+            CustomerRepository.upsert_many(customers, conn=conn)
+        
+        failures.sort()
+        return len(customers), failures
+    
     @staticmethod
     def generate_customer_id() -> str:
         """Generate a unique customer ID"""
@@ -1,15 +1,43 @@
 """
 Exhibition Service - Business logic for exhibition operations
 """
-from typing import List, Optional, Dict
-from datetime import date
+import threading
+from typing import Iterable, List, Optional, Dict
+from datetime import date, datetime, timezone
 from app.models import Exhibition, Book
 from app.repositories import ExhibitionRepository, BookRepository
+from app.services.book_service import BookService
+from app.utils.cache import LRUCache
+from app.utils.invalidation import publish, subscribe
+from config import EXHIBITION_CACHE_MAX_SECONDS
 
 
 class ExhibitionService:
     """Service for exhibition business logic"""
     
+    # Active exhibitions with books and their build time, keyed by (exhibition version,
+    # catalog version) and expiring at the next date on which an exhibition starts or ends
+    _active_cache = LRUCache(maxsize=4)
+    _version = 0  # Bumped by exhibition changes
+    _version_lock = threading.Lock()
+    
+    @staticmethod
+    def _exhibitions_changed(exhibition_id: int = None) -> None:
+        """Invalidate cached exhibitions here and in the other workers (call after committed changes)"""
+        ExhibitionService._invalidate(exhibition_id)
+        publish('exhibition', exhibition_id)
+    
+    @staticmethod
+    def _invalidate(exhibition_id=None) -> None:
+        """Invalidate this worker's cached exhibitions (entries of older versions age out)"""
+        with ExhibitionService._version_lock:
+            ExhibitionService._version += 1
+    
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """Active exhibitions cache statistics"""
+        return {'version': ExhibitionService._version, **ExhibitionService._active_cache.stats()}
+    
     @staticmethod
     def get_all_exhibitions() -> List[Exhibition]:
         """Get all exhibitions"""
@@ -32,13 +60,59 @@ class ExhibitionService:
         if not exhibition:
             return None
         
-        books = ExhibitionRepository.get_books(exhibition_id)
+        books = ExhibitionRepository.find_books_for_exhibitions([exhibition_id]).get(exhibition_id, [])
         
         return {
             'exhibition': exhibition.to_dict(),
             'books': [book.to_dict() for book in books]
         }
     
+    @staticmethod
+    def exhibitions_with_books(exhibitions: List[Exhibition], with_books: Iterable[int] = None) -> List[Dict]:
+        """
+        Exhibitions as dictionaries, with 'books' for the exhibition IDs in with_books (all if None)
+        The books of all exhibitions are read in one query.
+        """
+        ids = [exhibition.id for exhibition in exhibitions] if with_books is None else list(with_books)
+        books = ExhibitionRepository.find_books_for_exhibitions(ids)
+        result = []
+        for exhibition in exhibitions:
+            ex_dict = exhibition.to_dict()
+            if exhibition.id in ids:
+                ex_dict['books'] = [book.to_dict() for book in books.get(exhibition.id, [])]
+            result.append(ex_dict)
+        return result
+    
+    @staticmethod
+    def get_active_exhibitions_with_books() -> List[Dict]:
+        """Get currently active exhibitions with their books, served from memory"""
+        return ExhibitionService.get_active_exhibitions_snapshot()[0]
+    
+    @staticmethod
+    def get_active_exhibitions_snapshot() -> tuple[List[Dict], datetime]:
+        """
+        Get currently active exhibitions with their books and when they were read, served from memory
+        A miss costs three queries (exhibitions, their books, next date boundary).
+        Book changes are covered by the catalog version in the key.
+        Returns: (exhibitions: List[Dict], built_at: datetime)
+        """
+        key = (ExhibitionService._version, BookService.catalog_version())
+        snapshot = ExhibitionService._active_cache.get(key)
+        if snapshot is not None:
+            return snapshot
+        
+        today = date.today()
+        built_at = datetime.now(timezone.utc)
+        result = ExhibitionService.exhibitions_with_books(ExhibitionRepository.find_active())
+        snapshot = (result, built_at)
+        ttl = EXHIBITION_CACHE_MAX_SECONDS
+        boundary = ExhibitionRepository.find_next_boundary(today)
+        if boundary is not None:
+            ttl = min(ttl, (datetime.combine(boundary, datetime.min.time()) - datetime.now()).total_seconds())
+        if ttl > 0:
+            ExhibitionService._active_cache.set(key, snapshot, ttl=ttl)
+        return snapshot
+    
     @staticmethod
     def create_exhibition(exhibition_data: dict) -> tuple[bool, str, Optional[int]]:
         """
@@ -80,6 +154,7 @@ class ExhibitionService:
         exhibition_id = ExhibitionRepository.create(exhibition)
         
         if exhibition_id:
+            ExhibitionService._exhibitions_changed(exhibition_id)
             return True, "Exhibition created successfully", exhibition_id
         return False, "Failed to create exhibition", None
     
@@ -130,6 +205,7 @@ class ExhibitionService:
         success = ExhibitionRepository.update(exhibition)
         
         if success:
+            ExhibitionService._exhibitions_changed(exhibition_id)
             return True, "Exhibition updated successfully"
         return False, "Failed to update exhibition"
     
@@ -147,6 +223,7 @@ class ExhibitionService:
         success = ExhibitionRepository.delete(exhibition_id)
         
         if success:
+            ExhibitionService._exhibitions_changed(exhibition_id)
             return True, "Exhibition deleted successfully"
         return False, "Failed to delete exhibition"
     
@@ -174,6 +251,7 @@ class ExhibitionService:
         success = ExhibitionRepository.add_book(exhibition_id, book_id, display_order)
         
         if success:
+            ExhibitionService._exhibitions_changed(exhibition_id)
             return True, "Book added to exhibition successfully"
         return False, "Failed to add book to exhibition"
     
@@ -191,6 +269,7 @@ class ExhibitionService:
         success = ExhibitionRepository.remove_book(exhibition_id, book_id)
         
         if success:
+            ExhibitionService._exhibitions_changed(exhibition_id)
             return True, "Book removed from exhibition successfully"
         return False, "Failed to remove book from exhibition"
     
@@ -208,6 +287,7 @@ class ExhibitionService:
         success = ExhibitionRepository.update_book_order(exhibition_id, book_orders)
         
         if success:
+            ExhibitionService._exhibitions_changed(exhibition_id)
             return True, "Book order updated successfully"
         return False, "Failed to update book order"
     
@@ -225,7 +305,10 @@ class ExhibitionService:
         success = ExhibitionRepository.update(exhibition)
         
         if success:
+            ExhibitionService._exhibitions_changed(exhibition_id)
             status = "activated" if exhibition.is_active else "deactivated"
             return True, f"Exhibition {status} successfully"
         return False, "Failed to update exhibition status"
 
+
+subscribe('exhibition', ExhibitionService._invalidate)
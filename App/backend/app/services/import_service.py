@@ -0,0 +1,184 @@
+"""
+Import Service - Business logic for Excel imports
+"""
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from app.database import get_db_connection
+from app.repositories import ImportJobRepository
+from app.services.book_service import BookService
+from app.services.customer_service import CustomerService
+from app.services.issue_service import IssueService
+from app.utils.events import emit
+from app.utils.excel_parser import collect_rows, iter_books_excel, iter_customers_excel, iter_issues_excel
+from config import IMPORT_CHUNK_SIZE
+
+
+def _book_error(row: dict, row_number: int, message: str) -> str:
+    return f"{row.get('title', 'Неизвестная книга')}: {message}"
+
+
+def _customer_error(row: dict, row_number: int, message: str) -> str:
+    return f"{row.get('name', 'Неизвестный читатель')}: {message}"
+
+
+def _issue_error(row: dict, row_number: int, message: str) -> str:
+    return f"Строка {row_number}: {message}"
+
+
+# kind -> (row reader, bulk import handler, error formatter)
+IMPORT_KINDS = {
+    'books': (iter_books_excel, BookService.import_books, _book_error),
+    'customers': (iter_customers_excel, CustomerService.import_customers, _customer_error),
+    'issues': (iter_issues_excel, IssueService.import_issues, _issue_error),
+}
+
+
+def _read_chunks(items: Iterable[Tuple[Optional[Dict], Optional[str]]],
+                 size: int) -> Iterator[Tuple[List[Dict], List[str]]]:
+    """Group parsed (row, error) items into (rows, parse_errors) chunks of at most size rows"""
+    rows, errors = [], []
+    for row, error in items:
+        if error is None:
+            rows.append(row)
+        else:
+            errors.append(error)
+        if len(rows) == size:
+            yield rows, errors
+            rows, errors = [], []
+    if rows or errors:
+        yield rows, errors
+
+
+class ImportService:
+    """Service for idempotent, resumable Excel imports"""
+    
+    @staticmethod
+    def file_checksum(file_path: str) -> str:
+        """SHA-256 of the file content (read in blocks)"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def import_file(kind: str, file_path: str, file_name: str = None, force: bool = False) -> dict:
+        """
+        Import an Excel file of the given kind (books, customers, issues)
+        The file is identified by its content hash. Rows are written in chunks of
+        IMPORT_CHUNK_SIZE, each committed together with the job progress, so a failed
+        import resumes from the last committed chunk when the same file is uploaded
+        again. A file that was already imported completely is not parsed again,
+        unless force is set: then it is imported again from the first row.
+        Returns: dict with imported, failed, total, parse_errors, errors,
+                 already_imported and resumed_from
+        """
+        reader, handler, format_error = IMPORT_KINDS[kind]
+        checksum = ImportService.file_checksum(file_path)
+        
+        job = ImportJobRepository.find_by_checksum(kind, checksum)
+        if job and job.status == 'completed' and not force:
+            return {
+                'imported': job.imported_count,
+                'failed': job.failed_count,
+                'total': job.total_rows,
+                'parse_errors': [],
+                'errors': [],
+                'already_imported': True,
+                'resumed_from': 0
+            }
+        
+        rows, parse_errors = collect_rows(reader(file_path))
+        result = {
+            'imported': 0,
+            'failed': 0,
+            'total': len(rows),
+            'parse_errors': parse_errors,
+            'errors': [],
+            'already_imported': False,
+            'resumed_from': 0
+        }
+        if not rows:
+            return result
+        
+        job = ImportJobRepository.start(kind, checksum, file_name, len(rows), restart=force)
+        result['resumed_from'] = job.committed_rows
+        errors: List[str] = []
+        state = {}  # Handler state carried across chunks (duplicates within the file)
+        if job.committed_rows:
+            # Resuming: replay the committed chunks read-only to rebuild the state, so
+            # rows repeating them are still found (their results were counted before)
+            with get_db_connection() as conn:
+                for offset in range(0, job.committed_rows, IMPORT_CHUNK_SIZE):
+                    handler(rows[offset:offset + IMPORT_CHUNK_SIZE], conn=conn, dry_run=True, state=state)
+        try:
+            for offset in range(job.committed_rows, len(rows), IMPORT_CHUNK_SIZE):
+                chunk = rows[offset:offset + IMPORT_CHUNK_SIZE]
+                # One transaction per chunk: data and progress commit (or roll back) together
+                with get_db_connection() as conn:
+                    imported_count, failures = handler(chunk, conn=conn, state=state)
+                    ImportJobRepository.record_chunk(
+                        job.id, offset + len(chunk), imported_count, len(failures), conn=conn
+                    )
+                if kind in ('books', 'issues'):
+                    BookService.catalog_changed()
+                if kind == 'issues':
+                    # Too many changes for single events: streams refetch
+                    emit('resync', {})
+                errors.extend(
+                    format_error(chunk[row_number - 1], offset + row_number, message)
+                    for row_number, message in failures
+                )
+        except Exception:
+            ImportJobRepository.set_status(job.id, 'failed')
+            raise
+        
+        ImportJobRepository.set_status(job.id, 'completed')
+        job = ImportJobRepository.find_by_checksum(kind, checksum)
+        result['imported'] = job.imported_count
+        result['failed'] = job.failed_count
+        result['errors'] = errors
+        return result
+    
+    @staticmethod
+    def validate_file(kind: str, file_path: str) -> Iterator[dict]:
+        """
+        Dry run: parse the file and run the reference checks without writing anything
+        Yields problems as they are found - {'type': 'parse_error', 'message'} and
+        {'type': 'error', 'row', 'message'} - followed by one {'type': 'summary'} record.
+        The file is read and checked in chunks of IMPORT_CHUNK_SIZE rows, each on its
+        own read-only transaction, and a chunk's problems are yielded before the next
+        chunk is read. Duplicates and copy counts are tracked across chunks.
+        """
+        reader, handler, format_error = IMPORT_KINDS[kind]
+        
+        state = {}
+        total = valid_count = failed_count = parse_error_count = 0
+        for chunk, parse_errors in _read_chunks(reader(file_path), IMPORT_CHUNK_SIZE):
+            for message in parse_errors:
+                yield {'type': 'parse_error', 'message': message}
+            parse_error_count += len(parse_errors)
+            if not chunk:
+                continue
+            
+            with get_db_connection() as conn:
+                conn.set_session(readonly=True)
+                chunk_valid, failures = handler(chunk, conn=conn, dry_run=True, state=state)
+            
+            for row_number, message in failures:
+                yield {
+                    'type': 'error',
+                    'row': total + row_number,
+                    'message': format_error(chunk[row_number - 1], total + row_number, message)
+                }
+            total += len(chunk)
+            valid_count += chunk_valid
+            failed_count += len(failures)
+        
+        yield {
+            'type': 'summary',
+            'total': total,
+            'valid': valid_count,
+            'failed': failed_count,
+            'parse_errors': parse_error_count
+        }
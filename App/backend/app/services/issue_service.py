@@ -1,16 +1,52 @@
 """
 Issue Service - Business logic for book issue (loan) operations
 """
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import datetime
 from app.models import Issue
 from app.repositories import IssueRepository, BookRepository, CustomerRepository
+from app.services.book_service import BookService
+from app.utils.events import add_watcher, emit
 from config import LOAN_PERIOD_DAYS, MAX_BOOKS_PER_USER
 
 
 class IssueService:
     """Service for book issue business logic"""
     
+    # IDs of the issues that were overdue at the last watcher run (None: not tracking)
+    _overdue_ids = None
+    
+    @staticmethod
+    def _circulation_changed(event_type: str, issue: Issue) -> None:
+        """
+        After a committed checkout or return: invalidate the catalog and send the
+        issue and the book's new availability to the event streams
+        """
+        BookService.catalog_changed(issue.book_id)
+        emit(event_type, issue.to_dict())
+        try:
+            availability = BookService.get_availability([issue.book_id])
+        except Exception as e:
+            print(f"Error reading availability for events: {e}")
+            return
+        if issue.book_id in availability:
+            emit('availability', {'book_id': issue.book_id, 'available_copies': availability[issue.book_id]})
+    
+    @staticmethod
+    def _watch_overdue(streams_open: bool) -> None:
+        """Event watcher: send issues that became overdue since the last run (no query without streams)"""
+        if not streams_open:
+            IssueService._overdue_ids = None
+            return
+        overdue = IssueRepository.get_overdue()
+        known = IssueService._overdue_ids
+        IssueService._overdue_ids = {issue.id for issue in overdue}
+        if known is None:
+            return
+        for issue in overdue:
+            if issue.id not in known:
+                emit('issue_overdue', issue.to_dict(), broadcast=False)
+    
     @staticmethod
     def get_all_issues() -> List[Issue]:
         """Get all issues"""
@@ -87,6 +123,8 @@ class IssueService:
         if not BookRepository.decrease_available_copies(book_id):
             return False, "Failed to update book availability"
         
+        issue.id = issue_id
+        IssueService._circulation_changed('issue_created', issue)
         return True, "Book issued successfully"
     
     @staticmethod
@@ -112,8 +150,25 @@ class IssueService:
         if not BookRepository.increase_available_copies(issue.book_id):
             return False, "Failed to update book availability"
         
+        IssueService._circulation_changed('issue_returned', IssueRepository.find_by_id(issue_id) or issue)
         return True, "Book returned successfully"
     
+    @staticmethod
+    def stream_issues(status: str = 'all', customer_id: str = None, search_term: str = None) -> Iterator[Issue]:
+        """
+        Stream issues for the list endpoint: by customer and/or status ('all', 'active',
+        'returned'); the search term applies to the unfiltered list only
+        """
+        status = {'active': 'issued', 'returned': 'returned'}.get(status)
+        if customer_id or status:
+            search_term = None
+        return IssueRepository.stream(status=status, customer_id=customer_id, search_term=search_term or None)
+    
+    @staticmethod
+    def stream_overdue_issues() -> Iterator[Issue]:
+        """Stream all overdue issues"""
+        return IssueRepository.stream_overdue()
+    
     @staticmethod
     def get_overdue_issues() -> List[Issue]:
         """Get all overdue issues"""
@@ -150,7 +205,7 @@ class IssueService:
         stats['total_customers'] = len(customers)
         
         # Add book count
-        books, total_books_count = BookRepository.find_all()
+        books, total_books_count = BookRepository.find_all(fields=('id', 'available_copies'))
         stats['total_books'] = total_books_count
         stats['available_books'] = len([b for b in books if b.is_available])
         
@@ -159,19 +214,6 @@ class IssueService:
         
         return stats
     
-    @staticmethod
-    def generate_full_report() -> dict:
-        """Generate comprehensive report"""
-        stats = IssueService.get_statistics()
-        active_issues = IssueRepository.find_active()
-        overdue_issues = IssueService.get_overdue_issues()
-        
-        return {
-            'statistics': stats,
-            'active_issues': [issue.to_dict() for issue in active_issues],
-            'overdue_issues': [issue.to_dict() for issue in overdue_issues]
-        }
-    
     @staticmethod
     def generate_overdue_report() -> List[dict]:
         """Generate overdue books report"""
@@ -212,63 +254,136 @@ class IssueService:
         Create an issue from imported data (for Excel import)
         Returns: (success: bool, message: str)
         """
-        # Validate required fields
-        if not issue_data.get('book_id'):
-            return False, "Book ID is required"
-        if not issue_data.get('customer_id'):
-            return False, "Customer ID is required"
-        if not issue_data.get('date_issued'):
-            return False, "Date of issue is required"
-        
-        # Validate book exists
-        book = BookRepository.find_by_id(issue_data['book_id'])
-        if not book:
-            return False, f"Book with ID '{issue_data['book_id']}' not found"
-        
-        # Use book title from database if not provided in import
-        book_title = issue_data.get('book_title') or book.title
-        
-        # Validate customer exists
-        customer = CustomerRepository.find_by_id(issue_data['customer_id'])
-        if not customer:
-            return False, f"Customer with ID '{issue_data['customer_id']}' not found"
-        
-        # Use customer name from database if not provided in import
-        customer_name = issue_data.get('customer_name') or customer.name
-        
-        # Determine status
-        status = issue_data.get('status', 'issued')
-        date_return = issue_data.get('date_return')
-        
-        # If status is 'issued', check if book is available
-        if status == 'issued':
-            # Check if book has available copies
-            if book.available_copies <= 0:
-                return False, f"Book '{book_title}' is not available (no copies left)"
-        
-        # Create issue
-        issue = Issue(
-            id=None,
-            book_id=issue_data['book_id'],
-            book_title=book_title,
-            customer_id=issue_data['customer_id'],
-            customer_name=customer_name,
-            date_issued=issue_data['date_issued'],
-            date_return=date_return,
-            status=status
-        )
-        
-        issue_id = IssueRepository.create(issue)
-        if not issue_id:
+        try:
+            imported_count, failures = IssueService.import_issues([issue_data])
+        except Exception:
             return False, "Failed to create issue"
-        
-        # Update book availability only if status is 'issued'
-        if status == 'issued':
-            if not BookRepository.decrease_available_copies(issue_data['book_id']):
-                # Rollback: delete the issue we just created
-                IssueRepository.delete(issue_id)
-                return False, "Failed to update book availability"
-        
-        return True, f"Issue created successfully (ID: {issue_id})"
+        if imported_count:
+            BookService.catalog_changed()
+            emit('resync', {})
+            return True, "Issue created successfully"
+        return False, failures[0][1] if failures else "Failed to create issue"
+    
+    @staticmethod
+    def import_issues(issues_data: List[dict], conn=None, dry_run: bool = False,
+                      state: dict = None) -> tuple[int, List[tuple[int, str]]]:
+        """
+        Import issues in bulk (for Excel import)
+        Referenced books and customers are prefetched with two set queries,
+        availability is tracked in memory for the whole batch, and the valid
+        issues are written together with their copy decrements in bulk.
+        Issues are keyed by (book, customer, date of issue): rows that already
+        exist are counted as imported without being written again, and a row
+        repeating an earlier row of the file is reported as a duplicate.
+        With dry_run the rows are only validated (read-only).
+        state: dict passed with every chunk of one file, so repeated rows and copy
+        counts are tracked across chunks (a dry run writes nothing the next chunk could read).
+        Loans of a book whose copies were taken meanwhile by other loans are rejected
+        by the bulk write and reported as not available.
+        Returns: (imported_count: int, failures: List[(row_number, message)])
+        """
+        state = state if state is not None else {}
+        book_refs = BookRepository.find_refs_by_ids(
+            {row['book_id'] for row in issues_data if row.get('book_id')}, conn=conn
+        )
+        customer_names = CustomerRepository.find_names_by_ids(
+            {row['customer_id'] for row in issues_data if row.get('customer_id')}, conn=conn
+        )
+        existing_keys = IssueRepository.find_existing_keys(
+            {
+                (row['book_id'], row['customer_id'], str(row['date_issued']))
+                for row in issues_data
+                if row.get('book_id') and row.get('customer_id') and row.get('date_issued')
+            },
+            conn=conn
+        )
+        seen_keys = state.setdefault('keys', set())
+        # A dry run writes nothing: later chunks continue from the counts of earlier ones
+        available = state.setdefault('available', {})
+        for book_id, ref in book_refs.items():
+            if not dry_run or book_id not in available:
+                available[book_id] = ref['available_copies']
+        
+        issues = []
+        issue_rows = []  # Row number of each issue
+        matched_count = 0
+        failures = []
+        for row_number, issue_data in enumerate(issues_data, start=1):
+            # Validate required fields
+            if not issue_data.get('book_id'):
+                failures.append((row_number, "Book ID is required"))
+                continue
+            if not issue_data.get('customer_id'):
+                failures.append((row_number, "Customer ID is required"))
+                continue
+            if not issue_data.get('date_issued'):
+                failures.append((row_number, "Date of issue is required"))
+                continue
+            
+            # Validate book exists
+            book_id = issue_data['book_id']
+            book_ref = book_refs.get(book_id)
+            if not book_ref:
+                failures.append((row_number, f"Book with ID '{book_id}' not found"))
+                continue
+            
+            # Use book title from database if not provided in import
+            book_title = issue_data.get('book_title') or book_ref['title']
+            
+            # Validate customer exists
+            customer_id = issue_data['customer_id']
+            if customer_id not in customer_names:
+                failures.append((row_number, f"Customer with ID '{customer_id}' not found"))
+                continue
+            
+            # Use customer name from database if not provided in import
+            customer_name = issue_data.get('customer_name') or customer_names[customer_id]
+            
+            key = (book_id, customer_id, str(issue_data['date_issued']))
+            if key in seen_keys:
+                failures.append((row_number, "Duplicate issue in file"))
+                continue
+            seen_keys.add(key)
+            
+            # Already imported (earlier run of this or another file)
+            if key in existing_keys:
+                matched_count += 1
+                continue
+            
+            # Determine status
+            status = issue_data.get('status', 'issued')
+            
+            # If status is 'issued', the book must still have a copy left in this batch
+            if status == 'issued':
+                if available[book_id] <= 0:
+                    failures.append((row_number, f"Book '{book_title}' is not available (no copies left)"))
+                    continue
+                available[book_id] -= 1
+            
+            issues.append(Issue(
+                id=None,
+                book_id=book_id,
+                book_title=book_title,
+                customer_id=customer_id,
+                customer_name=customer_name,
+                date_issued=issue_data['date_issued'],
+                date_return=issue_data.get('date_return'),
+                status=status
+            ))
+            issue_rows.append(row_number)
+        
+        if dry_run:
+            return matched_count + len(issues), failures
+        
+        created_count, unavailable = IssueRepository.create_many(issues, conn=conn)
+        if unavailable:
+            failures.extend(
+                (row_number, f"Book '{issue.book_title}' is not available (no copies left)")
+                for row_number, issue in zip(issue_rows, issues)
+                if issue.status == 'issued' and issue.book_id in unavailable
+            )
+            failures.sort()
+        return matched_count + created_count, failures
 
 
+add_watcher(IssueService._watch_overdue)
@@ -0,0 +1,156 @@
+"""
+Token Service - JWT verification and revocation
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from app.repositories import RevokedTokenRepository
+from app.utils.bloom import BloomFilter
+from app.utils.invalidation import publish, subscribe
+from app.utils.jwt_utils import verify_token, forget_token
+from config import JWT_EXPIRATION_HOURS, TOKEN_REVOCATION_REFRESH_SECONDS, TOKEN_REVOCATION_FILTER_CAPACITY
+
+
+class TokenService:
+    """
+    Service for token verification with revocation
+    Revoked token IDs are held in a per-worker Bloom filter and per-user revocation
+    times in a dict, both reloaded from the revocation store every
+    TOKEN_REVOCATION_REFRESH_SECONDS and updated right away from invalidation
+    notifications, so only tokens that hit the filter cost a database query.
+    """
+    
+    _filter = BloomFilter(TOKEN_REVOCATION_FILTER_CAPACITY)  # jti:<token ID> keys
+    _user_revocations = {}  # user:<user ID> -> revoked_at (replaced, never modified in place)
+    _loaded_at = None  # time.monotonic() of the last successful reload
+    _refresh_lock = threading.Lock()
+    _stats = {'checks': 0, 'filter_hits': 0, 'revoked': 0}
+    _stats_lock = threading.Lock()
+    
+    @staticmethod
+    def refresh_revocations() -> None:
+        """Reload the revocation filter from the database"""
+        try:
+            revocations = RevokedTokenRepository.find_active()
+        except Exception as e:
+            # Keep the current filter; the next request tries again
+            print(f"Error loading revoked tokens: {e}")
+            return
+        user_revocations = {key: revoked_at for key, revoked_at in revocations if key.startswith('user:')}
+        keys = [key for key, _ in revocations if key not in user_revocations]
+        revoked = BloomFilter(max(TOKEN_REVOCATION_FILTER_CAPACITY, 2 * len(keys)))
+        revoked.update(keys)
+        TokenService._filter = revoked
+        TokenService._user_revocations = user_revocations
+        TokenService._loaded_at = time.monotonic()
+    
+    @staticmethod
+    def _revocation_published(key: str = None) -> None:
+        """
+        Another worker revoked a key: add a token ID to this worker's filter, reload
+        for user revocations (their time is in the store) or unknown keys
+        """
+        if key and key.startswith('jti:'):
+            TokenService._filter.add(key)
+        else:
+            TokenService.refresh_revocations()
+    
+    @staticmethod
+    def _count(*names: str) -> None:
+        """Increment statistics counters"""
+        with TokenService._stats_lock:
+            for name in names:
+                TokenService._stats[name] += 1
+    
+    @staticmethod
+    def _ensure_fresh() -> None:
+        """Reload the filter when it is older than the refresh interval (one thread reloads)"""
+        loaded_at = TokenService._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < TOKEN_REVOCATION_REFRESH_SECONDS:
+            return
+        if TokenService._refresh_lock.acquire(blocking=loaded_at is None):
+            try:
+                if TokenService._loaded_at == loaded_at:
+                    TokenService.refresh_revocations()
+            finally:
+                TokenService._refresh_lock.release()
+    
+    @staticmethod
+    def is_revoked(payload: Dict) -> bool:
+        """Check a verified token payload against the revocation store"""
+        TokenService._ensure_fresh()
+        TokenService._count('checks')
+        
+        jti = payload.get('jti')
+        if jti and f"jti:{jti}" in TokenService._filter:
+            if RevokedTokenRepository.find_revoked_at(f"jti:{jti}") is not None:
+                TokenService._count('filter_hits', 'revoked')
+                return True
+            TokenService._count('filter_hits')
+        
+        # Per-user revocations are checked in memory (tokens issued after them stay valid)
+        revoked_at = TokenService._user_revocations.get(f"user:{payload.get('user_id')}")
+        if revoked_at is not None and datetime.utcfromtimestamp(payload.get('iat', 0)) < revoked_at:
+            TokenService._count('revoked')
+            return True
+        return False
+    
+    @staticmethod
+    def authenticate(token: str) -> Optional[Dict]:
+        """
+        Verify a token and check that it has not been revoked
+        Returns: token payload, or None if the token is invalid, expired or revoked
+        """
+        payload = verify_token(token)
+        if payload is None or TokenService.is_revoked(payload):
+            return None
+        return payload
+    
+    @staticmethod
+    def revoke_token(token: str) -> bool:
+        """
+        Revoke one token (e.g. on logout)
+        Tokens issued before jti was added can only be revoked with revoke_user_tokens.
+        """
+        payload = verify_token(token)
+        if not payload or not payload.get('jti'):
+            return False
+        key = f"jti:{payload['jti']}"
+        if not RevokedTokenRepository.add(key, datetime.utcnow(), datetime.utcfromtimestamp(payload['exp'])):
+            return False
+        TokenService._filter.add(key)
+        forget_token(token)
+        publish('revocation', key)
+        return True
+    
+    @staticmethod
+    def revoke_user_tokens(user_id: int) -> bool:
+        """
+        Revoke every token of the user issued before now (e.g. on password change)
+        Token iat has one-second resolution, so tokens issued in the current second stay valid.
+        """
+        key = f"user:{user_id}"
+        revoked_at = datetime.utcnow().replace(microsecond=0)
+        expires_at = revoked_at + timedelta(hours=JWT_EXPIRATION_HOURS)
+        if not RevokedTokenRepository.add(key, revoked_at, expires_at):
+            return False
+        TokenService._user_revocations = {**TokenService._user_revocations, key: revoked_at}
+        publish('revocation', key)
+        return True
+    
+    @staticmethod
+    def get_revocation_stats() -> dict:
+        """Revocation filter statistics"""
+        loaded_at = TokenService._loaded_at
+        with TokenService._stats_lock:
+            stats = dict(TokenService._stats)
+        return {
+            'keys': TokenService._filter.count,
+            'user_revocations': len(TokenService._user_revocations),
+            'age_seconds': round(time.monotonic() - loaded_at, 1) if loaded_at is not None else None,
+            **stats
+        }
+
+
+subscribe('revocation', TokenService._revocation_published)
@@ -0,0 +1,145 @@
+"""
+Upload Service - Resumable chunked uploads for large import files
+"""
+import json
+import os
+import re
+import secrets
+import time
+from typing import Optional
+from config import UPLOAD_SPOOL_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_MAX_SIZE, UPLOAD_EXPIRATION_HOURS
+
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_COPY_BLOCK_SIZE = 64 * 1024
+
+
+class UploadService:
+    """
+    Service for chunked, resumable uploads
+    Chunks are appended to a spool file on disk (never held in worker memory);
+    the spool file size is the number of bytes received so far, so a client
+    can ask for it and resume after a dropped connection.
+    """
+    
+    @staticmethod
+    def _paths(upload_id: str) -> tuple[str, str]:
+        """(spool file path, metadata file path) for an upload"""
+        return (
+            os.path.join(UPLOAD_SPOOL_DIR, f'{upload_id}.part'),
+            os.path.join(UPLOAD_SPOOL_DIR, f'{upload_id}.json')
+        )
+    
+    @staticmethod
+    def _cleanup_expired() -> None:
+        """Remove spool files of uploads that were never finished"""
+        cutoff = time.time() - UPLOAD_EXPIRATION_HOURS * 3600
+        for name in os.listdir(UPLOAD_SPOOL_DIR):
+            path = os.path.join(UPLOAD_SPOOL_DIR, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass  # Removed concurrently or still in use
+    
+    @staticmethod
+    def create_upload(kind: str, file_name: str, total_size: int) -> tuple[bool, str, Optional[dict]]:
+        """
+        Start a chunked upload
+        Returns: (success: bool, message: str, upload: dict or None)
+        """
+        if not file_name or not file_name.lower().endswith(('.xlsx', '.xls')):
+            return False, "Поддерживаются только файлы Excel (.xlsx, .xls)", None
+        if not isinstance(total_size, int) or total_size <= 0:
+            return False, "File size is required", None
+        if total_size > UPLOAD_MAX_SIZE:
+            return False, "File is too large", None
+        
+        os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+        UploadService._cleanup_expired()
+        
+        upload_id = secrets.token_hex(16)
+        spool_path, meta_path = UploadService._paths(upload_id)
+        upload = {'kind': kind, 'file_name': file_name, 'size': total_size}
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(upload, f, ensure_ascii=False)
+        open(spool_path, 'wb').close()
+        
+        return True, "Upload created", UploadService.get_upload(upload_id)
+    
+    @staticmethod
+    def get_upload(upload_id: str) -> Optional[dict]:
+        """Get upload state: kind, file_name, size, received, chunk_size"""
+        if not _UPLOAD_ID_RE.match(upload_id or ''):
+            return None
+        spool_path, meta_path = UploadService._paths(upload_id)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                upload = json.load(f)
+            received = os.path.getsize(spool_path)
+        except (OSError, ValueError):
+            return None
+        return {
+            'upload_id': upload_id,
+            **upload,
+            'received': received,
+            'chunk_size': UPLOAD_CHUNK_SIZE,
+            'complete': received == upload['size']
+        }
+    
+    @staticmethod
+    def write_chunk(upload_id: str, offset: int, stream) -> tuple[bool, str]:
+        """
+        Write a chunk read from a stream at the given offset
+        The offset may repeat bytes already received (a retried chunk) but must not
+        leave a gap; the spool file is truncated to the offset before appending.
+        Returns: (success: bool, message: str)
+        """
+        upload = UploadService.get_upload(upload_id)
+        if not upload:
+            return False, "Upload not found"
+        if offset < 0 or offset > upload['received']:
+            return False, f"Invalid offset, expected {upload['received']}"
+        
+        spool_path, _ = UploadService._paths(upload_id)
+        with open(spool_path, 'r+b') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            written = offset
+            while True:
+                block = stream.read(_COPY_BLOCK_SIZE)
+                if not block:
+                    break
+                written += len(block)
+                if written > upload['size']:
+                    f.truncate(offset)
+                    return False, "Chunk exceeds declared file size"
+                f.write(block)
+        return True, "Chunk received"
+    
+    @staticmethod
+    def finalize(upload_id: str) -> tuple[bool, str, Optional[dict]]:
+        """
+        Check that all bytes were received
+        Returns: (success: bool, message: str, upload: dict with spool 'path' or None)
+        """
+        upload = UploadService.get_upload(upload_id)
+        if not upload:
+            return False, "Upload not found", None
+        if not upload['complete']:
+            return False, f"Upload incomplete: {upload['received']} of {upload['size']} bytes received", upload
+        spool_path, _ = UploadService._paths(upload_id)
+        return True, "Upload complete", {**upload, 'path': spool_path}
+    
+    @staticmethod
+    def discard(upload_id: str) -> bool:
+        """Remove an upload's spool and metadata files"""
+        if not _UPLOAD_ID_RE.match(upload_id or ''):
+            return False
+        removed = False
+        for path in UploadService._paths(upload_id):
+            try:
+                os.remove(path)
+                removed = True
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,120 @@
+"""
+In-process caches
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with optional per-entry expiry
+    Keeps hit/miss/eviction counters for the metrics endpoint.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl  # Default time to live in seconds (None = no expiry)
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value (and mark it as recently used)"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl overrides the cache default for this entry"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key: Hashable) -> None:
+        """Remove one entry"""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def delete_where(self, predicate) -> None:
+        """Remove all entries whose (key, value) matches the predicate"""
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if predicate(k, v)]:
+                del self._data[key]
+    
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def stats(self) -> dict:
+        """Size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class VersionedCache:
+    """
+    Small cache of derived values (e.g. the category list) tied to a data version
+    invalidate() bumps the version, so every value computed before it is recomputed
+    on next access. max_age bounds staleness for changes made by other workers.
+    """
+    
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self.version = 0
+        self._values = {}  # key -> (version, computed_at, value)
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, loader) -> Any:
+        """Get the value for key, computing it with loader() if missing or outdated"""
+        now = time.monotonic()
+        with self._lock:
+            version = self.version
+            entry = self._values.get(key)
+        if entry is not None:
+            entry_version, computed_at, value = entry
+            if entry_version == version and (self.max_age is None or now - computed_at < self.max_age):
+                return value
+        
+        value = loader()
+        with self._lock:
+            # Don't store a value computed while a change was being made
+            if self.version == version:
+                self._values[key] = (version, now, value)
+        return value
+    
+    def invalidate(self) -> None:
+        """Drop all values (call after the underlying data changed)"""
+        with self._lock:
+            self.version += 1
+            self._values.clear()
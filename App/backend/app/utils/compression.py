@@ -0,0 +1,90 @@
+"""
+Negotiated response compression (brotli when available, gzip otherwise)
+"""
+import gzip
+import zlib
+from flask import request
+from config import COMPRESSION_LEVEL, COMPRESSION_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain', 'text/csv'
+}
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiated_encoding() -> str:
+    """Best content encoding the client accepts, or None"""
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=max(COMPRESSION_LEVEL - 2, 0))
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+
+
+def _compress_stream(chunks, encoding: str):
+    """Compress a streamed body chunk by chunk (memory stays bounded)"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=max(COMPRESSION_LEVEL - 2, 0))
+        compress, flush = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress, flush = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            compressed = compress(chunk)
+            if compressed:
+                yield compressed
+        yield flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    """
+    after_request hook: compress text responses for clients that accept it
+    Buffered bodies below COMPRESSION_MIN_SIZE are left alone; streamed bodies are
+    compressed on the fly. The encoding is appended to the ETag, so each encoded
+    representation has its own strong validator.
+    """
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    encoding = negotiated_encoding()
+    if not encoding:
+        return response
+    
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(_compress(data, encoding))
+    
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def init_compression(app) -> None:
+    """Register response compression on the app"""
+    app.after_request(compress_response)
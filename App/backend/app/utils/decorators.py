@@ -3,8 +3,8 @@ Decorators for authentication and authorization
 """
 from functools import wraps
 from flask import request, jsonify, session
-from app.utils.jwt_utils import verify_token, get_token_from_header
-from app.services import AuthService
+from app.utils.jwt_utils import get_token_from_header
+from app.services import AuthService, TokenService
 
 
 def jwt_required(f):
@@ -19,8 +19,8 @@ def jwt_required(f):
         token = get_token_from_header(auth_header)
         
         if token:
-            # Verify JWT token
-            payload = verify_token(token)
+            # Verify JWT token (signature, expiry and revocation)
+            payload = TokenService.authenticate(token)
             if payload:
                 # Add user info to request context
                 request.current_user = {
@@ -64,6 +64,28 @@ def admin_required(f):
     return decorated_function
 
 
+# Session keys filled from token claims: (session key, claim)
+SESSION_USER_CLAIMS = (
+    ('user_id', 'user_id'),
+    ('user_email', 'email'),
+    ('user_role', 'role'),
+    ('user_name', 'name'),
+    ('customer_id', 'customer_id')
+)
+
+
+def sync_session_user(payload: dict) -> None:
+    """
+    Copy the user claims of a verified token into the session
+    Only values that differ are written, so an unchanged session is not marked
+    modified and its cookie is not re-serialized and re-sent.
+    """
+    for key, claim in SESSION_USER_CLAIMS:
+        value = payload.get(claim)
+        if key not in session or session[key] != value:
+            session[key] = value
+
+
 def get_current_user():
     """
     Helper function to get current user from request context or session
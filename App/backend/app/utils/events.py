@@ -0,0 +1,164 @@
+"""
+Server-Sent Events: per-worker broker for circulation and availability events
+Every open stream only waits on its own in-memory queue; events come from the
+write paths of this worker and, over the invalidation channel, of the other
+workers, so open streams add no database polling. Periodic checks (e.g. overdue
+transitions) run once per worker, not once per client.
+
+Streams are long-lived requests: run the app with gevent workers (see
+gunicorn.conf.py) so an open stream does not pin a sync worker. The queues,
+locks and watcher thread below become cooperative under gevent's monkey
+patching. With sync workers EVENT_STREAM_MAX_CLIENTS and EVENT_STREAM_MAX_SECONDS
+bound how many workers/threads streams can hold and for how long.
+"""
+import json
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+from app.utils.invalidation import publish, subscribe
+from config import (
+    EVENT_HEARTBEAT_SECONDS, EVENT_QUEUE_SIZE, EVENT_STREAM_MAX_CLIENTS,
+    EVENT_STREAM_MAX_SECONDS, EVENT_WATCH_SECONDS
+)
+
+_subscriptions = set()
+_subscriptions_lock = threading.Lock()
+_watchers = []  # periodic checks, see add_watcher()
+_watcher_thread = None
+
+
+class Subscription:
+    """One open stream: a bounded queue of events of the allowed types"""
+    
+    def __init__(self, event_types: Optional[Iterable[str]] = None):
+        self.event_types = set(event_types) if event_types is not None else None
+        self.queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.overflowed = False
+    
+    def put(self, event: dict) -> None:
+        """Queue an event; a client that falls behind gets a single resync instead"""
+        if self.event_types is not None and event['type'] not in self.event_types and event['type'] != 'resync':
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+def open_subscription(event_types: Optional[Iterable[str]] = None) -> Optional[Subscription]:
+    """
+    Register a stream for the given event types (all types if None)
+    Returns: the subscription, or None when this worker has EVENT_STREAM_MAX_CLIENTS streams open
+    """
+    subscription = Subscription(event_types)
+    with _subscriptions_lock:
+        if len(_subscriptions) >= EVENT_STREAM_MAX_CLIENTS:
+            return None
+        _subscriptions.add(subscription)
+    _start_watcher()
+    return subscription
+
+
+def close_subscription(subscription: Subscription) -> None:
+    """Unregister a stream"""
+    with _subscriptions_lock:
+        _subscriptions.discard(subscription)
+
+
+def _deliver(event: dict) -> None:
+    """Queue an event on every open stream of this worker"""
+    with _subscriptions_lock:
+        subscriptions = list(_subscriptions)
+    for subscription in subscriptions:
+        subscription.put(event)
+
+
+def emit(event_type: str, data: dict, broadcast: bool = True) -> None:
+    """
+    Send an event to the open streams (call after the change is committed)
+    With broadcast, the other workers get it over the invalidation channel.
+    """
+    _deliver({'type': event_type, 'data': data})
+    if broadcast:
+        publish('event', json.dumps({'type': event_type, 'data': data}, default=str))
+
+
+def _event_published(payload: str = None) -> None:
+    """Event from another worker (None: notifications may have been missed)"""
+    if payload is None:
+        _deliver({'type': 'resync', 'data': {}})
+        return
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return
+    _deliver(event)
+
+
+def add_watcher(check: Callable[[bool], None]) -> None:
+    """
+    Register a periodic check (it calls emit with broadcast=False, each worker runs its own)
+    It runs every EVENT_WATCH_SECONDS and gets whether this worker has open streams.
+    """
+    _watchers.append(check)
+
+
+def _watch() -> None:
+    """Watcher loop: run the checks (they skip their queries while no streams are open)"""
+    while True:
+        time.sleep(EVENT_WATCH_SECONDS)
+        with _subscriptions_lock:
+            active = bool(_subscriptions)
+        for check in _watchers:
+            try:
+                check(active)
+            except Exception as e:
+                print(f"Error in event watcher: {e}")
+
+
+def _start_watcher() -> None:
+    """Start the watcher thread (once per process)"""
+    global _watcher_thread
+    with _subscriptions_lock:
+        if _watcher_thread is not None and _watcher_thread.is_alive():
+            return
+        _watcher_thread = threading.Thread(target=_watch, name='event-watcher', daemon=True)
+        _watcher_thread.start()
+
+
+def _format(event_type: str, data, dumps: Callable) -> str:
+    """One SSE message"""
+    return f"event: {event_type}\ndata: {dumps(data)}\n\n"
+
+
+def event_stream(subscription: Subscription, dumps: Callable) -> Iterator[str]:
+    """
+    SSE body for a subscription: events as they arrive, a comment line every
+    EVENT_HEARTBEAT_SECONDS, closed after EVENT_STREAM_MAX_SECONDS (clients reconnect)
+    """
+    deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+    try:
+        yield "retry: 3000\n\n"  # Clients reconnect 3 seconds after the stream closes
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if subscription.overflowed:
+                # Dropped events: discard the backlog, the client refetches
+                subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                yield _format('resync', {}, dumps)
+                continue
+            try:
+                event = subscription.queue.get(timeout=min(EVENT_HEARTBEAT_SECONDS, remaining))
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield _format(event['type'], event['data'], dumps)
+    finally:
+        close_subscription(subscription)
+
+
+subscribe('event', _event_published)
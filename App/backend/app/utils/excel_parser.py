@@ -1,32 +1,43 @@
 """
 Excel file parser for importing books
 """
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
 
 
-def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
+def collect_rows(items: Iterable[Tuple[Optional[Dict], Optional[str]]]) -> Tuple[List[Dict], List[str]]:
+    """Split parsed (row, error) items into (rows, errors) lists"""
+    rows, errors = [], []
+    for row, error in items:
+        if error is None:
+            rows.append(row)
+        else:
+            errors.append(error)
+    return rows, errors
+
+
+def iter_books_excel(file_path: str) -> Iterator[Tuple[Optional[Dict], Optional[str]]]:
     """
     Parse Excel file and extract book data
     
     Expected Excel format:
-    - First row: Headers (Title, Author, ISBN, Category, Total Copies, Available Copies)
+    - First row: Headers (ID, Title, Author, ISBN, Category, Total Copies, Available Copies)
     - Following rows: Book data
     
     Args:
         file_path: Path to Excel file
     
-    Returns:
-        Tuple of (books_data: List[Dict], errors: List[str])
+    Yields:
+        (book_data, None) for each row and (None, error) for each problem, in file order
+        (the workbook is read row by row, so callers can process it in chunks)
     """
-    books_data = []
-    errors = []
+    found = 0
     
     workbook = None
     try:
         # Open workbook for reading
-        workbook = load_workbook(file_path, data_only=True)
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
         sheet = workbook.active
         
         # Find header row (first row with data)
@@ -38,10 +49,8 @@ def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 break
         
         if not header_row:
-            errors.append("Не найдена строка заголовков. Убедитесь, что первая строка содержит заголовки.")
-            if workbook:
-                workbook.close()
-            return books_data, errors
+            yield None, "Не найдена строка заголовков. Убедитесь, что первая строка содержит заголовки."
+            return
         
         # Read headers
         headers = {}
@@ -50,7 +59,9 @@ def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             if cell.value:
                 header_text = str(cell.value).strip().lower()
                 # Map various header names to standard fields
-                if any(x in header_text for x in ['title', 'название', 'название книги', 'книга']):
+                if header_text in ['id', 'book id', 'book_id', 'id книги', 'код', 'код книги']:
+                    headers['id'] = col_idx
+                elif any(x in header_text for x in ['title', 'название', 'название книги', 'книга']):
                     headers['title'] = col_idx
                 elif any(x in header_text for x in ['author', 'автор', 'автор книги']):
                     headers['author'] = col_idx
@@ -68,10 +79,8 @@ def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                     headers['available_copies'] = col_idx
         
         if 'title' not in headers:
-            errors.append("Не найдена колонка с названием книги. Убедитесь, что в файле есть колонка 'Title' или 'Название'.")
-            if workbook:
-                workbook.close()
-            return books_data, errors
+            yield None, "Не найдена колонка с названием книги. Убедитесь, что в файле есть колонка 'Title' или 'Название'."
+            return
         
         # Read data rows
         for row_idx, row in enumerate(sheet.iter_rows(min_row=header_row + 1, values_only=False), start=header_row + 1):
@@ -86,11 +95,18 @@ def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             title = str(title_cell.value).strip() if title_cell.value else None
             
             if not title or title.lower() in ['none', 'null', '']:
-                errors.append(f"Строка {row_idx}: Отсутствует название книги")
+                yield None, f"Строка {row_idx}: Отсутствует название книги"
                 continue
             
             book_data['title'] = title
             
+            # Extract book ID (optional, generated on import if missing)
+            if 'id' in headers:
+                id_cell = row[headers['id'] - 1]
+                book_id = str(id_cell.value).strip() if id_cell.value else None
+                if book_id and book_id.lower() not in ['none', 'null', '']:
+                    book_data['id'] = book_id
+            
             # Extract author (optional)
             if 'author' in headers:
                 author_cell = row[headers['author'] - 1]
@@ -148,13 +164,14 @@ def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             else:
                 book_data['available_copies'] = book_data['total_copies']
             
-            books_data.append(book_data)
+            found += 1
+            yield book_data, None
         
-        if not books_data:
-            errors.append("Не найдено ни одной книги в файле. Убедитесь, что данные начинаются со второй строки.")
+        if not found:
+            yield None, "Не найдено ни одной книги в файле. Убедитесь, что данные начинаются со второй строки."
         
     except Exception as e:
-        errors.append(f"Ошибка при чтении файла: {str(e)}")
+        yield None, f"Ошибка при чтении файла: {str(e)}"
     finally:
         # Always close the workbook to release the file lock
         if workbook:
@@ -162,11 +179,19 @@ def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 workbook.close()
             except Exception:
                 pass  # Ignore errors when closing
+
+
+def parse_books_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Parse Excel file and extract book data (see iter_books_excel)
     
-    return books_data, errors
+    Returns:
+        Tuple of (books_data: List[Dict], errors: List[str])
+    """
+    return collect_rows(iter_books_excel(file_path))
 
 
-def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
+def iter_customers_excel(file_path: str) -> Iterator[Tuple[Optional[Dict], Optional[str]]]:
     """
     Parse Excel file and extract customer data
     
@@ -177,16 +202,16 @@ def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
     Args:
         file_path: Path to Excel file
     
-    Returns:
-        Tuple of (customers_data: List[Dict], errors: List[str])
+    Yields:
+        (customer_data, None) for each row and (None, error) for each problem, in file order
+        (the workbook is read row by row, so callers can process it in chunks)
     """
-    customers_data = []
-    errors = []
+    found = 0
     
     workbook = None
     try:
         # Open workbook for reading
-        workbook = load_workbook(file_path, data_only=True)
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
         sheet = workbook.active
         
         # Find header row (first row with data)
@@ -198,10 +223,8 @@ def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 break
         
         if not header_row:
-            errors.append("Не найдена строка заголовков. Убедитесь, что первая строка содержит заголовки.")
-            if workbook:
-                workbook.close()
-            return customers_data, errors
+            yield None, "Не найдена строка заголовков. Убедитесь, что первая строка содержит заголовки."
+            return
         
         # Read headers
         headers = {}
@@ -226,10 +249,8 @@ def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                     headers['email'] = col_idx
         
         if 'name' not in headers:
-            errors.append("Не найдена колонка с именем читателя. Убедитесь, что в файле есть колонка 'Name' или 'Имя'.")
-            if workbook:
-                workbook.close()
-            return customers_data, errors
+            yield None, "Не найдена колонка с именем читателя. Убедитесь, что в файле есть колонка 'Name' или 'Имя'."
+            return
         
         # Read data rows
         for row_idx, row in enumerate(sheet.iter_rows(min_row=header_row + 1, values_only=False), start=header_row + 1):
@@ -244,7 +265,7 @@ def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             name = str(name_cell.value).strip() if name_cell.value else None
             
             if not name or name.lower() in ['none', 'null', '']:
-                errors.append(f"Строка {row_idx}: Отсутствует имя читателя")
+                yield None, f"Строка {row_idx}: Отсутствует имя читателя"
                 continue
             
             customer_data['name'] = name
@@ -294,13 +315,14 @@ def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 if email and email.lower() not in ['none', 'null', '']:
                     customer_data['email'] = email
             
-            customers_data.append(customer_data)
+            found += 1
+            yield customer_data, None
         
-        if not customers_data:
-            errors.append("Не найдено ни одного читателя в файле. Убедитесь, что данные начинаются со второй строки.")
+        if not found:
+            yield None, "Не найдено ни одного читателя в файле. Убедитесь, что данные начинаются со второй строки."
         
     except Exception as e:
-        errors.append(f"Ошибка при чтении файла: {str(e)}")
+        yield None, f"Ошибка при чтении файла: {str(e)}"
     finally:
         # Always close the workbook to release the file lock
         if workbook:
@@ -308,11 +330,19 @@ def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 workbook.close()
             except Exception:
                 pass  # Ignore errors when closing
+
+
+def parse_customers_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Parse Excel file and extract customer data (see iter_customers_excel)
     
-    return customers_data, errors
+    Returns:
+        Tuple of (customers_data: List[Dict], errors: List[str])
+    """
+    return collect_rows(iter_customers_excel(file_path))
 
 
-def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
+def iter_issues_excel(file_path: str) -> Iterator[Tuple[Optional[Dict], Optional[str]]]:
     """
     Parse Excel file and extract issue (book loan) data
     
@@ -323,16 +353,16 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
     Args:
         file_path: Path to Excel file
     
-    Returns:
-        Tuple of (issues_data: List[Dict], errors: List[str])
+    Yields:
+        (issue_data, None) for each row and (None, error) for each problem, in file order
+        (the workbook is read row by row, so callers can process it in chunks)
     """
-    issues_data = []
-    errors = []
+    found = 0
     
     workbook = None
     try:
         # Open workbook for reading
-        workbook = load_workbook(file_path, data_only=True)
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
         sheet = workbook.active
         
         # Find header row (first row with data)
@@ -344,10 +374,8 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 break
         
         if not header_row:
-            errors.append("Не найдена строка заголовков. Убедитесь, что первая строка содержит заголовки.")
-            if workbook:
-                workbook.close()
-            return issues_data, errors
+            yield None, "Не найдена строка заголовков. Убедитесь, что первая строка содержит заголовки."
+            return
         
         # Read headers
         headers = {}
@@ -370,22 +398,16 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                     headers['date_return'] = col_idx
         
         if 'book_id' not in headers:
-            errors.append("Не найдена колонка с ID книги (Book ID). Убедитесь, что в файле есть колонка 'Book ID'.")
-            if workbook:
-                workbook.close()
-            return issues_data, errors
+            yield None, "Не найдена колонка с ID книги (Book ID). Убедитесь, что в файле есть колонка 'Book ID'."
+            return
         
         if 'customer_id' not in headers:
-            errors.append("Не найдена колонка с ID читателя (Customer ID). Убедитесь, что в файле есть колонка 'Customer ID'.")
-            if workbook:
-                workbook.close()
-            return issues_data, errors
+            yield None, "Не найдена колонка с ID читателя (Customer ID). Убедитесь, что в файле есть колонка 'Customer ID'."
+            return
         
         if 'date_issued' not in headers:
-            errors.append("Не найдена колонка с датой выдачи (Date of issue). Убедитесь, что в файле есть колонка 'Date of issue'.")
-            if workbook:
-                workbook.close()
-            return issues_data, errors
+            yield None, "Не найдена колонка с датой выдачи (Date of issue). Убедитесь, что в файле есть колонка 'Date of issue'."
+            return
         
         # Read data rows
         for row_idx, row in enumerate(sheet.iter_rows(min_row=header_row + 1, values_only=False), start=header_row + 1):
@@ -400,7 +422,7 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             book_id = str(book_id_cell.value).strip() if book_id_cell.value else None
             
             if not book_id or book_id.lower() in ['none', 'null', '']:
-                errors.append(f"Строка {row_idx}: Отсутствует ID книги")
+                yield None, f"Строка {row_idx}: Отсутствует ID книги"
                 continue
             
             issue_data['book_id'] = book_id
@@ -417,7 +439,7 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             customer_id = str(customer_id_cell.value).strip() if customer_id_cell.value else None
             
             if not customer_id or customer_id.lower() in ['none', 'null', '']:
-                errors.append(f"Строка {row_idx}: Отсутствует ID читателя")
+                yield None, f"Строка {row_idx}: Отсутствует ID читателя"
                 continue
             
             issue_data['customer_id'] = customer_id
@@ -434,7 +456,7 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             date_issued = date_issued_cell.value
             
             if not date_issued:
-                errors.append(f"Строка {row_idx}: Отсутствует дата выдачи")
+                yield None, f"Строка {row_idx}: Отсутствует дата выдачи"
                 continue
             
             # Convert date to string format YYYY-MM-DD
@@ -456,7 +478,7 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 
                 issue_data['date_issued'] = date_issued.isoformat()
             except Exception as e:
-                errors.append(f"Строка {row_idx}: Неверный формат даты выдачи: {str(e)}")
+                yield None, f"Строка {row_idx}: Неверный формат даты выдачи: {str(e)}"
                 continue
             
             # Extract date_return (optional)
@@ -480,7 +502,7 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                         issue_data['date_return'] = date_return.isoformat()
                         issue_data['status'] = 'returned'
                     except Exception as e:
-                        errors.append(f"Строка {row_idx}: Неверный формат даты возврата: {str(e)}")
+                        yield None, f"Строка {row_idx}: Неверный формат даты возврата: {str(e)}"
                         # Continue without return date
                         issue_data['status'] = 'issued'
                 else:
@@ -488,13 +510,14 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
             else:
                 issue_data['status'] = 'issued'
             
-            issues_data.append(issue_data)
+            found += 1
+            yield issue_data, None
         
-        if not issues_data:
-            errors.append("Не найдено ни одной выдачи в файле. Убедитесь, что данные начинаются со второй строки.")
+        if not found:
+            yield None, "Не найдено ни одной выдачи в файле. Убедитесь, что данные начинаются со второй строки."
         
     except Exception as e:
-        errors.append(f"Ошибка при чтении файла: {str(e)}")
+        yield None, f"Ошибка при чтении файла: {str(e)}"
     finally:
         # Always close the workbook to release the file lock
         if workbook:
@@ -502,6 +525,14 @@ def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
                 workbook.close()
             except Exception:
                 pass  # Ignore errors when closing
+
+
+def parse_issues_excel(file_path: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Parse Excel file and extract issue data (see iter_issues_excel)
     
-    return issues_data, errors
+    Returns:
+        Tuple of (issues_data: List[Dict], errors: List[str])
+    """
+    return collect_rows(iter_issues_excel(file_path))
 
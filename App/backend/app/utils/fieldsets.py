@@ -0,0 +1,29 @@
+"""
+Sparse fieldsets (fields= query parameter)
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+
+def parse_fields(value: Optional[str], fields: Sequence[str], profiles: Dict[str, Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    """
+    Resolve a fields= value: comma-separated field and/or profile names (e.g. "card,isbn")
+    The ID is always included; fields come back in model order.
+    Returns: tuple of field names, or None when no fields were requested
+    Raises: ValueError for unknown names
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    if not names:
+        return None
+    
+    requested = {'id'}
+    unknown = []
+    for name in names:
+        if name in profiles:
+            requested.update(profiles[name])
+        elif name in fields:
+            requested.add(name)
+        else:
+            unknown.append(name)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(field for field in fields if field in requested)
@@ -0,0 +1,93 @@
+"""
+HTTP validators (ETag / Last-Modified) for public read endpoints
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Hashable, NamedTuple, Optional
+from flask import current_app, request, make_response
+from app.utils.cache import LRUCache
+from app.utils.compression import ENCODINGS
+from config import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_SECONDS, RESPONSE_CACHE_SIZE
+
+
+class _CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    mimetype: str
+    built_at: datetime
+
+
+# Response bodies with their ETags, keyed by (data version, URL)
+_responses = LRUCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_SECONDS)
+
+
+def _matching_etag(etag: str) -> Optional[str]:
+    """The variant of the ETag in If-None-Match, if any (compressed representations carry the encoding as a suffix)"""
+    return next((
+        candidate for candidate in [etag] + [f"{etag}-{encoding}" for encoding in ENCODINGS]
+        if request.if_none_match.contains(candidate)
+    ), None)
+
+
+def _validated(response, last_modified: Optional[datetime] = None, etag: str = None):
+    """
+    Tag a response with a strong ETag (of its body unless given), replaced by an
+    empty 304 when If-None-Match matches, Last-Modified and Cache-Control: no-cache
+    """
+    if etag is None:
+        etag = hashlib.sha1(response.get_data()).hexdigest()
+    matched = _matching_etag(etag)
+    if matched:
+        response = make_response('', 304)
+        etag = matched
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Clients may keep the response but must revalidate it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_response(version: Callable[[], Hashable]):
+    """
+    Decorator: serve GET responses from memory, keyed by the data version and the URL
+    The body is stored with a strong ETag of its content and its build time
+    (Last-Modified), so a matching If-None-Match is answered with 304 without
+    running the view, serializing or hashing anything. version() must change with
+    every change of the data the view returns (e.g. BookService.catalog_version);
+    RESPONSE_CACHE_SECONDS bounds staleness when no change notification arrives.
+    Bodies over RESPONSE_CACHE_MAX_BYTES are not stored, only tagged.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = (version(), request.full_path)
+            entry = _responses.get(key)
+            if entry is None:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = _CachedResponse(
+                    hashlib.sha1(body).hexdigest(), body, response.mimetype, datetime.now(timezone.utc)
+                )
+                # Don't store a body built while a change was being made
+                if len(body) <= RESPONSE_CACHE_MAX_BYTES and version() == key[0]:
+                    _responses.set(key, entry)
+            else:
+                response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+            return _validated(response, entry.built_at, entry.etag)
+        
+        return decorated_function
+    return decorator
+
+
+def json_with_etag(data, last_modified: Optional[datetime] = None):
+    """JSON response with a strong ETag of its content, or 304 when If-None-Match matches"""
+    return _validated(current_app.json.response(data), last_modified)
+
+
+def get_response_cache_stats() -> dict:
+    """Response cache statistics"""
+    return _responses.stats()
@@ -0,0 +1,162 @@
+"""
+Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY
+"""
+import json
+import os
+import select
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, List, Optional
+import psycopg2
+from flask import g, has_request_context
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from config import DATABASE_CONFIG, INVALIDATION_CHANNEL
+
+# Identifies this process, so a worker ignores its own notifications
+# (it already invalidated its caches when it made the change)
+ORIGIN = uuid.uuid4().hex
+
+_handlers = defaultdict(list)  # entity -> [handler(entity_id)]
+_listener = None
+_stop = threading.Event()
+_publisher = None  # (pid, autocommit connection) reused for sending notifications
+_publisher_lock = threading.Lock()
+
+
+def subscribe(entity: str, handler: Callable[[Optional[str]], None]) -> None:
+    """
+    Register a handler that evicts local cache entries for an entity type
+    The handler gets the changed entity ID, or None when anything may have changed.
+    """
+    _handlers[entity].append(handler)
+
+
+def _notify(payloads: List[str]) -> None:
+    """Send notifications in one statement on this process's publisher connection (reconnecting once)"""
+    global _publisher
+    with _publisher_lock:
+        for attempt in range(2):
+            # A connection inherited over fork belongs to the parent: leave it alone
+            if _publisher is None or _publisher[0] != os.getpid() or _publisher[1].closed:
+                conn = psycopg2.connect(**DATABASE_CONFIG)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                _publisher = (os.getpid(), conn)
+            try:
+                _publisher[1].cursor().execute(
+                    'SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) WITH ORDINALITY AS p (payload, n) ORDER BY n',
+                    (INVALIDATION_CHANNEL, payloads)
+                )
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                _publisher[1].close()
+                _publisher = None
+                if attempt:
+                    raise
+
+
+def publish(entity: str, entity_id=None) -> None:
+    """
+    Tell the other workers that an entity changed (call after the change is committed)
+    During a request the notifications are collected and sent together when the
+    request ends (see flush_notifications); otherwise they are sent right away.
+    Failures are logged only: caches also expire on their own.
+    """
+    payload = json.dumps({
+        'entity': entity,
+        'id': str(entity_id) if entity_id is not None else None,
+        'origin': ORIGIN
+    })
+    if has_request_context():
+        pending = g.setdefault('pending_notifications', [])
+        if payload not in pending:
+            pending.append(payload)
+        return
+    try:
+        _notify([payload])
+    except Exception as e:
+        print(f"Error publishing {entity} change: {e}")
+
+
+def flush_notifications(exc=None) -> None:
+    """Send the notifications collected during the request (registered as a teardown_request handler)"""
+    pending = g.pop('pending_notifications', None)
+    if not pending:
+        return
+    try:
+        _notify(pending)
+    except Exception as e:
+        print(f"Error publishing changes: {e}")
+
+
+def _dispatch(entity: str, entity_id: Optional[str]) -> None:
+    """Run the handlers for an entity"""
+    for handler in _handlers.get(entity, []):
+        try:
+            handler(entity_id)
+        except Exception as e:
+            print(f"Error invalidating {entity} cache: {e}")
+
+
+def _dispatch_all() -> None:
+    """Invalidate everything (notifications may have been missed while disconnected)"""
+    for entity in list(_handlers):
+        _dispatch(entity, None)
+
+
+def _handle_notification(payload: str) -> None:
+    """Dispatch one notification payload"""
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return
+    if message.get('origin') == ORIGIN:
+        return
+    _dispatch(message.get('entity'), message.get('id'))
+
+
+def _listen() -> None:
+    """Listener loop: one autocommit connection doing LISTEN, reconnecting with backoff"""
+    backoff = 1
+    disconnected = False
+    while not _stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(**DATABASE_CONFIG)
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            conn.cursor().execute(f'LISTEN {INVALIDATION_CHANNEL}')
+            if disconnected:
+                _dispatch_all()
+            backoff = 1
+            while not _stop.is_set():
+                if select.select([conn], [], [], 5)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        _handle_notification(conn.notifies.pop(0).payload)
+        except Exception as e:
+            print(f"Invalidation listener error: {e}")
+            disconnected = True
+        finally:
+            if conn is not None:
+                conn.close()
+        _stop.wait(backoff)
+        backoff = min(backoff * 2, 60)
+
+
+def start_listener() -> None:
+    """
+    Start this worker's listener thread (once per process)
+    Call it in the worker process itself: threads do not survive a fork, so with
+    gunicorn --preload the app must start it in a post_fork hook instead.
+    """
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+    _stop.clear()
+    _listener = threading.Thread(target=_listen, name='invalidation-listener', daemon=True)
+    _listener.start()
+
+
+def stop_listener() -> None:
+    """Stop the listener thread"""
+    _stop.set()
@@ -0,0 +1,64 @@
+"""
+Fast JSON provider (orjson when available, the standard library otherwise)
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: without it the standard json module is used
+    orjson = None
+
+
+def _default(obj):
+    """Encode models by their to_dict(), everything else like Flask does"""
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    return DefaultJSONProvider.default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes in a single native pass with orjson
+    Output matches the default provider (sorted keys, HTTP dates, Decimal and UUID
+    as strings) except that non-ASCII text is sent as UTF-8 instead of \\u escapes.
+    Models can be passed as is (they are encoded by to_dict()). Calls with extra
+    json.dumps options (e.g. indent in debug mode) and values orjson cannot encode
+    (e.g. integers beyond 64 bits) use the standard library.
+    """
+    
+    if orjson is not None:
+        _options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    
+    def _encode(self, obj):
+        """Encode with orjson; returns None if orjson is unavailable or cannot encode the value"""
+        if orjson is None:
+            return None
+        try:
+            return orjson.dumps(obj, default=_default, option=self._options)
+        except TypeError:
+            return None
+    
+    def dumps(self, obj, **kwargs) -> str:
+        if not kwargs:
+            encoded = self._encode(obj)
+            if encoded is not None:
+                return encoded.decode('utf-8')
+        kwargs.setdefault('default', _default)
+        return super().dumps(obj, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        # Compact output is encoded straight to bytes (no str round trip)
+        if not ((self.compact is None and self._app.debug) or self.compact is False):
+            encoded = self._encode(self._prepare_response_obj(args, kwargs))
+            if encoded is not None:
+                return self._app.response_class(encoded + b'\n', mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+        return super().loads(s, **kwargs)
@@ -1,10 +1,18 @@
 """
 JWT utilities for token generation and validation
 """
+import hashlib
+import time
+import uuid
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict
-from config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_HOURS
+from app.utils.cache import LRUCache
+from config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_HOURS, TOKEN_CACHE_SIZE, TOKEN_CACHE_SECONDS
+
+# Verified payloads keyed by token digest, so repeated requests with the same token
+# skip signature verification. Entries never outlive the token's exp.
+_verified_tokens = LRUCache(maxsize=TOKEN_CACHE_SIZE)
 
 
 def generate_token(user_id: int, email: str, role: str, customer_id: Optional[str] = None, name: str = "") -> str:
@@ -28,7 +36,8 @@ def generate_token(user_id: int, email: str, role: str, customer_id: Optional[st
         'customer_id': customer_id,
         'name': name,
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
-        'iat': datetime.utcnow()
+        'iat': datetime.utcnow(),
+        'jti': uuid.uuid4().hex  # Token ID (for revocation)
     }
     
     token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
@@ -46,13 +55,35 @@ def verify_token(token: str) -> Optional[Dict]:
     Returns:
         Decoded token payload if valid, None otherwise
     """
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        if payload['exp'] > time.time():
+            return dict(payload)
+        _verified_tokens.delete(key)
+    
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    # Tokens without exp are verified every time
+    expires_in = payload.get('exp', 0) - time.time()
+    if expires_in > 0:
+        _verified_tokens.set(key, dict(payload), ttl=min(TOKEN_CACHE_SECONDS, expires_in))
+    return payload
+
+
+def forget_token(token: str) -> None:
+    """Drop a token from the verified token cache (e.g. after it was revoked)"""
+    _verified_tokens.delete(hashlib.sha256(token.encode('utf-8')).digest())
+
+
+def get_token_cache_stats() -> Dict:
+    """Verified token cache statistics"""
+    return _verified_tokens.stats()
 
 
 def get_token_from_header(auth_header: Optional[str]) -> Optional[str]:
@@ -0,0 +1,163 @@
+"""
+Sliding-window rate limiting
+"""
+import math
+import threading
+import time
+from typing import Iterable, List, Optional
+from config import LOGIN_RATE_LIMIT_PER_EMAIL, LOGIN_RATE_LIMIT_PER_IP, RATE_LIMIT_STORAGE_URL
+
+
+class LocalCounterStore:
+    """
+    In-process counter store (the default backend)
+    Implements the small part of the Redis client API the limiter uses (incrby,
+    expire, mget), so it also stands in for a shared store in development.
+    """
+    
+    SWEEP_EVERY = 1000  # Remove expired counters every N increments
+    
+    def __init__(self):
+        self._counters = {}  # key -> [value, expires_at]
+        self._lock = threading.Lock()
+        self._increments = 0
+    
+    def incrby(self, key: str, amount: int = 1) -> int:
+        """Add to a counter and return the new value"""
+        now = time.monotonic()
+        with self._lock:
+            self._increments += 1
+            if self._increments % self.SWEEP_EVERY == 0:
+                for expired in [k for k, (_, expires_at) in self._counters.items() if expires_at and expires_at <= now]:
+                    del self._counters[expired]
+            
+            entry = self._counters.get(key)
+            if entry is None or (entry[1] and entry[1] <= now):
+                entry = self._counters[key] = [0, None]
+            entry[0] += amount
+            return entry[0]
+    
+    def expire(self, key: str, seconds: int) -> bool:
+        """Set a counter's time to live"""
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                return False
+            entry[1] = time.monotonic() + seconds
+            return True
+    
+    def mget(self, keys: Iterable[str]) -> List[Optional[int]]:
+        """Get several counters (None for missing or expired ones)"""
+        now = time.monotonic()
+        with self._lock:
+            values = []
+            for key in keys:
+                entry = self._counters.get(key)
+                values.append(entry[0] if entry and not (entry[1] and entry[1] <= now) else None)
+            return values
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_counter_store():
+    """
+    Counter store shared by all limiters
+    With RATE_LIMIT_STORAGE_URL set, counters live in Redis and are shared by all
+    workers (needs the redis package); otherwise each worker counts on its own.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _create_counter_store()
+    return _store
+
+
+def _create_counter_store():
+    """Create the configured counter store"""
+    if RATE_LIMIT_STORAGE_URL:
+        try:
+            import redis
+            return redis.Redis.from_url(RATE_LIMIT_STORAGE_URL)
+        except ImportError:
+            print("RATE_LIMIT_STORAGE_URL is set but the redis package is not installed, using in-process rate limits")
+    return LocalCounterStore()
+
+
+def set_counter_store(store) -> None:
+    """Plug in a counter store (any object with incrby, expire and mget)"""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window limiter: at most `limit` hits per key in any `window` seconds
+    Uses the two-bucket approximation (current fixed window plus the overlapping
+    share of the previous one), so each hit is one increment and one read.
+    """
+    
+    def __init__(self, name: str, limit: int, window: int):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.allowed = 0
+        self.rejected = 0
+    
+    def hit(self, key: str) -> float:
+        """
+        Count a hit for the key
+        Returns: 0 if the hit is within the limit, otherwise seconds until retry
+        """
+        now = time.time()
+        bucket = int(now // self.window)
+        current_key = f"rl:{self.name}:{key}:{bucket}"
+        previous_key = f"rl:{self.name}:{key}:{bucket - 1}"
+        store = get_counter_store()
+        try:
+            count = store.incrby(current_key, 1)
+            if count == 1:
+                store.expire(current_key, self.window * 2)
+            previous = store.mget([previous_key])[0]
+        except Exception as e:
+            # An unavailable shared store must not lock everybody out
+            print(f"Rate limiter store error: {e}")
+            return 0
+        
+        elapsed = now - bucket * self.window
+        estimated = int(previous or 0) * (1 - elapsed / self.window) + count
+        if estimated <= self.limit:
+            self.allowed += 1
+            return 0
+        self.rejected += 1
+        return max(math.ceil(self.window - elapsed), 1)
+    
+    def stats(self) -> dict:
+        """Allowed/rejected counters of this worker"""
+        return {'limit': self.limit, 'window': self.window, 'allowed': self.allowed, 'rejected': self.rejected}
+
+
+# Login attempts per client IP and per email
+login_ip_limiter = SlidingWindowLimiter('login_ip', *LOGIN_RATE_LIMIT_PER_IP)
+login_email_limiter = SlidingWindowLimiter('login_email', *LOGIN_RATE_LIMIT_PER_EMAIL)
+
+
+def check_login_rate(ip: Optional[str], email: Optional[str]) -> float:
+    """
+    Count a login attempt against the per-IP and per-email quotas
+    Returns: 0 if the attempt may proceed, otherwise seconds until retry
+    """
+    retry_after = login_ip_limiter.hit(ip or 'unknown')
+    if retry_after:
+        return retry_after
+    if isinstance(email, str) and email.strip():
+        return login_email_limiter.hit(email.strip().lower())
+    return 0
+
+
+def get_rate_limit_stats() -> dict:
+    """Rate limiter statistics of this worker"""
+    return {limiter.name: limiter.stats() for limiter in (login_ip_limiter, login_email_limiter)}
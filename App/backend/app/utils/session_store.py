@@ -0,0 +1,126 @@
+"""
+Server-side Flask sessions
+"""
+import secrets
+from datetime import datetime
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+from app.repositories import WebSessionRepository
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data lives in the web_sessions table"""
+    
+    def __init__(self, initial=None, session_id: str = None, new: bool = False):
+        def on_update(session):
+            session.modified = True
+            session.accessed = True
+        
+        super().__init__(initial, on_update)
+        self.session_id = session_id
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        self.replaced_id = None  # Stored session to delete after regenerate()
+    
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+    
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+    
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+    
+    def regenerate(self) -> None:
+        """Move the session data to a new random session ID (the old one is deleted on save)"""
+        if not self.new and self.replaced_id is None:
+            self.replaced_id = self.session_id
+        self.session_id = secrets.token_urlsafe(16)
+        self.new = True
+        self.modified = True
+
+
+def regenerate_session(session) -> None:
+    """
+    Give the session a new ID (call on login and logout, against session fixation)
+    Cookie sessions carry their data in the cookie and need nothing.
+    """
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Session interface that keeps session data in the database
+    The cookie only carries a signed random session ID and is sent once, when the
+    session is created. Data is written back only when the session was modified.
+    """
+    
+    salt = 'server-side-session'
+    serializer = session_json_serializer
+    
+    def _signer(self, app) -> Signer:
+        return Signer(app.secret_key, salt=self.salt)
+    
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                session_id = self._signer(app).unsign(cookie).decode('ascii')
+            except (BadSignature, UnicodeDecodeError):
+                session_id = None
+            if session_id:
+                data = WebSessionRepository.find(session_id)
+                if data is not None:
+                    try:
+                        return ServerSideSession(self.serializer.loads(data), session_id)
+                    except ValueError:
+                        pass
+        return ServerSideSession(session_id=secrets.token_urlsafe(16), new=True)
+    
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        
+        # Responses that depend on the session must not be shared between users by caches
+        if session.accessed:
+            response.vary.add('Cookie')
+        
+        # Regenerated session: the data moves to the new ID
+        if session.replaced_id is not None:
+            WebSessionRepository.delete(session.replaced_id)
+        
+        # Emptied session (e.g. logout): drop the stored data and the cookie
+        if not session:
+            if session.modified and (not session.new or session.replaced_id is not None):
+                if not session.new:
+                    WebSessionRepository.delete(session.session_id)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        
+        if session.modified:
+            expires_at = datetime.utcnow() + app.permanent_session_lifetime
+            if not WebSessionRepository.save(session.session_id, self.serializer.dumps(dict(session)), expires_at):
+                return
+            if session.new:
+                WebSessionRepository.delete_expired()
+        
+        if session.new or (session.permanent and app.config['SESSION_REFRESH_EACH_REQUEST']):
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.session_id.encode('ascii')).decode('ascii'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
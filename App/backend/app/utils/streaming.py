@@ -0,0 +1,50 @@
+"""
+Streaming JSON responses for large lists
+"""
+from typing import Callable, Iterable, Iterator, Optional
+from flask import Response, current_app
+
+CHUNK_SIZE = 16 * 1024  # Bytes of JSON collected before a chunk is sent
+
+
+def json_array_chunks(items: Iterable, dumps: Callable, to_dict: Optional[Callable] = None) -> Iterator[str]:
+    """Encode items as a JSON array, one element at a time, in chunks of about CHUNK_SIZE"""
+    buffer = ['[']
+    size = 1
+    first = True
+    for item in items:
+        encoded = dumps(to_dict(item) if to_dict is not None else item)
+        if not first:
+            buffer.append(',')
+        buffer.append(encoded)
+        size += len(encoded) + 1
+        first = False
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append(']')
+    yield ''.join(buffer)
+
+
+def streamed_json(chunks: Iterator[str]) -> Response:
+    """
+    Response for a chunk generator (see json_array_chunks)
+    The first chunk is produced before the response starts, so errors such as a
+    failed database connection still become a normal error response.
+    """
+    first = next(chunks)
+    
+    def generate():
+        yield first
+        yield from chunks
+    
+    return Response(generate(), mimetype=current_app.json.mimetype)
+
+
+def stream_json_array(items: Iterable, to_dict: Optional[Callable] = None) -> Response:
+    """
+    Stream an iterable (e.g. rows from a server-side cursor) as a JSON array
+    Models are encoded by the app's JSON provider; pass to_dict for another shape.
+    """
+    return streamed_json(json_array_chunks(items, current_app.json.dumps, to_dict))
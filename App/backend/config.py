@@ -2,6 +2,7 @@
 Configuration file for the Library Management System
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Base directory
@@ -25,6 +26,9 @@ def get_db_connection_string():
 SECRET_KEY = 'library-online-secret-key-2024'
 DEBUG = True
 
+# Keep session data in the database and send only a signed session ID cookie
+SERVER_SIDE_SESSIONS = os.getenv('SERVER_SIDE_SESSIONS', 'false').lower() == 'true'
+
 # JWT configuration
 JWT_SECRET_KEY = 'library-online-jwt-secret-key-2024'  # Should be different from SECRET_KEY
 JWT_ALGORITHM = 'HS256'
@@ -42,6 +46,53 @@ USE_SYSTEM_DATE = True  # Set to False to use actual current date
 # File upload settings
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size for Excel uploads
 
+# In-process cache settings
+AUTHOR_CACHE_SIZE = 10000  # Max author name -> id entries per worker
+CATEGORIES_CACHE_SECONDS = 60  # Max age of the cached category list (changes made by other workers)
+CATALOG_CACHE_SIZE = 2000  # Max cached catalog pages, books and search results per worker
+CATALOG_CACHE_SECONDS = 60  # Max age of a cached catalog result (changes made by other workers)
+AVAILABILITY_CACHE_SIZE = 50000  # Max cached book ID -> available copies entries per worker
+RESPONSE_CACHE_SIZE = 2000  # Max cached public API responses per worker (see http_cache.cached_response)
+RESPONSE_CACHE_SECONDS = 60  # Max age of a cached response (changes made by other workers)
+RESPONSE_CACHE_MAX_BYTES = 1024 * 1024  # Larger responses are not kept in memory
+EXHIBITION_CACHE_MAX_SECONDS = 3600  # Max age of the cached active exhibitions (date boundaries and edits expire them sooner)
+TOKEN_CACHE_SIZE = 10000  # Max verified JWT payloads per worker
+TOKEN_CACHE_SECONDS = 300  # Max time a verified token is trusted without re-checking the signature
+TOKEN_REVOCATION_REFRESH_SECONDS = 30  # How often each worker reloads the revoked token filter
+TOKEN_REVOCATION_FILTER_CAPACITY = 10000  # Minimum number of keys the revoked token filter is sized for
+
+# Rate limiting of login attempts: (max attempts, window in seconds)
+LOGIN_RATE_LIMIT_PER_IP = (20, 60)
+LOGIN_RATE_LIMIT_PER_EMAIL = (5, 300)
+RATE_LIMIT_STORAGE_URL = os.getenv('RATE_LIMIT_STORAGE_URL')  # e.g. redis://localhost:6379/0 to share limits between workers
+
+# Cross-worker cache invalidation (PostgreSQL LISTEN/NOTIFY)
+INVALIDATION_CHANNEL = 'library_changes'
+INVALIDATION_LISTENER = os.getenv('INVALIDATION_LISTENER', 'true').lower() == 'true'  # Listener thread per worker
+
+# Response settings
+COMPRESSION_MIN_SIZE = 1024  # Responses smaller than this are sent uncompressed
+COMPRESSION_LEVEL = 6  # gzip level (brotli quality is COMPRESSION_LEVEL - 2)
+STREAM_FETCH_SIZE = 500  # Rows fetched per round trip when streaming large lists
+
+# Server-Sent Events (/api/stream/events); run with gevent workers (gunicorn -c gunicorn.conf.py wsgi:app)
+EVENT_QUEUE_SIZE = 100  # Max undelivered events per stream (a slower client gets a resync event)
+EVENT_HEARTBEAT_SECONDS = 15  # Comment line sent on idle streams (keeps proxies from closing them)
+EVENT_STREAM_MAX_SECONDS = 300  # Streams are closed after this long and the client reconnects
+EVENT_STREAM_MAX_CLIENTS = 200  # Max open streams per worker
+EVENT_WATCH_SECONDS = 60  # How often each worker checks for time-based changes (overdue issues)
+
+# Import settings
+IMPORT_CHUNK_SIZE = 1000  # Rows per committed chunk (a failed import resumes from the last chunk)
+BULK_BOOK_MAX_ITEMS = 1000  # Max books per bulk update/delete request (one transaction)
+AVAILABILITY_MAX_IDS = 1000  # Max book IDs per availability request
+
+# Chunked upload settings (files larger than MAX_CONTENT_LENGTH are sent in parts)
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'library_uploads'))
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB per PUT (must stay below MAX_CONTENT_LENGTH)
+UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024  # 2GB max assembled file size
+UPLOAD_EXPIRATION_HOURS = 24  # Unfinished uploads are removed after this time
+
 # Sample data paths
 SAMPLE_DATA_DIR = os.path.join(BASE_DIR, 'C:/Users/LexCh/Downloads/test_project [ZUOs18]', 'sample_data')
 
@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration for production
+Run from App/backend: gunicorn -c gunicorn.conf.py wsgi:app
+
+gevent workers serve each request in a greenlet, so long-lived requests
+(/api/stream/events, streamed reports) do not pin a worker process. gunicorn
+monkey-patches the standard library in each worker, which makes the threads,
+locks and queues of the event broker and the invalidation listener cooperative.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gevent'
+worker_connections = 1000  # Concurrent requests per worker (open event streams included)
+timeout = 30  # Worker heartbeat timeout; gevent workers keep beating while streams are open
+graceful_timeout = 30
+keepalive = 5
+
+# No preload: each worker creates the app itself (the schema is set up once, in on_starting)
+preload_app = False
+
+
+def on_starting(server):
+    """Create and migrate the schema once, in the master, before any worker starts"""
+    from app.database import setup_database
+    setup_database()
+
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative before the worker connects to the database"""
+    # Without a wait callback every query would block all requests of the worker
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def post_worker_init(worker):
+    """
+    Start this worker's invalidation listener (threads do not survive the fork)
+    Started here rather than in post_fork: gevent patches the worker after post_fork,
+    and the listener must be a greenlet like the rest of the worker.
+    """
+    from config import INVALIDATION_LISTENER
+    if INVALIDATION_LISTENER:
+        from app.utils.invalidation import start_listener
+        start_listener()
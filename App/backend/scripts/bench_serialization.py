@@ -0,0 +1,88 @@
+"""
+Microbenchmark: JSON serialization of 10k books and issues, Flask's default
+JSON provider vs FastJSONProvider (uses orjson when it is installed)
+Run this script from the backend directory: python scripts/bench_serialization.py
+No database is needed. Also runs on trees without FastJSONProvider (default provider only).
+"""
+import sys
+import os
+import timeit
+import tracemalloc
+from datetime import date
+
+# Add the backend directory to the path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from app.models import Book, Issue
+
+ROWS = 10000
+
+
+def make_rows():
+    """10k books (with authors and covers) and 10k issues"""
+    books = [
+        Book.from_dict({
+            'id': f'B{i:05d}',
+            'title': f'Война и мир {i}',
+            'description': 'x' * 200,
+            'publication_year': 1869,
+            'isbn': f'978-5-{i:06d}',
+            'author_names': ['Лев Толстой'],
+            'authors_info': [{'id': 1, 'full_name': 'Лев Толстой', 'wikipedia_url': None}],
+            'covers': [{'id': i, 'book_id': f'B{i:05d}', 'file_name': 'cover.jpg'}]
+        })
+        for i in range(ROWS)
+    ]
+    issues = [
+        Issue.from_dict({
+            'id': i,
+            'book_id': f'B{i:05d}',
+            'book_title': f'Война и мир {i}',
+            'customer_id': 'C0001',
+            'customer_name': 'Reader',
+            'date_issued': date(2024, 1, 1),
+            'date_return': None
+        })
+        for i in range(ROWS)
+    ]
+    return books, issues
+
+
+def providers():
+    """(name, provider class) pairs available in this tree"""
+    result = [('default', DefaultJSONProvider)]
+    try:
+        from app.utils.json_provider import FastJSONProvider
+        result.append(('fast', FastJSONProvider))
+    except ImportError:
+        pass
+    return result
+
+
+if __name__ == '__main__':
+    try:
+        import orjson
+        backend = f"orjson {orjson.__version__}"
+    except ImportError:
+        backend = "no orjson"
+    print(f"Python {sys.version.split()[0]}, {backend}, {ROWS} rows, best of 3")
+    
+    tracemalloc.start()
+    books, issues = make_rows()
+    print(f"models: {tracemalloc.get_traced_memory()[0] / 1e6:.1f} MB for {ROWS} books + {ROWS} issues")
+    tracemalloc.stop()
+    
+    for provider_name, provider_class in providers():
+        app = Flask(__name__)
+        app.json = provider_class(app)
+        with app.app_context():
+            for name, data in (('books', books), ('issues', issues)):
+                serialize = lambda: jsonify([row.to_dict() for row in data])
+                best = min(timeit.repeat(serialize, number=3, repeat=3)) / 3
+                tracemalloc.start()
+                serialize()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{provider_name:>8} {name:>7}: {best / len(data) * 1e6:.1f} us/row, peak {peak / 1e6:.1f} MB")
@@ -0,0 +1,34 @@
+"""
+Microbenchmark: verify_token with and without the verified token cache
+Run this script from the backend directory: python scripts/bench_token_cache.py
+No database is needed.
+"""
+import sys
+import os
+import timeit
+
+# Add the backend directory to the path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.jwt_utils import generate_token, verify_token, forget_token
+
+CALLS = 10000
+
+
+def uncached():
+    """Every call verifies the signature (the token is dropped from the cache first)"""
+    forget_token(token)
+    verify_token(token)
+
+
+def cached():
+    """Every call after the first is a cache hit"""
+    verify_token(token)
+
+
+if __name__ == '__main__':
+    token = generate_token(1, 'reader@example.com', 'user', 'C0001', 'Reader')
+    print(f"Python {sys.version.split()[0]}, {CALLS} calls, best of 5")
+    for name, func in (('uncached', uncached), ('cached', cached)):
+        best = min(timeit.repeat(func, number=CALLS, repeat=5)) / CALLS
+        print(f"{name:>10}: {best * 1e6:.1f} us per call")
@@ -0,0 +1,8 @@
+"""
+WSGI entry point (gunicorn -c gunicorn.conf.py wsgi:app)
+The database is set up once by the gunicorn master (on_starting) and each worker
+starts its invalidation listener in post_worker_init, see gunicorn.conf.py.
+"""
+from app import create_app
+
+app = create_app(init_database=False, invalidation_listener=False)